@@ -0,0 +1,92 @@
+"""登录吞吐量基准测试
+
+在临时目录中创建独立数据库，用多个线程并发调用 authenticate_user，
+分别测量不同密码校验进程数下的每秒登录次数以及折算到每个核心的吞吐量。
+
+用法：python benchmarks/login_throughput.py [--seconds 5] [--threads 16] [--workers 1,2,4]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_round(db, workers, threads, seconds):
+    """以指定进程数运行一轮，返回 (成功次数, 繁忙拒绝次数, 实际耗时)"""
+    db.configure_password_pool(workers, max(threads, 1), 30)
+    # 预热：创建进程池并让每个子进程完成一次校验
+    for _ in range(workers):
+        db.authenticate_user('user1', 'user1')
+
+    counts = {'ok': 0, 'busy': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        ok = busy = 0
+        while time.perf_counter() < deadline:
+            try:
+                if db.authenticate_user('user1', 'user1'):
+                    ok += 1
+            except db.PasswordVerifyBusy:
+                busy += 1
+        with lock:
+            counts['ok'] += ok
+            counts['busy'] += busy
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return counts['ok'], counts['busy'], time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='登录吞吐量基准测试')
+    parser.add_argument('--seconds', type=float, default=5, help='每轮测试时长（秒）')
+    parser.add_argument('--threads', type=int, default=16, help='并发登录线程数')
+    parser.add_argument('--workers', default=None, help='逗号分隔的校验进程数列表，默认 1 到 CPU 核心数')
+    args = parser.parse_args()
+
+    cpu_count = os.cpu_count() or 1
+    if args.workers:
+        worker_counts = [int(w) for w in args.workers.split(',')]
+    else:
+        worker_counts = sorted({1, 2, 4, cpu_count} & set(range(1, cpu_count + 1)))
+
+    # 在临时目录中导入 database，避免迁移或改动真实数据库
+    sys.path.insert(0, REPO_ROOT)
+    original_cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='login_bench_')
+    os.chdir(workdir)
+    try:
+        import database as db
+
+        # 单次校验耗时（不经过进程池）
+        password_hash = db.hash_password('user1')
+        started = time.perf_counter()
+        for _ in range(5):
+            db.verify_password(password_hash, 'user1')
+        single = (time.perf_counter() - started) / 5
+        print(f"CPU核心数: {cpu_count}，单次 argon2 校验耗时: {single * 1000:.1f} ms")
+        print(f"{'进程数':>6} {'登录/秒':>10} {'每核心登录/秒':>14} {'繁忙拒绝':>8}")
+
+        for workers in worker_counts:
+            ok, busy, elapsed = run_round(db, workers, args.threads, args.seconds)
+            rate = ok / elapsed
+            print(f"{workers:>6} {rate:>10.1f} {rate / workers:>14.1f} {busy:>8}")
+    finally:
+        # 无论测试是否中断都删除临时数据库和上传目录
+        os.chdir(original_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
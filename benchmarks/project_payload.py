@@ -0,0 +1,95 @@
+"""项目列表响应体积与编码耗时基准测试
+
+在临时目录中导入应用，构造一批带元器件和需求的项目，比较完整 JSON、fields 裁剪、
+元器件目录去重以及 msgpack（已安装时）几种响应格式的体积、gzip 后体积和编码耗时。
+
+用法：python benchmarks/project_payload.py [--projects 500] [--components 8] [--catalog 200] [--rounds 20]
+"""
+import argparse
+import gzip
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CARD_FIELDS = {'id', 'name', 'status', 'price', 'board_type', 'updated_at', 'components'}
+
+
+def build_projects(count, components_per_project, catalog_size):
+    """构造与 get_user_projects 返回结构相同的项目列表"""
+    rng = random.Random(42)
+    catalog = [{
+        'id': i,
+        'name': f'元器件{i}',
+        'model': f'MODEL-{i:05d}-X',
+        'price': round(rng.uniform(0.1, 200), 2)
+    } for i in range(1, catalog_size + 1)]
+    projects = []
+    for i in range(1, count + 1):
+        components = [dict(c, quantity=rng.randint(1, 20))
+                      for c in rng.sample(catalog, min(components_per_project, catalog_size))]
+        projects.append({
+            'id': i, 'user_id': 2, 'source': '客户委托', 'name': f'项目{i}', 'price': 1000.0 + i,
+            'board_type': '双层板', 'status': '进行中', 'remark': '备注' * 10,
+            'storage_bytes': 0, 'storage_files': 0, 'change_seq': i,
+            'created_at': '2025-01-01 00:00:00', 'updated_at': '2025-01-02 00:00:00',
+            'user_role': 'owner', 'components': components,
+            'requirements': [{'title': '需求', 'content': '内容' * 20, 'color': '#2196F3'}] * 3,
+            'is_shared_by_me': False, 'is_shared_to_me': False
+        })
+    return projects
+
+
+def measure(encode, payload, rounds):
+    """返回 (字节数, gzip 后字节数, 平均编码耗时毫秒)"""
+    data = encode(payload)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        encode(payload)
+    elapsed = (time.perf_counter() - started) / rounds
+    return len(data), len(gzip.compress(data, compresslevel=6)), elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='项目列表响应体积与编码耗时基准测试')
+    parser.add_argument('--projects', type=int, default=500, help='项目数')
+    parser.add_argument('--components', type=int, default=8, help='每个项目的元器件数')
+    parser.add_argument('--catalog', type=int, default=200, help='元器件库大小')
+    parser.add_argument('--rounds', type=int, default=20, help='每种格式的编码次数')
+    args = parser.parse_args()
+
+    # 在临时目录中导入应用，避免迁移或改动真实数据库
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(tempfile.mkdtemp(prefix='payload_bench_'))
+    import main as app_main
+
+    projects = build_projects(args.projects, args.components, args.catalog)
+    with app_main.app.app_context():
+        json_dumps = app_main.app.json.dumps
+        variants = []
+        for label, fields, refs in (('完整', None, False),
+                                    ('fields 裁剪', CARD_FIELDS, False),
+                                    ('元器件目录', None, True),
+                                    ('裁剪 + 目录', CARD_FIELDS, True)):
+            shaped, catalog = app_main.shape_projects(projects, fields, refs)
+            variants.append((label, {'projects': shaped, 'component_catalog': catalog} if refs else shaped))
+
+        encoders = [('JSON', lambda obj: json_dumps(obj).encode('utf-8'))]
+        if app_main.msgpack is not None:
+            encoders.append(('msgpack', lambda obj: app_main.msgpack.packb(obj, use_bin_type=True)))
+        else:
+            print('未安装 msgpack，跳过 msgpack 格式')
+
+        print(f"{args.projects} 个项目，每个 {args.components} 个元器件，元器件库 {args.catalog} 种")
+        print(f"{'格式':<16} {'编码':<8} {'字节数':>10} {'gzip后':>10} {'编码耗时(ms)':>12}")
+        for label, payload in variants:
+            for name, encode in encoders:
+                size, gz_size, ms = measure(encode, payload, args.rounds)
+                print(f"{label:<16} {name:<8} {size:>10} {gz_size:>10} {ms:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,19 @@
 import sqlite3
 import hashlib
+import hmac
 import os
+import re
 import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta, timezone
 import json
+import multiprocessing
 from contextlib import contextmanager
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHash, VerificationError
 
 DATABASE_PATH = 'pcb_management.db'
 UPLOAD_FOLDER = 'uploads'
@@ -27,12 +36,126 @@ def get_db():
     finally:
         conn.close()
 
+# 每次校验只占用一个CPU核心，便于按核心数规划校验进程池的大小
+PASSWORD_HASHER = PasswordHasher(time_cost=3, memory_cost=64 * 1024, parallelism=1)
+# 旧版本使用的无盐 SHA-256 哈希（64位十六进制）
+LEGACY_PASSWORD_HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+
 def hash_password(password):
-    """密码哈希"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """密码哈希（argon2id）"""
+    return PASSWORD_HASHER.hash(password)
+
+def verify_password(password_hash, password):
+    """校验密码，返回 (是否匹配, 需要更新时的新哈希)
+
+    旧版 SHA-256 哈希或参数已过时的 argon2 哈希在校验通过后会顺带生成新哈希。
+    该函数在密码校验进程池中执行，只做计算，不访问数据库。
+    """
+    if not password_hash:
+        return False, None
+    if LEGACY_PASSWORD_HASH_RE.match(password_hash):
+        legacy_hash = hashlib.sha256(password.encode()).hexdigest()
+        if not hmac.compare_digest(legacy_hash, password_hash):
+            return False, None
+        return True, hash_password(password)
+    try:
+        PASSWORD_HASHER.verify(password_hash, password)
+    except (VerificationError, InvalidHash):
+        return False, None
+    if PASSWORD_HASHER.check_needs_rehash(password_hash):
+        return True, hash_password(password)
+    return True, None
+
+# ==================== 密码校验进程池 ====================
+
+class PasswordVerifyBusy(Exception):
+    """密码校验排队已满或等待超时"""
+
+_password_pool = None
+_password_pool_lock = threading.Lock()
+_password_pool_state = {'workers': 2, 'max_pending': 32, 'timeout': 10, 'pending': 0}
+# 用户不存在时也执行一次同等开销的校验，避免通过响应时间探测用户名
+_dummy_password_hash = None
+
+# 创建进程池的进程把自己的 PID 写入该环境变量，由它启动的子进程（包括 forkserver 及其子进程）继承这个标记
+PASSWORD_POOL_OWNER_ENV = 'PCB_PASSWORD_POOL_OWNER'
+
+def in_pool_worker():
+    """当前进程是否为密码校验进程池的子进程；子进程导入模块时只需要函数定义，不访问数据库也不启动后台线程
+
+    只认创建进程池时设置的 PASSWORD_POOL_OWNER_ENV 标记，其他由 multiprocessing 启动的进程（如多进程部署的 worker）照常初始化
+    """
+    owner = os.environ.get(PASSWORD_POOL_OWNER_ENV)
+    return (owner is not None and owner != str(os.getpid()) and
+            multiprocessing.parent_process() is not None)
+
+def _password_pool_context():
+    """子进程用 forkserver（不支持时用 spawn）启动，不继承 worker 进程中的线程、锁和数据库连接"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+def configure_password_pool(workers, max_pending, timeout):
+    """设置密码校验进程池大小、排队上限与等待超时（秒），进程数变化时下次提交重建进程池"""
+    global _password_pool
+    with _password_pool_lock:
+        old_pool = _password_pool
+        if old_pool is not None and _password_pool_state['workers'] != max(1, workers):
+            _password_pool = None
+        else:
+            old_pool = None
+        _password_pool_state.update(workers=max(1, workers), max_pending=max(1, max_pending),
+                                    timeout=timeout)
+    if old_pool is not None:
+        old_pool.shutdown(wait=False)
+
+def _release_password_slot(future):
+    with _password_pool_lock:
+        _password_pool_state['pending'] -= 1
+
+def _submit_password_verify(password_hash, password):
+    """提交到进程池，超过排队上限时直接拒绝而不是无限堆积"""
+    global _password_pool
+    with _password_pool_lock:
+        if _password_pool_state['pending'] >= _password_pool_state['max_pending']:
+            raise PasswordVerifyBusy('登录请求过多，请稍后重试')
+        if _password_pool is None:
+            # 子进程启动前设置标记，子进程导入 database / main 时据此跳过迁移和后台线程
+            os.environ[PASSWORD_POOL_OWNER_ENV] = str(os.getpid())
+            _password_pool = ProcessPoolExecutor(max_workers=_password_pool_state['workers'],
+                                                 mp_context=_password_pool_context())
+        pool = _password_pool
+        _password_pool_state['pending'] += 1
+    try:
+        future = pool.submit(verify_password, password_hash, password)
+    except BaseException:
+        _release_password_slot(None)
+        raise
+    future.add_done_callback(_release_password_slot)
+    return pool, future
+
+def _reset_password_pool(pool):
+    """子进程异常退出后进程池不可再用，丢弃后下次提交时重建"""
+    global _password_pool
+    with _password_pool_lock:
+        if _password_pool is pool:
+            _password_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def verify_password_pooled(password_hash, password):
+    """在密码校验进程池中校验密码，返回值同 verify_password"""
+    for attempt in range(2):
+        pool, future = _submit_password_verify(password_hash, password)
+        try:
+            return future.result(timeout=_password_pool_state['timeout'])
+        except FutureTimeoutError:
+            raise PasswordVerifyBusy('登录请求过多，请稍后重试')
+        except BrokenProcessPool:
+            _reset_password_pool(pool)
+            if attempt:
+                raise
 
 def cleanup_orphaned_records():
-    """清理数据库中的孤立记录"""
+    """清理数据库中的孤立记录，返回各类清理数量"""
     with get_db() as conn:
         cursor = conn.cursor()
         
@@ -73,11 +196,25 @@ def cleanup_orphaned_records():
         
         conn.commit()
         
-        print(f"清理了 {orphaned_components} 条孤立的项目元器件记录")
-        print(f"清理了 {orphaned_requirements} 条孤立的项目需求记录")
-        print(f"清理了 {orphaned_collaborations} 条孤立的项目协作记录")
-        print(f"清理了 {orphaned_shares} 条孤立的分享记录")
-        print(f"清理了 {orphaned_sessions} 条孤立的上传会话记录")
+        # 定时清理时只输出有实际清理的项目，避免日志刷屏
+        if orphaned_components:
+            print(f"清理了 {orphaned_components} 条孤立的项目元器件记录")
+        if orphaned_requirements:
+            print(f"清理了 {orphaned_requirements} 条孤立的项目需求记录")
+        if orphaned_collaborations:
+            print(f"清理了 {orphaned_collaborations} 条孤立的项目协作记录")
+        if orphaned_shares:
+            print(f"清理了 {orphaned_shares} 条孤立的分享记录")
+        if orphaned_sessions:
+            print(f"清理了 {orphaned_sessions} 条孤立的上传会话记录")
+        
+        return {
+            'components': orphaned_components,
+            'requirements': orphaned_requirements,
+            'collaborations': orphaned_collaborations,
+            'shares': orphaned_shares,
+            'upload_sessions': orphaned_sessions
+        }
 
 def init_database():
     """初始化数据库表结构和基础数据"""
@@ -91,6 +228,9 @@ def init_database():
                 username TEXT UNIQUE NOT NULL,
                 password_hash TEXT NOT NULL,
                 is_admin BOOLEAN DEFAULT FALSE,
+                storage_bytes INTEGER NOT NULL DEFAULT 0,
+                storage_files INTEGER NOT NULL DEFAULT 0,
+                storage_quota_bytes INTEGER DEFAULT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
@@ -106,6 +246,10 @@ def init_database():
                 board_type TEXT NOT NULL,
                 status TEXT NOT NULL,
                 remark TEXT,
+                storage_bytes INTEGER NOT NULL DEFAULT 0,
+                storage_files INTEGER NOT NULL DEFAULT 0,
+                change_seq INTEGER NOT NULL DEFAULT 0,
+                bom_total REAL NOT NULL DEFAULT 0,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users (id)
@@ -154,6 +298,7 @@ def init_database():
                 owner_id INTEGER NOT NULL,
                 password_hash TEXT,
                 expire_time TIMESTAMP,
+                expire_at INTEGER, -- 过期时间戳（秒），NULL 表示永不过期
                 access_count INTEGER DEFAULT 0,
                 max_access_count INTEGER DEFAULT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -188,6 +333,7 @@ def init_database():
                 temp_dir TEXT NOT NULL,
                 total_files INTEGER NOT NULL,
                 uploaded_files INTEGER DEFAULT 0,
+                uploaded_bytes INTEGER NOT NULL DEFAULT 0,
                 file_list TEXT, -- JSON格式存储文件列表
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users (id),
@@ -245,22 +391,509 @@ def init_database():
         conn.commit()
         print("Database initialized successfully")
         
+        # 执行表结构迁移
+        migrate_database()
+
+def iso_to_epoch(iso_string):
+    """将 ISO 时间字符串转换为时间戳（无时区信息时按北京时间处理），无法解析时返回 None"""
+    if not iso_string:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(iso_string).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone(timedelta(hours=8)))
+    return int(dt.timestamp())
+
+def add_column_if_missing(cursor, table, column, definition):
+    """为已有表添加字段（如果不存在），返回是否新增"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    if column in [row[1] for row in cursor.fetchall()]:
+        return False
+    cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    print(f"Added {column} column to {table} table")
+    return True
+
+def cache_version_bump_sql(name):
+    """生成递增指定缓存版本号的 SQL（供触发器使用）"""
+    return f'''
+        INSERT INTO cache_versions (name, version) VALUES ('{name}', 1)
+        ON CONFLICT(name) DO UPDATE SET version = version + 1;
+    '''
+
+def project_change_sql(project_ids, touch=False):
+    """生成递增全局项目变更序号并标记指定项目的 SQL（project_ids 为单个表达式或子查询，供触发器使用）
+
+    touch 为 True 时同时更新项目的 updated_at（元器件、需求变化视为项目被修改）
+    """
+    touch_sql = ', updated_at = CURRENT_TIMESTAMP' if touch else ''
+    return f'''
+        {cache_version_bump_sql('project_changes')}
+        UPDATE projects 
+        SET change_seq = (SELECT version FROM cache_versions WHERE name = 'project_changes'){touch_sql}
+        WHERE id IN ({project_ids});
+    '''
+
+def project_tombstone_sql(project_id, user_id, condition='1'):
+    """生成记录"项目对某用户不再可见"的 SQL（供触发器使用）"""
+    return f'''
+        {cache_version_bump_sql('project_changes')}
+        INSERT INTO project_tombstones (project_id, user_id, change_seq, created_at)
+        SELECT {project_id}, {user_id}, version, CAST(strftime('%s', 'now') AS INTEGER)
+        FROM cache_versions WHERE name = 'project_changes' AND ({condition})
+        ON CONFLICT(project_id, user_id) DO UPDATE SET 
+            change_seq = excluded.change_seq, created_at = excluded.created_at;
+    '''
+
+def project_bom_total_sql(project_ids):
+    """生成按当前元器件单价重新计算指定项目元器件总价的 SQL（project_ids 为单个表达式或子查询，供触发器使用）"""
+    return f'''
+        UPDATE projects SET bom_total = (
+            SELECT COALESCE(SUM(c.price * pc.quantity), 0)
+            FROM project_components pc JOIN components c ON c.id = pc.component_id
+            WHERE pc.project_id = projects.id
+        )
+        WHERE id IN ({project_ids});
+    '''
+
+def project_fts_refresh_sql(project_ids):
+    """生成重建指定项目全文索引行的 SQL（project_ids 为单个表达式或子查询，供触发器使用）"""
+    return f'''
+        DELETE FROM projects_fts WHERE rowid IN ({project_ids});
+        INSERT INTO projects_fts (rowid, name, remark, requirements, components)
+        SELECT p.id, p.name, COALESCE(p.remark, ''),
+               COALESCE((SELECT GROUP_CONCAT(pr.title || ' ' || pr.content, ' ')
+                         FROM project_requirements pr WHERE pr.project_id = p.id), ''),
+               COALESCE((SELECT GROUP_CONCAT(c.name || ' ' || c.model, ' ')
+                         FROM project_components pc JOIN components c ON c.id = pc.component_id
+                         WHERE pc.project_id = p.id), '')
+        FROM projects p WHERE p.id IN ({project_ids});
+    '''
+
+def migrate_database():
+    """迁移已有数据库的表结构（可重复执行）"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        
         # 迁移：为现有的shares表添加新字段（如果不存在）
+        add_column_if_missing(cursor, 'shares', 'access_count', 'INTEGER DEFAULT 0')
+        add_column_if_missing(cursor, 'shares', 'max_access_count', 'INTEGER DEFAULT NULL')
+        
+        # 过期时间以整数时间戳存储并建立索引，便于定时批量清理和快速比较
+        if add_column_if_missing(cursor, 'shares', 'expire_at', 'INTEGER'):
+            cursor.execute('SELECT id, expire_time FROM shares WHERE expire_time IS NOT NULL')
+            cursor.executemany('UPDATE shares SET expire_at = ? WHERE id = ?',
+                               [(iso_to_epoch(row['expire_time']), row['id']) for row in cursor.fetchall()])
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_shares_expire_at ON shares (expire_at)')
+        
+        # 存储空间统计：项目和用户的字节数、文件数，以及可选的用户配额
+        storage_added = add_column_if_missing(cursor, 'projects', 'storage_bytes', 'INTEGER NOT NULL DEFAULT 0')
+        add_column_if_missing(cursor, 'projects', 'storage_files', 'INTEGER NOT NULL DEFAULT 0')
+        add_column_if_missing(cursor, 'projects', 'change_seq', 'INTEGER NOT NULL DEFAULT 0')
+        add_column_if_missing(cursor, 'users', 'storage_bytes', 'INTEGER NOT NULL DEFAULT 0')
+        add_column_if_missing(cursor, 'users', 'storage_files', 'INTEGER NOT NULL DEFAULT 0')
+        add_column_if_missing(cursor, 'users', 'storage_quota_bytes', 'INTEGER DEFAULT NULL')
+        add_column_if_missing(cursor, 'upload_sessions', 'uploaded_bytes', 'INTEGER NOT NULL DEFAULT 0')
+        
+        # 文件预览缓存索引表（file_key 由文件路径、大小和修改时间计算，预览文件按内容哈希命名）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS file_previews (
+                file_key TEXT PRIMARY KEY,
+                content_hash TEXT,
+                preview_file TEXT,
+                status TEXT NOT NULL, -- ready, failed, unsupported
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # 记录源文件路径，供清理任务判断源文件是否已被删除或替换
+        add_column_if_missing(cursor, 'file_previews', 'source_path', 'TEXT')
+        # 连续生成失败的次数及最近一次失败的时间戳，失败的预览按退避时间重试
+        add_column_if_missing(cursor, 'file_previews', 'attempts', 'INTEGER NOT NULL DEFAULT 0')
+        add_column_if_missing(cursor, 'file_previews', 'failed_at', 'INTEGER')
+        
+        # 项目文件索引表（用于跨项目按文件名搜索）
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'project_files'")
+        file_index_added = cursor.fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS project_files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                name TEXT NOT NULL COLLATE NOCASE,
+                size INTEGER NOT NULL DEFAULT 0,
+                modified_at INTEGER,
+                FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE,
+                UNIQUE(project_id, path)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_project_files_name ON project_files (name)')
+        
+        # 文件路径的 trigram 全文索引（SQLite 3.34+ 支持），用于任意子串匹配
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS project_files_fts USING fts5(
+                    path, content='project_files', content_rowid='id', tokenize='trigram'
+                )
+            ''')
+            cursor.executescript('''
+                CREATE TRIGGER IF NOT EXISTS project_files_ai AFTER INSERT ON project_files BEGIN
+                    INSERT INTO project_files_fts (rowid, path) VALUES (new.id, new.path);
+                END;
+                CREATE TRIGGER IF NOT EXISTS project_files_ad AFTER DELETE ON project_files BEGIN
+                    INSERT INTO project_files_fts (project_files_fts, rowid, path) VALUES ('delete', old.id, old.path);
+                END;
+                CREATE TRIGGER IF NOT EXISTS project_files_au AFTER UPDATE ON project_files BEGIN
+                    INSERT INTO project_files_fts (project_files_fts, rowid, path) VALUES ('delete', old.id, old.path);
+                    INSERT INTO project_files_fts (rowid, path) VALUES (new.id, new.path);
+                END;
+            ''')
+        except sqlite3.OperationalError as e:
+            # 旧版本 SQLite 不支持 trigram 分词器时退化为 LIKE 查询
+            print(f"文件名全文索引不可用，将使用 LIKE 查询: {e}")
+        
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_projects_user_id ON projects (user_id)')
+        
+        # 缓存版本号表：多个 worker 进程通过比较版本号判断本地缓存是否失效
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cache_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        
+        # 共享事件表：任一 worker 写入，所有 worker 的后台线程按自增ID顺序读取并推送给本进程的页面
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS app_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                type TEXT NOT NULL,
+                data TEXT NOT NULL,
+                user_ids TEXT,  -- JSON 数组，NULL 表示所有用户
+                created_at INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_app_events_created_at ON app_events (created_at)')
+        
+        # 状态、来源、电路板类型配置变化时递增 config 版本号
+        for config_table in ('status_config', 'source_config', 'board_type_config'):
+            cursor.executescript(f'''
+                CREATE TRIGGER IF NOT EXISTS {config_table}_version_ai AFTER INSERT ON {config_table} BEGIN
+                    {cache_version_bump_sql('config')}
+                END;
+                CREATE TRIGGER IF NOT EXISTS {config_table}_version_ad AFTER DELETE ON {config_table} BEGIN
+                    {cache_version_bump_sql('config')}
+                END;
+                CREATE TRIGGER IF NOT EXISTS {config_table}_version_au AFTER UPDATE ON {config_table} BEGIN
+                    {cache_version_bump_sql('config')}
+                END;
+            ''')
+        
+        # 元器件库、用户设置、用户存储用量变化时递增对应版本号（用于接口 ETag）
+        for table, version_name in (('components', 'components'), ('user_settings', 'user_settings')):
+            cursor.executescript(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_version_ai AFTER INSERT ON {table} BEGIN
+                    {cache_version_bump_sql(version_name)}
+                END;
+                CREATE TRIGGER IF NOT EXISTS {table}_version_ad AFTER DELETE ON {table} BEGIN
+                    {cache_version_bump_sql(version_name)}
+                END;
+                CREATE TRIGGER IF NOT EXISTS {table}_version_au AFTER UPDATE ON {table} BEGIN
+                    {cache_version_bump_sql(version_name)}
+                END;
+            ''')
+        cursor.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS users_storage_version_au
+            AFTER UPDATE OF storage_bytes, storage_files, storage_quota_bytes ON users BEGIN
+                {cache_version_bump_sql('users')}
+            END;
+        ''')
+
+        # 元器件目录搜索：名称索引支持按 (name, id) 键集分页，trigram 全文索引支持名称和型号的任意子串匹配
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_components_name ON components (name)')
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'component_search_fts'")
+        component_index_added = cursor.fetchone() is None
         try:
-            cursor.execute('SELECT access_count FROM shares LIMIT 1')
-        except sqlite3.OperationalError:
-            # 字段不存在，需要添加
-            cursor.execute('ALTER TABLE shares ADD COLUMN access_count INTEGER DEFAULT 0')
-            print("Added access_count column to shares table")
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS component_search_fts USING fts5(
+                    name, model, content='components', content_rowid='id', tokenize='trigram'
+                )
+            ''')
+            cursor.executescript('''
+                CREATE TRIGGER IF NOT EXISTS component_search_fts_ai AFTER INSERT ON components BEGIN
+                    INSERT INTO component_search_fts (rowid, name, model) VALUES (new.id, new.name, new.model);
+                END;
+                CREATE TRIGGER IF NOT EXISTS component_search_fts_ad AFTER DELETE ON components BEGIN
+                    INSERT INTO component_search_fts (component_search_fts, rowid, name, model)
+                    VALUES ('delete', old.id, old.name, old.model);
+                END;
+                CREATE TRIGGER IF NOT EXISTS component_search_fts_au AFTER UPDATE OF name, model ON components BEGIN
+                    INSERT INTO component_search_fts (component_search_fts, rowid, name, model)
+                    VALUES ('delete', old.id, old.name, old.model);
+                    INSERT INTO component_search_fts (rowid, name, model) VALUES (new.id, new.name, new.model);
+                END;
+            ''')
+            if component_index_added:
+                cursor.execute("INSERT INTO component_search_fts (component_search_fts) VALUES ('rebuild')")
+                print("Built component_search_fts full-text index")
+        except sqlite3.OperationalError as e:
+            print(f"元器件全文索引不可用，将使用 LIKE 查询: {e}")
+
+        # 服务端会话表：浏览器 Cookie 中只保存会话ID，会话数据和过期时间戳保存在这里
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_sessions (
+                id TEXT PRIMARY KEY,
+                user_id INTEGER,
+                data TEXT NOT NULL,
+                expires_at INTEGER NOT NULL,
+                updated_at INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_sessions_user_id ON user_sessions (user_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_sessions_expires_at ON user_sessions (expires_at)')
+        
+        # 会话变更记录：会话被修改、续期或删除时由触发器追加一行，各 worker 的同步线程据此只淘汰对应的缓存条目
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS session_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                created_at INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_session_changes_created_at ON session_changes (created_at)')
+        # 清理任务删除已过期的会话时无需通知（缓存中的过期条目本来就会被丢弃）
+        cursor.executescript('''
+            CREATE TRIGGER IF NOT EXISTS user_sessions_change_au AFTER UPDATE ON user_sessions BEGIN
+                INSERT INTO session_changes (session_id, created_at)
+                VALUES (OLD.id, CAST(strftime('%s', 'now') AS INTEGER));
+            END;
+            CREATE TRIGGER IF NOT EXISTS user_sessions_change_ad AFTER DELETE ON user_sessions
+            WHEN OLD.expires_at > CAST(strftime('%s', 'now') AS INTEGER) BEGIN
+                INSERT INTO session_changes (session_id, created_at)
+                VALUES (OLD.id, CAST(strftime('%s', 'now') AS INTEGER));
+            END;
+        ''')
+        
+        # 分享访问日志（只追加）及按小时、按天汇总的统计表；不设外键，分享取消后统计仍然保留
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS share_access_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                share_id TEXT NOT NULL,
+                project_id INTEGER,
+                ts INTEGER NOT NULL,
+                ip_hash TEXT,
+                event TEXT NOT NULL, -- view, list, file, zip
+                file_path TEXT,
+                bytes_sent INTEGER NOT NULL DEFAULT 0,
+                status INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_share_access_log_ts ON share_access_log (ts)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_share_access_log_project ON share_access_log (project_id, ts)')
+        for rollup_table in ('share_access_hourly', 'share_access_daily'):
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {rollup_table} (
+                    project_id INTEGER NOT NULL,
+                    share_id TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    requests INTEGER NOT NULL DEFAULT 0,
+                    downloads INTEGER NOT NULL DEFAULT 0,
+                    bytes_sent INTEGER NOT NULL DEFAULT 0,
+                    errors INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (project_id, bucket, share_id)
+                )
+            ''')
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{rollup_table}_bucket ON {rollup_table} (bucket)')
+        
+        # 分享信息（含项目名、所有者用户名）变化时由触发器递增 shares 版本号，级联删除同样会触发
+        cursor.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS shares_version_ai AFTER INSERT ON shares BEGIN
+                {cache_version_bump_sql('shares')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS shares_version_ad AFTER DELETE ON shares BEGIN
+                {cache_version_bump_sql('shares')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS shares_version_au
+            AFTER UPDATE OF project_id, owner_id, password_hash, expire_time, max_access_count ON shares BEGIN
+                {cache_version_bump_sql('shares')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS projects_shares_version_au AFTER UPDATE OF name ON projects BEGIN
+                {cache_version_bump_sql('shares')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS users_shares_version_au AFTER UPDATE OF username ON users BEGIN
+                {cache_version_bump_sql('shares')}
+            END;
+        ''')
         
+        # 项目归属或协作关系变化时递增 project_access 版本号，删除用户/项目的级联删除同样会触发
+        cursor.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS project_collaborations_access_ai AFTER INSERT ON project_collaborations BEGIN
+                {cache_version_bump_sql('project_access')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS project_collaborations_access_ad AFTER DELETE ON project_collaborations BEGIN
+                {cache_version_bump_sql('project_access')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS project_collaborations_access_au
+            AFTER UPDATE OF project_id, collaborator_id, permission ON project_collaborations BEGIN
+                {cache_version_bump_sql('project_access')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS projects_access_ai AFTER INSERT ON projects BEGIN
+                {cache_version_bump_sql('project_access')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS projects_access_ad AFTER DELETE ON projects BEGIN
+                {cache_version_bump_sql('project_access')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS projects_access_au AFTER UPDATE OF user_id ON projects BEGIN
+                {cache_version_bump_sql('project_access')}
+            END;
+        ''')
+        
+        # 项目增量同步：任何影响项目列表内容的修改都会给项目打上新的全局变更序号，
+        # 项目对某个用户不再可见（删除、移除协作者）时写入墓碑记录
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS project_tombstones (
+                project_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                change_seq INTEGER NOT NULL,
+                created_at INTEGER NOT NULL,
+                PRIMARY KEY (project_id, user_id)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_project_tombstones_user ON project_tombstones (user_id, change_seq)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_project_tombstones_created_at ON project_tombstones (created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_projects_user_change_seq ON projects (user_id, change_seq)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_project_collaborations_collaborator ON project_collaborations (collaborator_id)')
+        cursor.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS projects_changes_ai AFTER INSERT ON projects BEGIN
+                {project_change_sql('NEW.id')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS projects_changes_au
+            AFTER UPDATE OF user_id, source, name, price, board_type, status, remark, storage_bytes, storage_files
+            ON projects BEGIN
+                {project_change_sql('NEW.id')}
+                {project_tombstone_sql('OLD.id', 'OLD.user_id', 'OLD.user_id != NEW.user_id')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS projects_changes_ad AFTER DELETE ON projects BEGIN
+                {project_tombstone_sql('OLD.id', 'OLD.user_id')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS project_components_changes_ai AFTER INSERT ON project_components BEGIN
+                {project_change_sql('NEW.project_id', touch=True)}
+            END;
+            CREATE TRIGGER IF NOT EXISTS project_components_changes_au AFTER UPDATE ON project_components BEGIN
+                {project_change_sql('NEW.project_id', touch=True)}
+            END;
+            CREATE TRIGGER IF NOT EXISTS project_components_changes_ad AFTER DELETE ON project_components BEGIN
+                {project_change_sql('OLD.project_id', touch=True)}
+            END;
+            CREATE TRIGGER IF NOT EXISTS project_requirements_changes_ai AFTER INSERT ON project_requirements BEGIN
+                {project_change_sql('NEW.project_id', touch=True)}
+            END;
+            CREATE TRIGGER IF NOT EXISTS project_requirements_changes_au AFTER UPDATE ON project_requirements BEGIN
+                {project_change_sql('NEW.project_id', touch=True)}
+            END;
+            CREATE TRIGGER IF NOT EXISTS project_requirements_changes_ad AFTER DELETE ON project_requirements BEGIN
+                {project_change_sql('OLD.project_id', touch=True)}
+            END;
+            CREATE TRIGGER IF NOT EXISTS components_project_changes_au AFTER UPDATE OF name, model, price ON components BEGIN
+                {project_change_sql('SELECT project_id FROM project_components WHERE component_id = NEW.id')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS users_project_changes_au AFTER UPDATE OF username ON users BEGIN
+                {project_change_sql('SELECT id FROM projects WHERE user_id = NEW.id')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS project_collaborations_changes_ai AFTER INSERT ON project_collaborations BEGIN
+                {project_change_sql('NEW.project_id')}
+                DELETE FROM project_tombstones WHERE project_id = NEW.project_id AND user_id = NEW.collaborator_id;
+            END;
+            CREATE TRIGGER IF NOT EXISTS project_collaborations_changes_au AFTER UPDATE OF permission ON project_collaborations BEGIN
+                {project_change_sql('NEW.project_id')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS project_collaborations_changes_ad AFTER DELETE ON project_collaborations BEGIN
+                {project_change_sql('OLD.project_id')}
+                {project_tombstone_sql('OLD.project_id', 'OLD.collaborator_id')}
+            END;
+        ''')
+        
+        # 项目元器件总价（bom_total）：元器件清单变化时只重新计算该项目，
+        # 元器件单价变化时用一条语句更新所有用到它的项目，统计和元器件详情直接读取该字段
+        add_column_if_missing(cursor, 'projects', 'bom_total', 'REAL NOT NULL DEFAULT 0')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_project_components_project ON project_components (project_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_project_components_component ON project_components (component_id)')
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name = 'project_components_bom_ai'")
+        bom_triggers_added = cursor.fetchone() is None
+        cursor.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS project_components_bom_ai AFTER INSERT ON project_components BEGIN
+                {project_bom_total_sql('NEW.project_id')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS project_components_bom_au
+            AFTER UPDATE OF project_id, component_id, quantity ON project_components BEGIN
+                {project_bom_total_sql('NEW.project_id, OLD.project_id')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS project_components_bom_ad AFTER DELETE ON project_components BEGIN
+                {project_bom_total_sql('OLD.project_id')}
+            END;
+            CREATE TRIGGER IF NOT EXISTS components_bom_au AFTER UPDATE OF price ON components
+            WHEN NEW.price IS NOT OLD.price BEGIN
+                {project_bom_total_sql('SELECT project_id FROM project_components WHERE component_id = NEW.id')}
+            END;
+        ''')
+        if bom_triggers_added:
+            # 触发器创建之前已有的项目一次性回填
+            cursor.executescript(project_bom_total_sql('SELECT id FROM projects'))
+            print("Backfilled projects.bom_total")
+        
+        # 项目全文索引：名称、备注、需求标题与内容、元器件名称与型号，rowid 即项目ID
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'projects_fts'")
+        project_index_added = cursor.fetchone() is None
         try:
-            cursor.execute('SELECT max_access_count FROM shares LIMIT 1')
-        except sqlite3.OperationalError:
-            # 字段不存在，需要添加
-            cursor.execute('ALTER TABLE shares ADD COLUMN max_access_count INTEGER DEFAULT NULL')
-            print("Added max_access_count column to shares table")
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5(
+                    name, remark, requirements, components, tokenize='trigram'
+                )
+            ''')
+            cursor.executescript(f'''
+                CREATE TRIGGER IF NOT EXISTS projects_fts_ai AFTER INSERT ON projects BEGIN
+                    {project_fts_refresh_sql('new.id')}
+                END;
+                CREATE TRIGGER IF NOT EXISTS projects_fts_au AFTER UPDATE OF name, remark ON projects BEGIN
+                    {project_fts_refresh_sql('new.id')}
+                END;
+                CREATE TRIGGER IF NOT EXISTS projects_fts_ad AFTER DELETE ON projects BEGIN
+                    DELETE FROM projects_fts WHERE rowid = old.id;
+                END;
+                CREATE TRIGGER IF NOT EXISTS project_requirements_fts_ai AFTER INSERT ON project_requirements BEGIN
+                    {project_fts_refresh_sql('new.project_id')}
+                END;
+                CREATE TRIGGER IF NOT EXISTS project_requirements_fts_au AFTER UPDATE ON project_requirements BEGIN
+                    {project_fts_refresh_sql('old.project_id')}
+                    {project_fts_refresh_sql('new.project_id')}
+                END;
+                CREATE TRIGGER IF NOT EXISTS project_requirements_fts_ad AFTER DELETE ON project_requirements BEGIN
+                    {project_fts_refresh_sql('old.project_id')}
+                END;
+                CREATE TRIGGER IF NOT EXISTS project_components_fts_ai AFTER INSERT ON project_components BEGIN
+                    {project_fts_refresh_sql('new.project_id')}
+                END;
+                CREATE TRIGGER IF NOT EXISTS project_components_fts_ad AFTER DELETE ON project_components BEGIN
+                    {project_fts_refresh_sql('old.project_id')}
+                END;
+                CREATE TRIGGER IF NOT EXISTS components_fts_au AFTER UPDATE OF name, model ON components BEGIN
+                    {project_fts_refresh_sql('SELECT project_id FROM project_components WHERE component_id = new.id')}
+                END;
+            ''')
+            if project_index_added:
+                cursor.executescript(project_fts_refresh_sql('SELECT id FROM projects'))
+                print("Built projects_fts full-text index")
+        except sqlite3.OperationalError as e:
+            print(f"项目全文索引不可用，将使用 LIKE 查询: {e}")
         
         conn.commit()
+        
+        # 首次添加存储统计字段时，扫描一次磁盘回填已有项目的数据
+        if storage_added:
+            rebuild_storage_usage()
+        
+        # 首次创建文件索引表时，扫描一次磁盘建立索引
+        if file_index_added:
+            rebuild_file_index()
 
 def insert_initial_data(conn):
     """插入初始数据"""
@@ -482,15 +1115,36 @@ def insert_initial_data(conn):
 # ==================== 用户相关操作 ====================
 
 def authenticate_user(username, password):
-    """用户认证"""
+    """用户认证，密码校验在进程池中执行；排队已满时抛出 PasswordVerifyBusy"""
+    global _dummy_password_hash
     with get_db() as conn:
         cursor = conn.cursor()
-        password_hash = hash_password(password)
         cursor.execute('''
-            SELECT id, username, is_admin FROM users 
-            WHERE username = ? AND password_hash = ?
-        ''', (username, password_hash))
-        return cursor.fetchone()
+            SELECT id, username, is_admin, password_hash FROM users 
+            WHERE username = ?
+        ''', (username,))
+        user = cursor.fetchone()
+    
+    if not user:
+        if _dummy_password_hash is None:
+            _dummy_password_hash = hash_password(os.urandom(16).hex())
+        verify_password_pooled(_dummy_password_hash, password)
+        return None
+    
+    matched, new_hash = verify_password_pooled(user['password_hash'], password)
+    if not matched:
+        return None
+    
+    if new_hash:
+        # 旧哈希透明升级；期间密码已被修改则保留新密码
+        with get_db() as conn:
+            conn.execute('''
+                UPDATE users SET password_hash = ?
+                WHERE id = ? AND password_hash = ?
+            ''', (new_hash, user['id'], user['password_hash']))
+            conn.commit()
+    
+    return {'id': user['id'], 'username': user['username'], 'is_admin': user['is_admin']}
 
 def get_user_by_id(user_id):
     """根据ID获取用户信息"""
@@ -511,7 +1165,8 @@ def get_all_users():
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT id, username, is_admin, created_at FROM users 
+            SELECT id, username, is_admin, storage_bytes, storage_files, storage_quota_bytes, created_at 
+            FROM users 
             ORDER BY created_at DESC
         ''')
         return [dict(row) for row in cursor.fetchall()]
@@ -538,15 +1193,17 @@ def create_user(username, password, is_admin=False):
         except Exception as e:
             return None, f"创建用户失败: {str(e)}"
 
-def update_user(user_id, username=None, password=None, is_admin=None):
-    """更新用户信息（管理员功能）"""
+def update_user(user_id, username=None, password=None, is_admin=None, storage_quota_bytes=None):
+    """更新用户信息（管理员功能），storage_quota_bytes 为 0 表示取消配额限制"""
     with get_db() as conn:
         cursor = conn.cursor()
         
-        # 检查用户是否存在
-        cursor.execute('SELECT id FROM users WHERE id = ?', (user_id,))
-        if not cursor.fetchone():
+        # 检查用户是否存在（记录原用户名，改名时需要同步移动上传目录）
+        cursor.execute('SELECT username FROM users WHERE id = ?', (user_id,))
+        user = cursor.fetchone()
+        if not user:
             return False, "用户不存在"
+        old_username = user['username']
         
         # 构建更新语句
         update_fields = []
@@ -569,6 +1226,10 @@ def update_user(user_id, username=None, password=None, is_admin=None):
             update_fields.append('is_admin = ?')
             update_values.append(is_admin)
         
+        if storage_quota_bytes is not None:
+            update_fields.append('storage_quota_bytes = ?')
+            update_values.append(storage_quota_bytes if storage_quota_bytes > 0 else None)
+        
         if not update_fields:
             return False, "没有需要更新的字段"
         
@@ -579,9 +1240,42 @@ def update_user(user_id, username=None, password=None, is_admin=None):
         try:
             cursor.execute(sql, update_values)
             conn.commit()
-            return True, "用户信息更新成功"
         except Exception as e:
             return False, f"更新用户失败: {str(e)}"
+        
+        if username is not None and username != old_username:
+            cursor.execute('SELECT name FROM projects WHERE user_id = ?', (user_id,))
+            rename_user_upload_folders(old_username, username, [row['name'] for row in cursor.fetchall()])
+        return True, "用户信息更新成功"
+
+def rename_user_upload_folders(old_username, new_username, project_names):
+    """用户改名后移动 uploads/<原用户名>/，并把其中的项目文件夹重命名为 <新用户名>-<项目名>"""
+    old_dir = os.path.join(UPLOAD_FOLDER, old_username)
+    new_dir = os.path.join(UPLOAD_FOLDER, new_username)
+    if not os.path.isdir(old_dir):
+        return
+    if os.path.exists(new_dir):
+        # 不合并目录，留给管理员处理；原目录不属于任何现有用户，孤立文件夹清理会跳过它
+        print(f"目标上传目录已存在，未移动用户目录: {old_dir} -> {new_dir}")
+        return
+    try:
+        os.rename(old_dir, new_dir)
+    except Exception as e:
+        print(f"移动用户上传目录时出错: {e}")
+        return
+    
+    for name in project_names:
+        old_folder = os.path.join(new_dir, f"{old_username}-{name}")
+        new_folder = os.path.join(new_dir, f"{new_username}-{name}")
+        if os.path.exists(old_folder) and not os.path.exists(new_folder):
+            try:
+                # 项目名包含 / 时文件夹是嵌套的，先创建上级目录
+                os.makedirs(os.path.dirname(new_folder), exist_ok=True)
+                os.rename(old_folder, new_folder)
+                if os.path.dirname(old_folder) != new_dir:
+                    os.removedirs(os.path.dirname(old_folder))
+            except Exception as e:
+                print(f"重命名项目文件夹时出错: {e}")
 
 def delete_user(user_id):
     """删除用户（管理员功能）"""
@@ -654,7 +1348,8 @@ def delete_project_admin(project_id, user_id):
         # 4. 清理相关的临时上传文件夹
         cleanup_temp_upload_folders(username, project_name)
         
-        # 5. 删除项目记录
+        # 5. 扣除所有者的存储用量并删除项目记录
+        release_project_storage(cursor, project_id)
         cursor.execute('DELETE FROM projects WHERE id = ?', (project_id,))
         
         conn.commit()
@@ -688,112 +1383,253 @@ def get_user_stats_admin():
         cursor.execute('SELECT COUNT(*) FROM shares')
         total_shares = cursor.fetchone()[0]
         
+        # 总存储用量
+        cursor.execute('SELECT COALESCE(SUM(storage_bytes), 0), COALESCE(SUM(storage_files), 0) FROM users')
+        total_storage_bytes, total_storage_files = cursor.fetchone()
+        
         return {
             'total_users': total_users,
             'admin_count': admin_count,
             'regular_users': regular_users,
             'total_projects': total_projects,
             'active_projects': active_projects,
-            'total_shares': total_shares
+            'total_shares': total_shares,
+            'total_storage_bytes': total_storage_bytes,
+            'total_storage_files': total_storage_files
         }
 
 # ==================== 项目相关操作 ====================
 
 def get_user_projects(user_id):
     """获取用户的所有项目（包含拥有的和协作的项目）"""
+    with get_db() as conn:
+        return fetch_user_projects(conn.cursor(), user_id)
+
+def get_user_projects_by_ids(user_id, project_ids):
+    """获取用户可见项目中指定ID的项目（结构与 get_user_projects 相同）"""
+    with get_db() as conn:
+        return fetch_user_projects(conn.cursor(), user_id, project_ids=project_ids)
+
+def get_user_project_stamps(user_id):
+    """读取同步令牌和用户可见项目的 (id, change_seq, user_role)，顺序与 get_user_projects 相同
+
+    用于页面片段缓存：只有变更序号变化的项目才需要读取完整数据并重新渲染
+    """
     with get_db() as conn:
         cursor = conn.cursor()
+        cursor.execute('BEGIN')
+        try:
+            cursor.execute("SELECT version FROM cache_versions WHERE name = 'project_changes'")
+            row = cursor.fetchone()
+            cursor.execute('''
+                SELECT id, change_seq, 'owner' AS user_role, created_at FROM projects WHERE user_id = ?
+                UNION ALL
+                SELECT p.id, p.change_seq, pcol.permission AS user_role, p.created_at
+                FROM projects p
+                JOIN project_collaborations pcol ON p.id = pcol.project_id
+                WHERE pcol.collaborator_id = ?
+                ORDER BY created_at ASC
+            ''', (user_id, user_id))
+            stamps = [{'id': r['id'], 'change_seq': r['change_seq'], 'user_role': r['user_role']}
+                      for r in cursor.fetchall()]
+        finally:
+            conn.rollback()
+    return {'token': row['version'] if row else 0, 'projects': stamps}
+
+def fetch_user_projects(cursor, user_id, since=None, project_ids=None):
+    """在给定游标上读取用户可见的项目；since 不为空时只返回变更序号大于 since 的项目，
+    project_ids 不为空时只返回其中的项目
+    """
+    row_filter = '' if since is None else 'AND p.change_seq > ?'
+    row_params = () if since is None else (since,)
+    if project_ids is not None:
+        if not project_ids:
+            return []
+        row_filter += f" AND p.id IN ({','.join('?' * len(project_ids))})"
+        row_params += tuple(project_ids)
+    cursor.execute(f'''
+        SELECT p.*, 'owner' as user_role,
+               GROUP_CONCAT(DISTINCT pc.component_id || ':' || pc.quantity) as component_data,
+               GROUP_CONCAT(DISTINCT pr.title || '|' || pr.content || '|' || pr.color) as requirements_data
+        FROM projects p
+        LEFT JOIN project_components pc ON p.id = pc.project_id
+        LEFT JOIN project_requirements pr ON p.id = pr.project_id
+        WHERE p.user_id = ? {row_filter}
+        GROUP BY p.id
+        
+        UNION ALL
+        
+        SELECT p.*, pcol.permission as user_role,
+               GROUP_CONCAT(DISTINCT pc.component_id || ':' || pc.quantity) as component_data,
+               GROUP_CONCAT(DISTINCT pr.title || '|' || pr.content || '|' || pr.color) as requirements_data
+        FROM projects p
+        JOIN project_collaborations pcol ON p.id = pcol.project_id
+        LEFT JOIN project_components pc ON p.id = pc.project_id
+        LEFT JOIN project_requirements pr ON p.id = pr.project_id
+        WHERE pcol.collaborator_id = ? {row_filter}
+        GROUP BY p.id
+        
+        ORDER BY created_at ASC
+    ''', (user_id,) + row_params + (user_id,) + row_params)
+    rows = [dict(row) for row in cursor.fetchall()]
+    
+    # 一次性读取涉及的元器件、共享状态和所有者信息，保证与项目数据来自同一快照
+    component_ids = set()
+    for project in rows:
+        for comp in (project['component_data'] or '').split(','):
+            if ':' in comp:
+                component_ids.add(int(comp.split(':')[0]))
+    component_map = {}
+    if component_ids:
+        placeholders = ','.join('?' * len(component_ids))
+        cursor.execute(f'SELECT id, name, model, price FROM components WHERE id IN ({placeholders})',
+                       tuple(component_ids))
+        component_map = {row['id']: row for row in cursor.fetchall()}
+    
+    shared_ids = set()
+    owner_names = {}
+    if rows:
+        cursor.execute('SELECT DISTINCT project_id FROM project_collaborations WHERE owner_id = ?', (user_id,))
+        shared_ids = {row['project_id'] for row in cursor.fetchall()}
+        owner_ids = {p['user_id'] for p in rows if p['user_role'] != 'owner'}
+        if owner_ids:
+            placeholders = ','.join('?' * len(owner_ids))
+            cursor.execute(f'SELECT id, username FROM users WHERE id IN ({placeholders})', tuple(owner_ids))
+            owner_names = {row['id']: row['username'] for row in cursor.fetchall()}
+    
+    projects = []
+    for project in rows:
+        # 处理元器件数据
+        components = []
+        if project['component_data']:
+            comp_data = project['component_data'].split(',')
+            for comp in comp_data:
+                if ':' in comp:
+                    comp_id, quantity = comp.split(':')
+                    component_info = component_map.get(int(comp_id))
+                    if component_info:
+                        components.append({
+                            'id': int(comp_id),
+                            'name': component_info['name'],
+                            'model': component_info['model'],
+                            'price': component_info['price'],
+                            'quantity': int(quantity)
+                        })
+        project['components'] = components
         
-        # 获取用户拥有的项目
-        cursor.execute('''
-            SELECT p.*, 'owner' as user_role,
-                   GROUP_CONCAT(DISTINCT pc.component_id || ':' || pc.quantity) as component_data,
-                   GROUP_CONCAT(DISTINCT pr.title || '|' || pr.content || '|' || pr.color) as requirements_data
-            FROM projects p
-            LEFT JOIN project_components pc ON p.id = pc.project_id
-            LEFT JOIN project_requirements pr ON p.id = pr.project_id
-            WHERE p.user_id = ?
-            GROUP BY p.id
-            
-            UNION ALL
-            
-            SELECT p.*, pcol.permission as user_role,
-                   GROUP_CONCAT(DISTINCT pc.component_id || ':' || pc.quantity) as component_data,
-                   GROUP_CONCAT(DISTINCT pr.title || '|' || pr.content || '|' || pr.color) as requirements_data
-            FROM projects p
-            JOIN project_collaborations pcol ON p.id = pcol.project_id
-            LEFT JOIN project_components pc ON p.id = pc.project_id
-            LEFT JOIN project_requirements pr ON p.id = pr.project_id
-            WHERE pcol.collaborator_id = ?
-            GROUP BY p.id
-            
-            ORDER BY created_at ASC
-        ''', (user_id, user_id))
+        # 处理需求数据
+        requirements = []
+        if project['requirements_data']:
+            req_items = project['requirements_data'].split(',')
+            for req_item in req_items:
+                if '|' in req_item:
+                    parts = req_item.split('|')
+                    if len(parts) >= 3:
+                        requirements.append({
+                            'title': parts[0],
+                            'content': parts[1],
+                            'color': parts[2]
+                        })
+        project['requirements'] = requirements
         
-        projects = []
-        for row in cursor.fetchall():
-            project = dict(row)
-            
-            # 处理元器件数据
-            components = []
-            if project['component_data']:
-                comp_data = project['component_data'].split(',')
-                for comp in comp_data:
-                    if ':' in comp:
-                        comp_id, quantity = comp.split(':')
-                        component_info = get_component_by_id(int(comp_id))
-                        if component_info:
-                            components.append({
-                                'id': int(comp_id),
-                                'name': component_info['name'],
-                                'model': component_info['model'],
-                                'price': component_info['price'],
-                                'quantity': int(quantity)
-                            })
-            project['components'] = components
-            
-            # 处理需求数据
-            requirements = []
-            if project['requirements_data']:
-                req_items = project['requirements_data'].split(',')
-                for req_item in req_items:
-                    if '|' in req_item:
-                        parts = req_item.split('|')
-                        if len(parts) >= 3:
-                            requirements.append({
-                                'title': parts[0],
-                                'content': parts[1],
-                                'color': parts[2]
-                            })
-            project['requirements'] = requirements
-            
-            # 检查共享状态
-            project['is_shared_by_me'] = False
-            project['is_shared_to_me'] = False
-            
-            if project['user_role'] == 'owner':
-                # 如果是项目所有者，检查是否共享给了别人
-                cursor.execute('''
-                    SELECT COUNT(*) as count FROM project_collaborations 
-                    WHERE project_id = ? AND owner_id = ?
-                ''', (project['id'], user_id))
-                collab_count = cursor.fetchone()['count']
-                project['is_shared_by_me'] = collab_count > 0
-            else:
-                # 如果是协作者，标记为被共享的项目
-                project['is_shared_to_me'] = True
-                # 获取项目所有者信息
-                cursor.execute('SELECT username FROM users WHERE id = ?', (project['user_id'],))
-                owner_info = cursor.fetchone()
-                project['owner_username'] = owner_info['username'] if owner_info else '未知用户'
-            
-            # 清理不需要的字段
-            del project['component_data']
-            del project['requirements_data']
-            
-            projects.append(project)
+        # 检查共享状态
+        project['is_shared_by_me'] = False
+        project['is_shared_to_me'] = False
         
-        return projects
+        if project['user_role'] == 'owner':
+            # 如果是项目所有者，检查是否共享给了别人
+            project['is_shared_by_me'] = project['id'] in shared_ids
+        else:
+            # 如果是协作者，标记为被共享的项目
+            project['is_shared_to_me'] = True
+            project['owner_username'] = owner_names.get(project['user_id'], '未知用户')
+        
+        # 清理不需要的字段
+        del project['component_data']
+        del project['requirements_data']
+        
+        projects.append(project)
+    
+    return projects
+
+def get_user_project_changes(user_id, since):
+    """获取 since 之后用户项目列表的变化
+
+    返回 {'token', 'projects', 'deleted', 'full'}：projects 为新增或修改的项目，deleted 为不再可见的项目ID；
+    since 为 None 或早于已清理的墓碑范围时 full 为 True，projects 为完整列表，客户端应丢弃本地副本
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        # 在同一读事务中读取令牌和数据，令牌之后的修改会在下次同步时返回
+        cursor.execute('BEGIN')
+        try:
+            return fetch_user_project_changes(cursor, user_id, since)
+        finally:
+            conn.rollback()
+
+def fetch_user_project_changes(cursor, user_id, since):
+    """在给定游标上读取同步令牌和 since 之后的项目变化（调用方负责开启读事务）"""
+    cursor.execute('''
+        SELECT name, version FROM cache_versions 
+        WHERE name IN ('project_changes', 'project_tombstones_floor')
+    ''')
+    versions = {row['name']: row['version'] for row in cursor.fetchall()}
+    token = versions.get('project_changes', 0)
+    full = since is None or since < versions.get('project_tombstones_floor', 0)
+    
+    projects = fetch_user_projects(cursor, user_id, None if full else since)
+    deleted = []
+    if not full:
+        cursor.execute('''
+            SELECT project_id FROM project_tombstones 
+            WHERE user_id = ? AND change_seq > ?
+        ''', (user_id, since))
+        deleted = [row['project_id'] for row in cursor.fetchall()]
+    
+    return {'token': token, 'projects': projects, 'deleted': deleted, 'full': full}
+
+def get_dashboard_data(user_id, include, component_page_size=50):
+    """在同一个数据库连接中读取用户主页需要的数据
+
+    include 为 'components'、'stats'、'settings'、'jobs' 的子集；除可能需要写入默认设置的 settings 外，
+    其余部分在同一读事务中读取；components 为元器件目录的第一页 (列表, 下一页键)，
+    jobs 的格式与 get_user_project_changes(user_id, None) 相同
+    """
+    result = {}
+    with get_db() as conn:
+        cursor = conn.cursor()
+        if 'settings' in include:
+            result['settings'] = fetch_user_settings(conn, user_id)
+        
+        cursor.execute('BEGIN')
+        try:
+            if 'components' in include:
+                result['components'] = fetch_component_page(cursor, '', None, component_page_size)
+            if 'stats' in include:
+                result['stats'] = fetch_user_stats(cursor, user_id)
+            if 'jobs' in include:
+                result['jobs'] = fetch_user_project_changes(cursor, user_id, None)
+        finally:
+            conn.rollback()
+    return result
+
+def prune_project_tombstones(before_ts):
+    """删除早于 before_ts 的项目墓碑记录，并记录被清理的最大变更序号，返回删除的行数"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT MAX(change_seq) AS max_seq FROM project_tombstones WHERE created_at < ?', (before_ts,))
+        max_seq = cursor.fetchone()['max_seq']
+        if max_seq is None:
+            return 0
+        # 更早的同步令牌无法再得知期间删除了哪些项目，需要全量同步
+        cursor.execute('''
+            INSERT INTO cache_versions (name, version) VALUES ('project_tombstones_floor', ?)
+            ON CONFLICT(name) DO UPDATE SET version = MAX(version, excluded.version)
+        ''', (max_seq,))
+        cursor.execute('DELETE FROM project_tombstones WHERE change_seq <= ?', (max_seq,))
+        deleted = cursor.rowcount
+        conn.commit()
+        return deleted
 
 def get_project_by_id(project_id, user_id=None):
     """获取项目详情"""
@@ -849,6 +1685,26 @@ def get_project_by_id(project_id, user_id=None):
         
         return project
 
+def get_project_bom(project_id):
+    """获取项目的元器件清单和保存的元器件总价，项目不存在时返回 None"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT bom_total FROM projects WHERE id = ?', (project_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        
+        cursor.execute('''
+            SELECT c.id, c.name, c.model, c.price, pc.quantity
+            FROM project_components pc
+            JOIN components c ON c.id = pc.component_id
+            WHERE pc.project_id = ?
+        ''', (project_id,))
+        return {
+            'bom_total': row['bom_total'],
+            'components': [dict(comp) for comp in cursor.fetchall()]
+        }
+
 def create_project(user_id, project_data):
     """创建新项目"""
     with get_db() as conn:
@@ -888,6 +1744,15 @@ def update_project(project_id, user_id, project_data):
     with get_db() as conn:
         cursor = conn.cursor()
         
+        # 记录原项目名称，改名时需要同步重命名项目文件夹
+        cursor.execute('''
+            SELECT p.name, u.username 
+            FROM projects p
+            JOIN users u ON p.user_id = u.id
+            WHERE p.id = ? AND p.user_id = ?
+        ''', (project_id, user_id))
+        old_project = cursor.fetchone()
+        
         # 更新项目基本信息
         cursor.execute('''
             UPDATE projects 
@@ -921,6 +1786,17 @@ def update_project(project_id, user_id, project_data):
                 ''', (project_id, req['title'], req['content'], req['color']))
         
         conn.commit()
+        
+        # 项目改名后同步重命名文件夹，否则文件会与项目脱节并被当作孤立文件夹清理
+        if old_project and old_project['name'] != project_data['name']:
+            username = old_project['username']
+            old_folder = os.path.join(UPLOAD_FOLDER, username, f"{username}-{old_project['name']}")
+            new_folder = os.path.join(UPLOAD_FOLDER, username, f"{username}-{project_data['name']}")
+            if os.path.exists(old_folder) and not os.path.exists(new_folder):
+                try:
+                    os.rename(old_folder, new_folder)
+                except Exception as e:
+                    print(f"重命名项目文件夹时出错: {e}")
         return True
 
 def delete_project(project_id, user_id):
@@ -964,7 +1840,8 @@ def delete_project(project_id, user_id):
         # 4. 清理相关的临时上传文件夹
         cleanup_temp_upload_folders(username, project_name)
         
-        # 5. 删除项目记录（相关的 project_components 和 project_requirements 会自动级联删除）
+        # 5. 扣除所有者的存储用量并删除项目记录（相关的 project_components 和 project_requirements 会自动级联删除）
+        release_project_storage(cursor, project_id)
         cursor.execute('DELETE FROM projects WHERE id = ? AND user_id = ?', (project_id, user_id))
         
         conn.commit()
@@ -991,15 +1868,152 @@ def cleanup_temp_upload_folders(username, project_name):
     except Exception as e:
         print(f"清理临时文件夹时出错: {e}")
 
+def get_directory_size(directory_path):
+    """统计目录下所有文件的总字节数和文件数"""
+    total_bytes = 0
+    total_files = 0
+    for root, dirs, files in os.walk(directory_path):
+        for file in files:
+            try:
+                total_bytes += os.path.getsize(os.path.join(root, file))
+                total_files += 1
+            except OSError:
+                pass
+    return total_bytes, total_files
+
+def list_directory_files(directory_path):
+    """列出目录下所有文件，返回 (相对路径, 大小, 修改时间) 列表"""
+    files = []
+    for root, dirs, filenames in os.walk(directory_path):
+        for filename in filenames:
+            file_path = os.path.join(root, filename)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            relative_path = os.path.relpath(file_path, directory_path).replace('\\', '/')
+            files.append((relative_path, stat.st_size, int(stat.st_mtime)))
+    return files
+
+def cleanup_orphaned_project_folders(min_age_seconds):
+    """清理磁盘上没有对应项目记录的项目文件夹"""
+    result = {'folders': 0, 'bytes': 0}
+    if not os.path.exists(UPLOAD_FOLDER):
+        return result
+    
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT username FROM users')
+        usernames = {row['username'] for row in cursor.fetchall()}
+        cursor.execute('''
+            SELECT u.username, p.name 
+            FROM projects p
+            JOIN users u ON p.user_id = u.id
+        ''')
+        # 项目名包含 / 时文件夹是嵌套的，只比较用户目录下的第一级
+        project_folders = {(row['username'], f"{row['username']}-{row['name']}".split('/')[0])
+                           for row in cursor.fetchall()}
+    
+    now = time.time()
+    for username in os.listdir(UPLOAD_FOLDER):
+        user_upload_dir = os.path.join(UPLOAD_FOLDER, username)
+        if not os.path.isdir(user_upload_dir):
+            continue
+        # 不属于任何现有用户的目录（例如改名时未能移动的旧目录）可能仍有用户数据，只记录不删除
+        if username not in usernames:
+            print(f"跳过不属于现有用户的上传目录: {user_upload_dir}")
+            continue
+        for item in os.listdir(user_upload_dir):
+            item_path = os.path.join(user_upload_dir, item)
+            # 临时文件夹由上传会话清理负责
+            if item.startswith('temp_') or not os.path.isdir(item_path):
+                continue
+            if (username, item) in project_folders:
+                continue
+            # 只清理按 <用户名>-<项目名> 命名的项目文件夹，其他文件夹只记录
+            if not item.startswith(f"{username}-"):
+                print(f"跳过非项目文件夹: {item_path}")
+                continue
+            # 刚创建的文件夹可能正处于上传提交过程中，留出安全时间
+            if now - os.path.getmtime(item_path) < min_age_seconds:
+                continue
+            size, _ = get_directory_size(item_path)
+            try:
+                shutil.rmtree(item_path)
+                result['folders'] += 1
+                result['bytes'] += size
+                print(f"已删除孤立项目文件夹: {item_path}")
+            except Exception as e:
+                print(f"删除孤立项目文件夹时出错: {e}")
+    return result
+
 # ==================== 元器件相关操作 ====================
 
 def get_all_components():
-    """获取所有元器件"""
+    """获取所有元器件（仅供管理员导出完整目录，页面选择元器件使用 search_components）"""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM components ORDER BY name')
+        cursor.execute('SELECT * FROM components ORDER BY name, id')
         return [dict(row) for row in cursor.fetchall()]
 
+def search_components(query='', after=None, limit=50):
+    """按名称和型号搜索元器件目录，返回 (元器件列表, 下一页键)
+
+    结果按 (分组, 名称, ID) 的稳定顺序排列：名称或型号以查询词开头的为第0组，其余子串命中的为第1组；
+    after 为上一页返回的键，没有更多结果时下一页键为 None
+    """
+    with get_db() as conn:
+        return fetch_component_page(conn.cursor(), query, after, limit)
+
+def fetch_component_page(cursor, query, after, limit):
+    terms = query.split()
+    params = []
+    if terms:
+        prefix = query.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        tier = "CASE WHEN c.name LIKE ? ESCAPE '\\' OR c.model LIKE ? ESCAPE '\\' THEN 0 ELSE 1 END"
+        params.extend([prefix, prefix])
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'component_search_fts'")
+        if cursor.fetchone() is not None and all(len(term) >= 3 for term in terms):
+            # 每个关键词作为短语，多个关键词之间为 AND，可分别命中名称和型号
+            where = 'c.id IN (SELECT rowid FROM component_search_fts WHERE component_search_fts MATCH ?)'
+            params.append(' '.join('"' + term.replace('"', '""') + '"' for term in terms))
+        else:
+            # trigram 至少需要3个字符，短关键词退化为 LIKE 匹配
+            conditions = []
+            for term in terms:
+                pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                conditions.append("(c.name LIKE ? ESCAPE '\\' OR c.model LIKE ? ESCAPE '\\')")
+                params.extend([pattern, pattern])
+            where = ' AND '.join(conditions)
+    else:
+        # 无关键词时直接沿名称索引分页
+        tier, where = '0', '1'
+
+    keyset = ''
+    if after is not None:
+        keyset = 'WHERE (tier, name, id) > (?, ?, ?)'
+        params.extend(after)
+    cursor.execute(f'''
+        SELECT * FROM (
+            SELECT c.id, c.name, c.model, c.price, {tier} AS tier FROM components c WHERE {where}
+        ) {keyset}
+        ORDER BY tier, name, id
+        LIMIT ?
+    ''', (*params, limit + 1))
+    rows = cursor.fetchall()
+
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = (rows[-1]['tier'], rows[-1]['name'], rows[-1]['id'])
+    return [{
+        'id': row['id'],
+        'name': row['name'],
+        'model': row['model'],
+        'price': row['price']
+    } for row in rows], next_key
+
 def get_component_by_id(component_id):
     """根据ID获取元器件"""
     with get_db() as conn:
@@ -1008,6 +2022,159 @@ def get_component_by_id(component_id):
         row = cursor.fetchone()
         return dict(row) if row else None
 
+# ==================== 缓存版本相关操作 ====================
+
+def get_cache_version(name):
+    """获取指定缓存的版本号（不存在时为0）"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT version FROM cache_versions WHERE name = ?', (name,))
+        row = cursor.fetchone()
+        return row['version'] if row else 0
+
+def bump_cache_version(name):
+    """递增指定缓存的版本号，使所有进程中的本地缓存失效，返回新版本号"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(cache_version_bump_sql(name))
+        conn.commit()
+        cursor.execute('SELECT version FROM cache_versions WHERE name = ?', (name,))
+        return cursor.fetchone()['version']
+
+def get_cache_versions():
+    """读取所有缓存版本号"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT name, version FROM cache_versions')
+        return {row['name']: row['version'] for row in cursor.fetchall()}
+
+def get_shared_state(after_event_id, after_session_change_id, limit=500):
+    """一次读取所有缓存版本号、after_event_id 之后的事件以及 after_session_change_id 之后的会话变更
+    （供各 worker 的同步线程使用），会话变更为 [(变更ID, 会话ID)]"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT name, version FROM cache_versions')
+        versions = {row['name']: row['version'] for row in cursor.fetchall()}
+        events = fetch_events_after(cursor, after_event_id, limit)
+        cursor.execute('''
+            SELECT id, session_id FROM session_changes 
+            WHERE id > ? ORDER BY id LIMIT ?
+        ''', (after_session_change_id, limit))
+        session_changes = [(row['id'], row['session_id']) for row in cursor.fetchall()]
+        return versions, events, session_changes
+
+def fetch_events_after(cursor, after_event_id, limit):
+    cursor.execute('''
+        SELECT id, type, data, user_ids FROM app_events 
+        WHERE id > ? ORDER BY id LIMIT ?
+    ''', (after_event_id, limit))
+    return [{
+        'id': row['id'],
+        'type': row['type'],
+        'data': json.loads(row['data']),
+        'user_ids': json.loads(row['user_ids']) if row['user_ids'] is not None else None,
+    } for row in cursor.fetchall()]
+
+# ==================== 共享事件相关操作 ====================
+
+def append_event(event_type, data, user_ids=None):
+    """写入一条共享事件，返回事件ID（所有 worker 按ID顺序读取）"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO app_events (type, data, user_ids, created_at)
+            VALUES (?, ?, ?, ?)
+        ''', (event_type, json.dumps(data, ensure_ascii=False),
+              json.dumps(sorted(user_ids)) if user_ids is not None else None, int(time.time())))
+        conn.commit()
+        return cursor.lastrowid
+
+def get_events_after(after_event_id, limit=1000):
+    """读取指定ID之后仍保留的事件"""
+    with get_db() as conn:
+        return fetch_events_after(conn.cursor(), after_event_id, limit)
+
+def get_latest_session_change_id():
+    """获取最新的会话变更ID，没有变更时为0"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'session_changes'")
+        row = cursor.fetchone()
+        return (row[0] or 0) if row else 0
+
+def get_latest_event_id(event_type=None):
+    """获取最新事件ID（可按类型过滤），没有事件时为0"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        if event_type is None:
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'app_events'")
+        else:
+            cursor.execute('SELECT MAX(id) FROM app_events WHERE type = ?', (event_type,))
+        row = cursor.fetchone()
+        return (row[0] or 0) if row else 0
+
+def prune_events(before_ts):
+    """删除早于指定时间戳的共享事件和会话变更记录，返回删除数量"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM app_events WHERE created_at < ?', (before_ts,))
+        deleted = cursor.rowcount
+        cursor.execute('DELETE FROM session_changes WHERE created_at < ?', (before_ts,))
+        conn.commit()
+        return deleted + cursor.rowcount
+
+# ==================== 会话相关操作 ====================
+
+def get_user_session(session_id):
+    """获取未过期的会话记录"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, user_id, data, expires_at FROM user_sessions 
+            WHERE id = ? AND expires_at > ?
+        ''', (session_id, int(time.time())))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+def save_user_session(session_id, user_id, data, expires_at):
+    """保存会话数据并设置新的过期时间"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO user_sessions (id, user_id, data, expires_at, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                user_id = excluded.user_id,
+                data = excluded.data,
+                expires_at = excluded.expires_at,
+                updated_at = excluded.updated_at
+        ''', (session_id, user_id, data, expires_at, int(time.time())))
+        conn.commit()
+
+def delete_user_session(session_id):
+    """删除会话（退出登录）"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM user_sessions WHERE id = ?', (session_id,))
+        conn.commit()
+
+def delete_sessions_for_user(user_id):
+    """强制下线：删除用户的所有会话（触发器为每个会话记录变更），返回删除的会话数"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM user_sessions WHERE user_id = ?', (user_id,))
+        deleted = cursor.rowcount
+        conn.commit()
+        return deleted
+
+def cleanup_expired_login_sessions():
+    """删除已过期的会话记录，返回删除数量"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM user_sessions WHERE expires_at <= ?', (int(time.time()),))
+        conn.commit()
+        return cursor.rowcount
+
 # ==================== 分享相关操作 ====================
 
 def create_share(share_id, project_id, owner_id, password_hash=None, expire_time=None, max_access_count=None):
@@ -1015,9 +2182,10 @@ def create_share(share_id, project_id, owner_id, password_hash=None, expire_time
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute('''
-            INSERT OR REPLACE INTO shares (id, project_id, owner_id, password_hash, expire_time, max_access_count, access_count)
-            VALUES (?, ?, ?, ?, ?, ?, 0)
-        ''', (share_id, project_id, owner_id, password_hash, expire_time, max_access_count))
+            INSERT OR REPLACE INTO shares (id, project_id, owner_id, password_hash, expire_time, expire_at, 
+                                           max_access_count, access_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+        ''', (share_id, project_id, owner_id, password_hash, expire_time, iso_to_epoch(expire_time), max_access_count))
         conn.commit()
 
 def get_share_by_id(share_id):
@@ -1042,18 +2210,48 @@ def delete_share(share_id):
         conn.commit()
         return cursor.rowcount > 0
 
-def increment_share_access_count(share_id):
-    """增加分享访问计数"""
+def consume_share_access(share_id):
+    """为有访问次数限制的分享占用一次访问，未达上限时原子地加一并返回 True"""
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             UPDATE shares 
             SET access_count = COALESCE(access_count, 0) + 1 
-            WHERE id = ?
+            WHERE id = ? AND COALESCE(access_count, 0) < max_access_count
         ''', (share_id,))
         conn.commit()
         return cursor.rowcount > 0
 
+def add_share_access_counts(counts):
+    """批量累加分享访问计数（counts 为 {share_id: 增量}），在一个事务中提交"""
+    if not counts:
+        return
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            UPDATE shares 
+            SET access_count = COALESCE(access_count, 0) + ? 
+            WHERE id = ?
+        ''', [(count, share_id) for share_id, count in counts.items()])
+        conn.commit()
+
+def cleanup_expired_shares(batch_size=500):
+    """分批删除已过期的分享记录，每批单独提交以缩短写锁时间，返回删除数量"""
+    now = int(time.time())
+    deleted = 0
+    with get_db() as conn:
+        cursor = conn.cursor()
+        while True:
+            cursor.execute('''
+                DELETE FROM shares WHERE id IN (
+                    SELECT id FROM shares WHERE expire_at IS NOT NULL AND expire_at <= ? LIMIT ?
+                )
+            ''', (now, batch_size))
+            conn.commit()
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return deleted
+
 def get_project_share(project_id, owner_id):
     """获取项目的分享信息"""
     with get_db() as conn:
@@ -1065,7 +2263,7 @@ def get_project_share(project_id, owner_id):
         return dict(row) if row else None
 
 def get_project_share_by_project_id(project_id):
-    """通过项目ID获取分享信息（不限制所有者）"""
+    """通过项目ID获取未过期的分享信息（不限制所有者；已过期但尚未清理的分享视为不存在）"""
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute('''
@@ -1073,11 +2271,117 @@ def get_project_share_by_project_id(project_id):
             FROM shares s
             JOIN users u ON s.owner_id = u.id
             JOIN projects p ON s.project_id = p.id
-            WHERE s.project_id = ?
-        ''', (project_id,))
+            WHERE s.project_id = ? AND (s.expire_at IS NULL OR s.expire_at > ?)
+            ORDER BY s.created_at DESC
+        ''', (project_id, int(time.time())))
         row = cursor.fetchone()
         return dict(row) if row else None
 
+# ==================== 分享访问日志相关操作 ====================
+
+# 按天汇总时使用北京时间的自然日
+BEIJING_OFFSET_SECONDS = 8 * 3600
+
+def hour_bucket(ts):
+    """时间戳所在小时的起始时间戳"""
+    return ts - ts % 3600
+
+def day_bucket(ts):
+    """时间戳所在北京时间自然日的起始时间戳"""
+    return (ts + BEIJING_OFFSET_SECONDS) // 86400 * 86400 - BEIJING_OFFSET_SECONDS
+
+def insert_share_access_events(events):
+    """批量写入分享访问事件并累加小时、天汇总（events 为字典列表），在一个事务中提交"""
+    if not events:
+        return
+    with get_db() as conn:
+        cursor = conn.cursor()
+        
+        # 签名下载链接只携带分享ID，写入时再补齐项目ID
+        missing = {e['share_id'] for e in events if e.get('project_id') is None}
+        if missing:
+            placeholders = ','.join('?' * len(missing))
+            cursor.execute(f'SELECT id, project_id FROM shares WHERE id IN ({placeholders})', tuple(missing))
+            project_ids = {row['id']: row['project_id'] for row in cursor.fetchall()}
+            for e in events:
+                if e.get('project_id') is None:
+                    e['project_id'] = project_ids.get(e['share_id'])
+        
+        cursor.executemany('''
+            INSERT INTO share_access_log (share_id, project_id, ts, ip_hash, event, file_path, bytes_sent, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(e['share_id'], e['project_id'], e['ts'], e['ip_hash'], e['event'],
+               e['file_path'], e['bytes_sent'], e['status']) for e in events])
+        
+        # 先在内存中按 (项目, 分享, 时间段) 聚合，再用 UPSERT 累加到汇总表
+        for table, bucket_func in (('share_access_hourly', hour_bucket), ('share_access_daily', day_bucket)):
+            rollup = {}
+            for e in events:
+                if e['project_id'] is None:
+                    continue
+                key = (e['project_id'], e['share_id'], bucket_func(e['ts']))
+                counts = rollup.setdefault(key, [0, 0, 0, 0])
+                counts[0] += 1
+                if e['status'] < 400 and e['event'] in ('file', 'zip'):
+                    counts[1] += 1
+                counts[2] += e['bytes_sent']
+                if e['status'] >= 400:
+                    counts[3] += 1
+            cursor.executemany(f'''
+                INSERT INTO {table} (project_id, share_id, bucket, requests, downloads, bytes_sent, errors)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(project_id, bucket, share_id) DO UPDATE SET
+                    requests = requests + excluded.requests,
+                    downloads = downloads + excluded.downloads,
+                    bytes_sent = bytes_sent + excluded.bytes_sent,
+                    errors = errors + excluded.errors
+            ''', [(*key, *counts) for key, counts in rollup.items()])
+        
+        conn.commit()
+
+def get_share_access_stats(project_id, granularity, since_ts):
+    """获取项目分享的按小时或按天汇总统计"""
+    table = 'share_access_hourly' if granularity == 'hour' else 'share_access_daily'
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT bucket, SUM(requests) as requests, SUM(downloads) as downloads,
+                   SUM(bytes_sent) as bytes_sent, SUM(errors) as errors
+            FROM {table}
+            WHERE project_id = ? AND bucket >= ?
+            GROUP BY bucket
+            ORDER BY bucket
+        ''', (project_id, since_ts))
+        return [dict(row) for row in cursor.fetchall()]
+
+def get_share_top_files(project_id, since_ts, limit=10):
+    """获取项目分享中下载次数最多的文件（基于明细日志，受保留期限制）"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT file_path, COUNT(*) as downloads, SUM(bytes_sent) as bytes_sent,
+                   COUNT(DISTINCT ip_hash) as visitors
+            FROM share_access_log
+            WHERE project_id = ? AND ts >= ? AND event = 'file' AND status < 400
+            GROUP BY file_path
+            ORDER BY downloads DESC
+            LIMIT ?
+        ''', (project_id, since_ts, limit))
+        return [dict(row) for row in cursor.fetchall()]
+
+def prune_share_access_log(log_before, hourly_before, daily_before):
+    """按保留期限删除过期的访问明细和汇总数据，返回删除行数"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        deleted = 0
+        for table, column, before in (('share_access_log', 'ts', log_before),
+                                      ('share_access_hourly', 'bucket', hourly_before),
+                                      ('share_access_daily', 'bucket', daily_before)):
+            cursor.execute(f'DELETE FROM {table} WHERE {column} < ?', (before,))
+            deleted += cursor.rowcount
+        conn.commit()
+        return deleted
+
 # ==================== 上传会话相关操作 ====================
 
 def create_upload_session(session_id, user_id, project_id, temp_dir, total_files):
@@ -1102,15 +2406,15 @@ def get_upload_session(session_id):
             return session_data
         return None
 
-def update_upload_session(session_id, uploaded_files_count, file_list):
+def update_upload_session(session_id, uploaded_files_count, file_list, uploaded_bytes=0):
     """更新上传会话"""
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute('''
             UPDATE upload_sessions 
-            SET uploaded_files = ?, file_list = ?
+            SET uploaded_files = ?, file_list = ?, uploaded_bytes = ?
             WHERE id = ?
-        ''', (uploaded_files_count, json.dumps(file_list), session_id))
+        ''', (uploaded_files_count, json.dumps(file_list), uploaded_bytes, session_id))
         conn.commit()
 
 def delete_upload_session(session_id):
@@ -1121,56 +2425,377 @@ def delete_upload_session(session_id):
         conn.commit()
 
 def cleanup_expired_upload_sessions(hours=24):
-    """清理过期的上传会话"""
+    """清理过期的上传会话及其临时文件夹，返回清理统计"""
+    result = {'sessions': 0, 'temp_dirs': 0, 'bytes': 0}
     with get_db() as conn:
         cursor = conn.cursor()
-        expire_time = get_beijing_time() - timedelta(hours=hours)
+        # created_at 由 CURRENT_TIMESTAMP 写入（UTC），因此用 SQLite 的时间函数比较
         cursor.execute('''
-            DELETE FROM upload_sessions 
-            WHERE created_at < ?
-        ''', (expire_time.isoformat(),))
+            SELECT id, temp_dir FROM upload_sessions 
+            WHERE created_at < datetime('now', ?)
+        ''', (f'-{int(hours)} hours',))
+        expired_sessions = cursor.fetchall()
+        
+        for row in expired_sessions:
+            temp_dir = row['temp_dir']
+            if temp_dir and os.path.isdir(temp_dir):
+                size, _ = get_directory_size(temp_dir)
+                try:
+                    shutil.rmtree(temp_dir)
+                    result['temp_dirs'] += 1
+                    result['bytes'] += size
+                except Exception as e:
+                    print(f"删除临时文件夹时出错: {e}")
+            cursor.execute('DELETE FROM upload_sessions WHERE id = ?', (row['id'],))
+            result['sessions'] += 1
+        
         conn.commit()
+    return result
 
-# ==================== 统计相关操作 ====================
+def cleanup_stale_temp_folders(max_age_seconds):
+    """清理没有对应上传会话记录且长时间未修改的临时文件夹"""
+    result = {'temp_dirs': 0, 'bytes': 0}
+    if not os.path.exists(UPLOAD_FOLDER):
+        return result
+    
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT id FROM upload_sessions')
+        active_session_ids = {row['id'] for row in cursor.fetchall()}
+    
+    now = time.time()
+    for username in os.listdir(UPLOAD_FOLDER):
+        user_upload_dir = os.path.join(UPLOAD_FOLDER, username)
+        if not os.path.isdir(user_upload_dir):
+            continue
+        for item in os.listdir(user_upload_dir):
+            item_path = os.path.join(user_upload_dir, item)
+            if not item.startswith('temp_') or not os.path.isdir(item_path):
+                continue
+            # 临时文件夹命名格式：temp_<session_id>_<username>-<project_name>
+            session_id = item[len('temp_'):].split('_', 1)[0]
+            if session_id in active_session_ids:
+                continue
+            if now - os.path.getmtime(item_path) < max_age_seconds:
+                continue
+            size, _ = get_directory_size(item_path)
+            try:
+                shutil.rmtree(item_path)
+                result['temp_dirs'] += 1
+                result['bytes'] += size
+                print(f"已删除残留临时文件夹: {item_path}")
+            except Exception as e:
+                print(f"删除临时文件夹时出错: {e}")
+    return result
 
-def get_user_stats(user_id):
-    """获取用户统计信息"""
+# ==================== 存储空间统计相关操作 ====================
+
+def set_project_storage(project_id, storage_bytes, storage_files):
+    """设置项目的存储用量，并按差值增量更新项目所有者的存储用量"""
     with get_db() as conn:
         cursor = conn.cursor()
+        cursor.execute('SELECT user_id, storage_bytes, storage_files FROM projects WHERE id = ?', (project_id,))
+        project = cursor.fetchone()
+        if not project:
+            return False
         
-        # 总项目数
-        cursor.execute('SELECT COUNT(*) FROM projects WHERE user_id = ?', (user_id,))
-        total_projects = cursor.fetchone()[0]
+        cursor.execute('''
+            UPDATE projects SET storage_bytes = ?, storage_files = ? WHERE id = ?
+        ''', (storage_bytes, storage_files, project_id))
+        cursor.execute('''
+            UPDATE users 
+            SET storage_bytes = MAX(0, storage_bytes + ?), storage_files = MAX(0, storage_files + ?)
+            WHERE id = ?
+        ''', (storage_bytes - project['storage_bytes'], storage_files - project['storage_files'], project['user_id']))
+        conn.commit()
+        return True
+
+def release_project_storage(cursor, project_id):
+    """项目删除前，从所有者的存储用量中扣除该项目占用的空间（在调用方事务中执行）"""
+    cursor.execute('''
+        UPDATE users 
+        SET storage_bytes = MAX(0, storage_bytes - (SELECT storage_bytes FROM projects WHERE id = ?)),
+            storage_files = MAX(0, storage_files - (SELECT storage_files FROM projects WHERE id = ?))
+        WHERE id = (SELECT user_id FROM projects WHERE id = ?)
+    ''', (project_id, project_id, project_id))
+
+def get_upload_quota_state(project_id):
+    """获取上传配额检查所需的数据：项目当前用量、所有者总用量和配额"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT p.storage_bytes as project_bytes, u.storage_bytes as user_bytes, u.storage_quota_bytes
+            FROM projects p
+            JOIN users u ON p.user_id = u.id
+            WHERE p.id = ?
+        ''', (project_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+def rebuild_storage_usage():
+    """扫描磁盘重新计算所有项目和用户的存储用量（仅用于迁移回填或人工校正）"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT p.id, p.name, u.username 
+            FROM projects p
+            JOIN users u ON p.user_id = u.id
+        ''')
+        for row in cursor.fetchall():
+            project_folder = os.path.join(UPLOAD_FOLDER, row['username'], f"{row['username']}-{row['name']}")
+            storage_bytes, storage_files = get_directory_size(project_folder) if os.path.isdir(project_folder) else (0, 0)
+            cursor.execute('''
+                UPDATE projects SET storage_bytes = ?, storage_files = ? WHERE id = ?
+            ''', (storage_bytes, storage_files, row['id']))
         
-        # 未完成项目数 (不是"已完成"状态的项目)
-        cursor.execute('SELECT COUNT(*) FROM projects WHERE user_id = ? AND status != ?', (user_id, '已完成'))
-        incomplete_projects = cursor.fetchone()[0]
+        cursor.execute('''
+            UPDATE users SET 
+                storage_bytes = (SELECT COALESCE(SUM(storage_bytes), 0) FROM projects WHERE user_id = users.id),
+                storage_files = (SELECT COALESCE(SUM(storage_files), 0) FROM projects WHERE user_id = users.id)
+        ''')
+        conn.commit()
+
+# ==================== 文件预览相关操作 ====================
+
+def get_file_preview(file_key):
+    """获取文件预览记录"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM file_previews WHERE file_key = ?', (file_key,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+def save_file_preview(file_key, content_hash, preview_file, status, source_path=None):
+    """保存文件预览记录；状态为 failed 时累加失败次数并记录失败时间，其他状态清零"""
+    failed = status == 'failed'
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO file_previews (file_key, content_hash, preview_file, status, source_path,
+                                       attempts, failed_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(file_key) DO UPDATE SET
+                content_hash = excluded.content_hash,
+                preview_file = excluded.preview_file,
+                status = excluded.status,
+                source_path = excluded.source_path,
+                attempts = CASE WHEN excluded.status = 'failed' THEN file_previews.attempts + 1 ELSE 0 END,
+                failed_at = excluded.failed_at,
+                updated_at = excluded.updated_at
+        ''', (file_key, content_hash, preview_file, status, source_path,
+              1 if failed else 0, int(time.time()) if failed else None))
+        conn.commit()
+
+def get_failed_file_previews(max_attempts):
+    """获取失败次数未达到上限的失败预览记录"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT file_key, status, source_path, attempts, failed_at FROM file_previews
+            WHERE status = 'failed' AND attempts < ?
+        ''', (max_attempts,))
+        return [dict(row) for row in cursor.fetchall()]
+
+def get_file_preview_sources():
+    """获取所有预览记录的 (file_key, 源文件路径, 预览文件名)"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT file_key, source_path, preview_file FROM file_previews')
+        return [(row['file_key'], row['source_path'], row['preview_file']) for row in cursor.fetchall()]
+
+def delete_file_previews(file_keys):
+    """删除指定的预览记录，返回删除数量"""
+    if not file_keys:
+        return 0
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('DELETE FROM file_previews WHERE file_key = ?', [(key,) for key in file_keys])
+        conn.commit()
+        return len(file_keys)
+
+# ==================== 文件索引相关操作 ====================
+
+def replace_project_files(project_id, files):
+    """用新提交的文件列表替换项目的文件索引（files 为 (相对路径, 大小, 修改时间) 列表）"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM project_files WHERE project_id = ?', (project_id,))
+        cursor.executemany('''
+            INSERT INTO project_files (project_id, path, name, size, modified_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(project_id, path, path.rsplit('/', 1)[-1], size, modified_at)
+              for path, size, modified_at in files])
+        conn.commit()
+
+def rebuild_file_index():
+    """扫描磁盘重建所有项目的文件索引（仅用于迁移回填或人工校正）"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT p.id, p.name, u.username 
+            FROM projects p
+            JOIN users u ON p.user_id = u.id
+        ''')
+        projects = cursor.fetchall()
+    
+    for row in projects:
+        project_folder = os.path.join(UPLOAD_FOLDER, row['username'], f"{row['username']}-{row['name']}")
+        if os.path.isdir(project_folder):
+            replace_project_files(row['id'], list_directory_files(project_folder))
+
+def search_project_files(user_id, query, limit=50):
+    """在用户可访问的项目（拥有的和协作的）中按文件名搜索"""
+    with get_db() as conn:
+        cursor = conn.cursor()
         
-        # 总价格
-        cursor.execute('SELECT COALESCE(SUM(price), 0) FROM projects WHERE user_id = ?', (user_id,))
-        total_price = cursor.fetchone()[0]
+        accessible_projects = '''
+            SELECT id FROM projects WHERE user_id = ?
+            UNION
+            SELECT project_id FROM project_collaborations WHERE collaborator_id = ?
+        '''
+        escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'project_files_fts'")
+        use_fts = cursor.fetchone() is not None and len(query) >= 3
+        
+        if use_fts:
+            # trigram 索引支持任意子串匹配；文件名前缀匹配的结果排在前面
+            cursor.execute(f'''
+                SELECT pf.project_id, p.name as project_name, pf.path, pf.name, pf.size, pf.modified_at
+                FROM project_files_fts
+                JOIN project_files pf ON pf.id = project_files_fts.rowid
+                JOIN projects p ON p.id = pf.project_id
+                WHERE project_files_fts MATCH ? AND pf.project_id IN ({accessible_projects})
+                ORDER BY CASE WHEN pf.name LIKE ? ESCAPE '\\' THEN 0 ELSE 1 END, project_files_fts.rank
+                LIMIT ?
+            ''', ('"' + query.replace('"', '""') + '"', user_id, user_id, escaped + '%', limit))
+        else:
+            # 短查询词（trigram 至少需要3个字符）只在用户自己的项目范围内做 LIKE 匹配
+            cursor.execute(f'''
+                SELECT pf.project_id, p.name as project_name, pf.path, pf.name, pf.size, pf.modified_at
+                FROM project_files pf
+                JOIN projects p ON p.id = pf.project_id
+                WHERE pf.project_id IN ({accessible_projects}) AND pf.path LIKE ? ESCAPE '\\'
+                ORDER BY CASE WHEN pf.name LIKE ? ESCAPE '\\' THEN 0 ELSE 1 END, pf.name
+                LIMIT ?
+            ''', (user_id, user_id, '%' + escaped + '%', escaped + '%', limit))
         
-        # 未完成项目总价格
-        cursor.execute('SELECT COALESCE(SUM(price), 0) FROM projects WHERE user_id = ? AND status != ?', (user_id, '已完成'))
-        incomplete_price = cursor.fetchone()[0]
+        return [dict(row) for row in cursor.fetchall()]
+
+# ==================== 项目搜索相关操作 ====================
+
+def search_projects(user_id, query, page=1, per_page=20):
+    """在用户可访问的项目中全文搜索名称、备注、需求和元器件，返回 (结果列表, 总数)"""
+    terms = query.split()
+    offset = (page - 1) * per_page
+    
+    with get_db() as conn:
+        cursor = conn.cursor()
         
-        # 元器件总价格 (通过项目元器件关联表计算)
-        cursor.execute('''
-            SELECT COALESCE(SUM(c.price * pc.quantity), 0) 
-            FROM project_components pc 
-            JOIN components c ON pc.component_id = c.id 
-            JOIN projects p ON pc.project_id = p.id 
-            WHERE p.user_id = ?
-        ''', (user_id,))
-        components_total_price = cursor.fetchone()[0]
+        accessible_projects = '''
+            SELECT id FROM projects WHERE user_id = ?
+            UNION
+            SELECT project_id FROM project_collaborations WHERE collaborator_id = ?
+        '''
+        columns = '''
+            p.id, p.user_id, p.source, p.name, p.price, p.board_type, p.status, p.remark,
+            p.created_at, p.updated_at,
+            CASE WHEN p.user_id = ? THEN 'owner'
+                 ELSE (SELECT permission FROM project_collaborations
+                       WHERE project_id = p.id AND collaborator_id = ?) END as user_role
+        '''
+        
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'projects_fts'")
+        use_fts = cursor.fetchone() is not None and all(len(term) >= 3 for term in terms)
+        
+        if use_fts:
+            # 每个关键词作为短语，多个关键词之间为 AND；名称命中的权重最高
+            # 权限按命中行逐条判断，避免 rowid IN (...) 被下推给 FTS5 导致对每个可访问项目执行一次 MATCH
+            match = ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+            accessible = '''(p.user_id = ? OR EXISTS (
+                SELECT 1 FROM project_collaborations WHERE project_id = p.id AND collaborator_id = ?
+            ))'''
+            cursor.execute(f'''
+                SELECT COUNT(*) FROM projects_fts
+                JOIN projects p ON p.id = projects_fts.rowid
+                WHERE projects_fts MATCH ? AND {accessible}
+            ''', (match, user_id, user_id))
+            total = cursor.fetchone()[0]
+            
+            cursor.execute(f'''
+                SELECT {columns}, bm25(projects_fts, 10.0, 3.0, 2.0, 1.0) as score
+                FROM projects_fts
+                JOIN projects p ON p.id = projects_fts.rowid
+                WHERE projects_fts MATCH ? AND {accessible}
+                ORDER BY score, p.id DESC
+                LIMIT ? OFFSET ?
+            ''', (user_id, user_id, match, user_id, user_id, per_page, offset))
+        else:
+            # trigram 至少需要3个字符，短关键词在用户可访问的项目范围内做 LIKE 匹配
+            conditions = []
+            params = []
+            for term in terms:
+                pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                conditions.append('''(
+                    p.name LIKE ? ESCAPE '\\' OR p.remark LIKE ? ESCAPE '\\'
+                    OR EXISTS (SELECT 1 FROM project_requirements pr WHERE pr.project_id = p.id
+                               AND (pr.title LIKE ? ESCAPE '\\' OR pr.content LIKE ? ESCAPE '\\'))
+                    OR EXISTS (SELECT 1 FROM project_components pc JOIN components c ON c.id = pc.component_id
+                               WHERE pc.project_id = p.id
+                               AND (c.name LIKE ? ESCAPE '\\' OR c.model LIKE ? ESCAPE '\\'))
+                )''')
+                params.extend([pattern] * 6)
+            where = ' AND '.join(conditions)
+            
+            cursor.execute(f'''
+                SELECT COUNT(*) FROM projects p
+                WHERE p.id IN ({accessible_projects}) AND {where}
+            ''', (user_id, user_id, *params))
+            total = cursor.fetchone()[0]
+            
+            cursor.execute(f'''
+                SELECT {columns}, NULL as score
+                FROM projects p
+                WHERE p.id IN ({accessible_projects}) AND {where}
+                ORDER BY CASE WHEN p.name LIKE ? ESCAPE '\\' THEN 0 ELSE 1 END, p.updated_at DESC
+                LIMIT ? OFFSET ?
+            ''', (user_id, user_id, user_id, user_id, *params, params[0], per_page, offset))
         
-        return {
-            'total_projects': total_projects,
-            'incomplete_projects': incomplete_projects,
-            'total_price': float(total_price),
-            'incomplete_price': float(incomplete_price),
-            'components_total_price': float(components_total_price)
-        }
+        return [dict(row) for row in cursor.fetchall()], total
+
+# ==================== 统计相关操作 ====================
+
+def get_user_stats(user_id):
+    """获取用户统计信息"""
+    with get_db() as conn:
+        return fetch_user_stats(conn.cursor(), user_id)
+
+def fetch_user_stats(cursor, user_id):
+    # 项目数、报价合计和元器件总价（读取各项目保存的 bom_total，不再关联元器件表）一次聚合
+    cursor.execute('''
+        SELECT COUNT(*) AS total_projects,
+               COALESCE(SUM(status != ?), 0) AS incomplete_projects,
+               COALESCE(SUM(price), 0) AS total_price,
+               COALESCE(SUM(CASE WHEN status != ? THEN price ELSE 0 END), 0) AS incomplete_price,
+               COALESCE(SUM(bom_total), 0) AS components_total_price
+        FROM projects WHERE user_id = ?
+    ''', ('已完成', '已完成', user_id))
+    totals = cursor.fetchone()
+    
+    # 存储用量
+    cursor.execute('SELECT storage_bytes, storage_files, storage_quota_bytes FROM users WHERE id = ?', (user_id,))
+    storage = cursor.fetchone()
+    
+    return {
+        'total_projects': totals['total_projects'],
+        'incomplete_projects': totals['incomplete_projects'],
+        'total_price': float(totals['total_price']),
+        'incomplete_price': float(totals['incomplete_price']),
+        'components_total_price': float(totals['components_total_price']),
+        'storage_bytes': storage['storage_bytes'] if storage else 0,
+        'storage_files': storage['storage_files'] if storage else 0,
+        'storage_quota_bytes': storage['storage_quota_bytes'] if storage else None
+    }
 
 # ==================== 配置管理相关操作 ====================
 
@@ -1559,7 +3184,7 @@ def get_user_collaborated_projects(user_id):
         return projects
 
 def update_collaboration_permission(collaboration_id, owner_id, permission):
-    """更新协作者权限"""
+    """更新协作者权限，返回协作关系所属的项目ID"""
     with get_db() as conn:
         cursor = conn.cursor()
         
@@ -1571,7 +3196,8 @@ def update_collaboration_permission(collaboration_id, owner_id, permission):
             WHERE pc.id = ? AND p.user_id = ?
         ''', (collaboration_id, owner_id))
         
-        if not cursor.fetchone():
+        collaboration = cursor.fetchone()
+        if not collaboration:
             raise ValueError("协作关系不存在或无权限")
         
         # 更新权限
@@ -1586,31 +3212,34 @@ def update_collaboration_permission(collaboration_id, owner_id, permission):
         if cursor.rowcount == 0:
             raise ValueError("更新失败")
         
-        return True
+        return collaboration['project_id']
 
-def check_project_access(project_id, user_id):
-    """检查用户是否有项目访问权限"""
+def get_project_member_ids(project_id):
+    """获取项目所有者和全部协作者的用户ID（用于推送项目变更事件）"""
     with get_db() as conn:
         cursor = conn.cursor()
-        
-        # 检查是否是项目所有者
         cursor.execute('''
-            SELECT id FROM projects 
-            WHERE id = ? AND user_id = ?
-        ''', (project_id, user_id))
-        
-        if cursor.fetchone():
-            return {'access': True, 'permission': 'owner'}
-        
-        # 检查是否是协作者
+            SELECT user_id FROM projects WHERE id = ?
+            UNION
+            SELECT collaborator_id FROM project_collaborations WHERE project_id = ?
+        ''', (project_id, project_id))
+        return [row[0] for row in cursor.fetchall()]
+
+def check_project_access(project_id, user_id):
+    """检查用户是否有项目访问权限（所有者与协作者在一次查询中判断）"""
+    with get_db() as conn:
+        cursor = conn.cursor()
         cursor.execute('''
-            SELECT permission FROM project_collaborations 
-            WHERE project_id = ? AND collaborator_id = ?
-        ''', (project_id, user_id))
+            SELECT CASE WHEN p.user_id = ? THEN 'owner' ELSE pc.permission END AS permission
+            FROM projects p
+            LEFT JOIN project_collaborations pc 
+                ON pc.project_id = p.id AND pc.collaborator_id = ?
+            WHERE p.id = ?
+        ''', (user_id, user_id, project_id))
         
         result = cursor.fetchone()
-        if result:
-            return {'access': True, 'permission': result[0]}
+        if result and result['permission']:
+            return {'access': True, 'permission': result['permission']}
         
         return {'access': False, 'permission': None}
 
@@ -1641,25 +3270,29 @@ def get_available_collaborators(exclude_user_id):
 def get_user_settings(user_id):
     """获取用户设置"""
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM user_settings WHERE user_id = ?', (user_id,))
-        settings = cursor.fetchone()
-        
-        if settings:
-            return dict(settings)
-        else:
-            # 如果用户设置不存在，创建默认设置
-            cursor.execute('''
-                INSERT INTO user_settings (user_id, hide_prices)
-                VALUES (?, FALSE)
-            ''', (user_id,))
-            conn.commit()
-            return {
-                'user_id': user_id,
-                'hide_prices': False,
-                'created_at': get_beijing_time().isoformat(),
-                'updated_at': get_beijing_time().isoformat()
-            }
+        return fetch_user_settings(conn, user_id)
+
+def fetch_user_settings(conn, user_id):
+    """在给定连接上读取用户设置，不存在时写入默认设置"""
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM user_settings WHERE user_id = ?', (user_id,))
+    settings = cursor.fetchone()
+    
+    if settings:
+        return dict(settings)
+    else:
+        # 如果用户设置不存在，创建默认设置
+        cursor.execute('''
+            INSERT INTO user_settings (user_id, hide_prices)
+            VALUES (?, FALSE)
+        ''', (user_id,))
+        conn.commit()
+        return {
+            'user_id': user_id,
+            'hide_prices': False,
+            'created_at': get_beijing_time().isoformat(),
+            'updated_at': get_beijing_time().isoformat()
+        }
 
 def update_user_settings(user_id, hide_prices=None):
     """更新用户设置"""
@@ -1686,6 +3319,9 @@ def update_user_settings(user_id, hide_prices=None):
         conn.commit()
         return True
 
-# 初始化数据库（如果数据库文件不存在则创建）
-if not os.path.exists(DATABASE_PATH):
-    init_database() 
\ No newline at end of file
+# 初始化数据库（如果数据库文件不存在则创建，否则只执行表结构迁移）；密码校验子进程导入时跳过
+if not in_pool_worker():
+    if not os.path.exists(DATABASE_PATH):
+        init_database()
+    else:
+        migrate_database()
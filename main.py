@@ -1,31 +1,140 @@
 import shutil
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session, send_file
+import atexit
+from flask import Flask, render_template, request, redirect, url_for, jsonify, session, send_file, send_from_directory, g, Response, stream_with_context
 from werkzeug.utils import secure_filename
 import os
 from datetime import datetime, timedelta, timezone
 import uuid
 import zipfile
 import tempfile
-from flask import after_this_request
+from flask import after_this_request, has_request_context
+from flask.json.provider import DefaultJSONProvider
+from markupsafe import Markup
+import gzip
 import hashlib
+import hmac
+import base64
+import json
+import math
+import mimetypes
+import queue
+import sqlite3
+import subprocess
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from functools import wraps
+from urllib.parse import quote
+import secrets
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
 import database as db
 
+try:
+    import fcntl  # 仅类Unix系统可用，用于多进程间的文件锁
+except ImportError:
+    fcntl = None
+
+try:
+    from PIL import Image, ImageOps  # 可选依赖，用于生成图片缩略图
+except ImportError:
+    Image = None
+
+try:
+    import brotli  # 可选依赖，未安装时只使用 gzip 压缩
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack  # 可选依赖，未安装时接口只返回 JSON
+except ImportError:
+    msgpack = None
+
 app = Flask(__name__)
 app.secret_key = 'your_secret_key'  # 设置密钥
 
 # 配置上传文件夹和限制
 UPLOAD_FOLDER = 'uploads'
+# 每个 worker 的请求线程数，需与 gunicorn 的 --threads 一致（SSE 连接上限据此计算）
+WORKER_THREADS = int(os.environ.get('WORKER_THREADS', 50))
 app.config.update(
     UPLOAD_FOLDER=UPLOAD_FOLDER,
     MAX_FILES_PER_UPLOAD=10,  # 每次上传最大文件数
     MAX_FILE_SIZE_MB=300,     # 单个文件最大大小（MB）
-    PERMANENT_SESSION_LIFETIME=timedelta(hours=2),  # session过期时间设置为2小时
+    PERMANENT_SESSION_LIFETIME=timedelta(hours=2),  # session过期时间设置为2小时（无操作超过该时间后过期）
+    SESSION_CACHE_SIZE=10000,                # 进程内会话缓存的最大条目数
+    JANITOR_INTERVAL_SECONDS=600,            # 定时清理任务执行间隔（秒）
+    JANITOR_LOCK_FILE='janitor.lock',        # 多个 gunicorn worker 之间选举清理任务执行者的锁文件
+    JANITOR_METRICS_FILE='janitor_metrics.json',  # 清理任务统计信息文件
+    UPLOAD_SESSION_EXPIRE_HOURS=24,          # 上传会话过期时间（小时）
+    ORPHAN_FOLDER_MIN_AGE_SECONDS=3600,      # 孤立文件夹至少闲置多久才清理（秒）
+    ZIP_TEMP_MAX_AGE_SECONDS=3600,           # 打包下载临时zip文件的最长保留时间（秒）
+    PREVIEW_CACHE_FOLDER='preview_cache',    # 缩略图缓存目录（按文件内容哈希命名）
+    PREVIEW_MAX_SIZE=320,                    # 缩略图最大边长（像素）
+    PREVIEW_MAX_SOURCE_MB=50,                # 超过该大小的源文件不生成预览（MB）
+    PREVIEW_WORKERS=2,                       # 生成预览的后台线程数
+    PREVIEW_RETRY_SECONDS=300,               # 预览生成失败后首次重试前的等待时间（秒），之后每次失败加倍
+    PREVIEW_MAX_ATTEMPTS=5,                  # 预览连续生成失败达到该次数后不再重试（文件被替换后重新计数）
+    SHARE_CACHE_SIZE=1024,                   # 进程内分享信息缓存的最大条目数
+    SHARE_CACHE_TTL_SECONDS=60,              # 分享信息缓存有效期（秒）
+    SHARE_CACHE_NEGATIVE_TTL_SECONDS=10,     # "分享不存在"结果的缓存有效期（秒）
+    FRAGMENT_CACHE_SIZE=5000,                # 用户主页片段缓存（项目行、统计卡片）的最大条目数
+    PROJECT_ACCESS_CACHE_SIZE=4096,          # 进程内项目权限缓存的最大条目数
+    PROJECT_ACCESS_CACHE_TTL_SECONDS=30,     # 项目权限缓存有效期（秒），协作关系变化时按版本号立即失效
+    COMPONENT_SEARCH_PAGE_SIZE=50,           # 元器件目录搜索每页默认条数（limit 参数最大200）
+    CACHE_VERSION_POLL_SECONDS=0.5,          # 后台线程同步跨进程缓存版本号和事件的间隔（秒）
+    CACHE_MAX_STALE_SECONDS=10,              # 同步线程超过该时间未成功运行时，各缓存直接读数据库
+    SHARE_ACCESS_FLUSH_SECONDS=5,            # 无限制分享的访问计数批量写入间隔（秒）
+    SIGNED_URL_SECRET=os.environ.get('SIGNED_URL_SECRET', app.secret_key),  # 下载链接签名密钥（需与 nginx 配置一致）
+    SIGNED_URL_EXPIRE_SECONDS=3600,          # 签名下载链接有效期（秒）
+    SHARE_LOG_FLUSH_SECONDS=2,               # 分享访问日志批量写入间隔（秒）
+    SHARE_LOG_QUEUE_SIZE=10000,              # 分享访问日志内存队列上限，写满时丢弃新事件
+    SHARE_LOG_RETENTION_DAYS=30,             # 分享访问明细保留天数
+    SHARE_HOURLY_RETENTION_DAYS=90,          # 按小时汇总的分享统计保留天数
+    SHARE_DAILY_RETENTION_DAYS=730,          # 按天汇总的分享统计保留天数
+    DOWNLOAD_LIMIT_STATE_FILE='download_limits.db',  # 分享下载限流状态文件（所有 worker 共享）
+    SHARE_MAX_CONCURRENT_DOWNLOADS=4,        # 单个分享同时进行的下载数上限（0 表示不限制）
+    GLOBAL_MAX_CONCURRENT_DOWNLOADS=16,      # 所有分享同时进行的下载数上限（0 表示不限制）
+    SHARE_MAX_BYTES_PER_SECOND=5 * 1024 * 1024,    # 单个分享的下载带宽上限（字节/秒，0 表示不限制）
+    GLOBAL_MAX_BYTES_PER_SECOND=20 * 1024 * 1024,  # 所有分享合计的下载带宽上限（字节/秒，0 表示不限制）
+    DOWNLOAD_QUEUE_WAIT_SECONDS=1,           # 下载名额已满时排队等待的最长时间（秒），超时返回429
+    DOWNLOAD_SLOT_LEASE_SECONDS=60,          # 下载名额租约时间（秒），传输和打包过程中每过三分之一自动续期，进程异常退出后自动释放
+    DOWNLOAD_CHUNK_SIZE=256 * 1024,          # 限速下载每次读取的字节数
+    DOWNLOAD_RESERVE_SECONDS=1,              # 限速下载每次预留的令牌量（按最严格的限速折算的秒数），每次预留一个写事务
+    EVENT_BUFFER_SIZE=1000,                  # 每个进程保留的最近事件数（用于断线重连补发和长轮询）
+    EVENT_STREAM_HEARTBEAT_SECONDS=25,       # SSE 心跳间隔（秒），同时检查会话是否过期
+    EVENT_STREAM_MAX_CLIENTS=max(1, WORKER_THREADS // 2),  # 每个进程同时等待事件的 SSE 连接和长轮询合计上限（占请求线程的一半）
+    EVENT_POLL_TIMEOUT_SECONDS=25,           # 长轮询无事件时的最长等待时间（秒）
+    EVENT_POLL_RETRY_SECONDS=10,             # 等待名额已满时长轮询立即返回，客户端间隔该秒数后再请求
+    EVENT_RETENTION_SECONDS=3600,            # 共享事件表保留时间（秒），由清理任务删除更早的事件
+    PROJECT_TOMBSTONE_RETENTION_DAYS=30,     # 项目删除记录保留天数，更早的同步令牌需要全量同步
+    COMPRESS_MIN_SIZE=1024,                  # 动态响应超过该字节数才压缩
+    COMPRESS_MIMETYPES={'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+                        'application/json', 'application/msgpack', 'image/svg+xml'},  # 允许压缩的响应类型
+    COMPRESS_GZIP_LEVEL=6,                   # 动态响应的 gzip 压缩级别
+    COMPRESS_BROTLI_QUALITY=4,               # 动态响应的 brotli 压缩质量（静态文件预压缩使用最高质量）
+    STATIC_COMPRESSED_FOLDER='static_compressed',  # 静态文件预压缩结果目录（启动时生成）
+    PASSWORD_VERIFY_WORKERS=min(4, os.cpu_count() or 1),  # 每个 worker 的密码校验进程数
+    PASSWORD_VERIFY_MAX_PENDING=32,          # 等待校验的登录请求上限，超出时直接提示稍后重试
+    PASSWORD_VERIFY_TIMEOUT_SECONDS=10,      # 单次登录等待密码校验的最长时间（秒）
 )
 
+db.configure_password_pool(app.config['PASSWORD_VERIFY_WORKERS'],
+                           app.config['PASSWORD_VERIFY_MAX_PENDING'],
+                           app.config['PASSWORD_VERIFY_TIMEOUT_SECONDS'])
+
+# 打包下载生成的临时zip文件前缀，便于定时清理任务识别
+ZIP_TEMP_PREFIX = 'pcb_zip_'
+
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
+if not os.path.exists(app.config['PREVIEW_CACHE_FOLDER']):
+    os.makedirs(app.config['PREVIEW_CACHE_FOLDER'])
+
 # 北京时间工具函数
 def get_beijing_time():
     """获取北京时间（UTC+8）"""
@@ -44,21 +153,217 @@ def beijing_time_from_iso(iso_string):
         dt = dt.astimezone(beijing_tz)
     return dt
 
+# ==================== 跨进程共享状态 ====================
+
+# 每个 worker 的同步线程定期从数据库读取缓存版本号（cache_versions）和新事件（app_events），
+# 请求路径只比较内存中的版本号，不访问数据库
+_shared_versions = {}
+_shared_state = {'synced_at': None, 'event_id': None, 'stats_event_id': None, 'session_change_id': None}
+_shared_sync_wakeup = threading.Event()
+_shared_versions_lock = threading.Lock()
+
+def shared_state_fresh():
+    """同步线程是否在 CACHE_MAX_STALE_SECONDS 内运行过"""
+    synced_at = _shared_state['synced_at']
+    return synced_at is not None and time.monotonic() - synced_at <= app.config['CACHE_MAX_STALE_SECONDS']
+
+def shared_version(name):
+    """获取共享版本号；同步线程长时间未运行时返回 None，调用方应放弃本地缓存"""
+    if not shared_state_fresh():
+        return None
+    return _shared_versions.get(name, 0)
+
+def merge_shared_versions(versions):
+    """合并读取到的版本号；版本号只增不减，避免较早读取的结果覆盖较新的值"""
+    with _shared_versions_lock:
+        for name, version in versions.items():
+            if version > _shared_versions.get(name, -1):
+                _shared_versions[name] = version
+
+def refresh_shared_versions():
+    """立即重新读取版本号，使本进程刚写入的修改在后续请求中马上可见"""
+    merge_shared_versions(db.get_cache_versions())
+
+def sync_shared_state(batch_size=500):
+    """读取所有缓存版本号、新事件和会话变更，事件按ID顺序推送给本进程的订阅者，变更的会话从本地缓存中淘汰"""
+    if _shared_state['event_id'] is None:
+        # 进程启动时从最新事件开始，不重放历史事件
+        _shared_state['event_id'] = db.get_latest_event_id()
+        _shared_state['stats_event_id'] = db.get_latest_event_id('stats')
+        _shared_state['session_change_id'] = db.get_latest_session_change_id()
+        reset_event_buffer(_shared_state['event_id'])
+    while True:
+        versions, events, session_changes = db.get_shared_state(
+            _shared_state['event_id'], _shared_state['session_change_id'], batch_size)
+        merge_shared_versions(versions)
+        for event in events:
+            dispatch_event(event)
+            _shared_state['event_id'] = event['id']
+        if session_changes:
+            evict_cached_sessions([sid for _, sid in session_changes])
+            _shared_state['session_change_id'] = session_changes[-1][0]
+        if len(events) < batch_size and len(session_changes) < batch_size:
+            break
+    _shared_state['synced_at'] = time.monotonic()
+
+def shared_state_loop():
+    while True:
+        try:
+            sync_shared_state()
+        except Exception as e:
+            print(f"同步共享状态失败: {e}")
+        # 本进程发布事件时会提前唤醒，以便立即推送
+        _shared_sync_wakeup.wait(app.config['CACHE_VERSION_POLL_SECONDS'])
+        _shared_sync_wakeup.clear()
+
+# ==================== 服务端会话 ====================
+
+# sid -> (会话数据, 过期时间戳)，按最近使用顺序排列
+_session_cache = OrderedDict()
+_session_cache_lock = threading.Lock()
+_session_cache_state = {'generation': 0}
+_session_serializer = TaggedJSONSerializer()
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """保存在服务端的会话，Cookie 中只有会话ID"""
+    
+    def __init__(self, initial=None, sid=None, expires_at=0, expired=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.expired = expired  # 请求携带的会话已过期或已被强制下线
+        self.rotate = False
+        self.modified = False
+
+    def regenerate(self):
+        """登录时更换会话ID，防止会话固定攻击"""
+        self.rotate = True
+        self.modified = True
+
+def session_cache_generation():
+    """返回本地会话缓存的代数（每次淘汰条目时递增）；同步线程长时间未运行时可能错过其他 worker 的修改，
+    此时清空缓存并返回 None"""
+    with _session_cache_lock:
+        if not shared_state_fresh():
+            _session_cache.clear()
+            _session_cache_state['generation'] += 1
+            return None
+        return _session_cache_state['generation']
+
+def cache_session(sid, data, expires_at, generation):
+    """写入本地会话缓存；读库期间有条目被淘汰（会话可能已被修改或删除）时不缓存"""
+    with _session_cache_lock:
+        if generation is None or generation != _session_cache_state['generation']:
+            return
+        _session_cache[sid] = (data, expires_at)
+        _session_cache.move_to_end(sid)
+        while len(_session_cache) > app.config['SESSION_CACHE_SIZE']:
+            _session_cache.popitem(last=False)
+
+def evict_cached_sessions(sids):
+    """淘汰指定会话的本地缓存（同步线程读到其他 worker 的会话变更时调用）"""
+    with _session_cache_lock:
+        for sid in sids:
+            _session_cache.pop(sid, None)
+        _session_cache_state['generation'] += 1
+
+def load_session_entry(sid):
+    """读取会话（优先使用本地缓存），返回 (会话数据, 过期时间戳)，会话不存在或已过期时返回 None；
+    缓存中的条目看起来已过期时重新读库，会话可能已在其他 worker 上续期"""
+    generation = session_cache_generation()
+    with _session_cache_lock:
+        entry = _session_cache.get(sid)
+        if entry:
+            if entry[1] <= time.time():
+                del _session_cache[sid]
+                entry = None
+            else:
+                _session_cache.move_to_end(sid)
+    
+    if entry is None:
+        row = db.get_user_session(sid)
+        if row:
+            entry = (_session_serializer.loads(row['data']), row['expires_at'])
+            cache_session(sid, *entry, generation)
+    return entry
+
+def revoke_user_sessions(user_id):
+    """强制用户下线：删除其所有会话并淘汰本进程中该用户的缓存条目，其他 worker 在同步到会话变更后淘汰"""
+    count = db.delete_sessions_for_user(user_id)
+    with _session_cache_lock:
+        sids = [sid for sid, (data, _) in _session_cache.items()
+                if user_id in (data.get('user_id'), data.get('admin_user_id'))]
+    evict_cached_sessions(sids)
+    publish_event('session-expired', user_ids=[user_id])
+    return count
+
+class SqliteSessionInterface(SessionInterface):
+    """SQLite 会话存储，前面有进程内 LRU 缓存；会话在无操作超过有效期后过期，使用过半时自动续期"""
+    
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid:
+            return ServerSideSession()
+        
+        entry = load_session_entry(sid)
+        if entry is None:
+            return ServerSideSession(expired=True)
+        return ServerSideSession(dict(entry[0]), sid=sid, expires_at=entry[1])
+
+    def save_session(self, app, session, response):
+        cookie_name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        
+        # 会话被清空（退出登录）：删除服务端记录和 Cookie
+        if not session:
+            if session.sid and session.modified:
+                db.delete_user_session(session.sid)
+                evict_cached_sessions([session.sid])
+                response.delete_cookie(cookie_name, domain=domain, path=path)
+            return
+        
+        lifetime = int(app.permanent_session_lifetime.total_seconds())
+        now = time.time()
+        # 只在数据变化或剩余有效期不足一半时写库（滑动续期）
+        if not session.modified and session.expires_at - now > lifetime / 2:
+            return
+        
+        if session.rotate and session.sid:
+            db.delete_user_session(session.sid)
+            evict_cached_sessions([session.sid])
+            session.sid = None
+        sid = session.sid or secrets.token_urlsafe(32)
+        expires_at = int(now) + lifetime
+        data = dict(session)
+        db.save_user_session(sid, data.get('user_id') or data.get('admin_user_id'),
+                             _session_serializer.dumps(data), expires_at)
+        cache_session(sid, data, expires_at, session_cache_generation())
+        
+        response.set_cookie(
+            cookie_name,
+            sid,
+            expires=expires_at,
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+app.session_interface = SqliteSessionInterface()
+
 # Session过期检查装饰器
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # 检查用户是否登录
+        # 检查用户是否登录（会话过期由服务端会话存储判断）
         if 'user_id' not in session:
-            return redirect(url_for('index'))
-        
-        # 检查session是否过期
-        if 'login_time' in session:
-            login_time = beijing_time_from_iso(session['login_time'])
-            current_time = get_beijing_time()
-            if current_time - login_time > app.config['PERMANENT_SESSION_LIFETIME']:
-                session.clear()
+            if session.expired:
                 return redirect(url_for('index', error='登录已过期，请重新登录'))
+            return redirect(url_for('index'))
         
         return f(*args, **kwargs)
     return decorated_function
@@ -67,17 +372,11 @@ def login_required(f):
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # 检查管理员是否登录
+        # 检查管理员是否登录（会话过期由服务端会话存储判断）
         if not session.get('admin_logged_in'):
-            return redirect(url_for('admin_login'))
-        
-        # 检查session是否过期
-        if 'admin_login_time' in session:
-            login_time = beijing_time_from_iso(session['admin_login_time'])
-            current_time = get_beijing_time()
-            if current_time - login_time > app.config['PERMANENT_SESSION_LIFETIME']:
-                session.clear()
+            if session.expired:
                 return redirect(url_for('admin_login', error='登录已过期，请重新登录'))
+            return redirect(url_for('admin_login'))
         
         return f(*args, **kwargs)
     return decorated_function
@@ -86,17 +385,11 @@ def admin_required(f):
 def api_login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # 检查用户是否登录
+        # 检查用户是否登录（会话过期由服务端会话存储判断）
         if 'user_id' not in session:
-            return jsonify({'error': '请先登录'}), 401
-        
-        # 检查session是否过期
-        if 'login_time' in session:
-            login_time = beijing_time_from_iso(session['login_time'])
-            current_time = get_beijing_time()
-            if current_time - login_time > app.config['PERMANENT_SESSION_LIFETIME']:
-                session.clear()
+            if session.expired:
                 return jsonify({'error': '登录已过期，请重新登录'}), 401
+            return jsonify({'error': '请先登录'}), 401
         
         return f(*args, **kwargs)
     return decorated_function
@@ -105,21 +398,342 @@ def api_login_required(f):
 def api_admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # 检查管理员是否登录
+        # 检查管理员是否登录（会话过期由服务端会话存储判断）
         if not session.get('admin_logged_in'):
-            return jsonify({'error': '管理员权限不足'}), 403
-        
-        # 检查session是否过期
-        if 'admin_login_time' in session:
-            login_time = beijing_time_from_iso(session['admin_login_time'])
-            current_time = get_beijing_time()
-            if current_time - login_time > app.config['PERMANENT_SESSION_LIFETIME']:
-                session.clear()
+            if session.expired:
                 return jsonify({'error': '登录已过期，请重新登录'}), 401
+            return jsonify({'error': '管理员权限不足'}), 403
         
         return f(*args, **kwargs)
     return decorated_function
 
+# ==================== 响应格式 ====================
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+def wants_msgpack():
+    """客户端在 Accept 中优先请求 msgpack 且已安装 msgpack 时返回 True"""
+    if msgpack is None or not has_request_context():
+        return False
+    return request.accept_mimetypes.best_match(['application/json', MSGPACK_MIMETYPE]) == MSGPACK_MIMETYPE
+
+class ApiJSONProvider(DefaultJSONProvider):
+    """jsonify 的响应提供者：按 Accept 协商返回 JSON 或 msgpack，处理函数无需区分"""
+    
+    def response(self, *args, **kwargs):
+        if not wants_msgpack():
+            response = super().response(*args, **kwargs)
+            if msgpack is not None:
+                response.vary.add('Accept')
+            return response
+        
+        if args and kwargs:
+            raise TypeError('app.json.response() takes either args or kwargs, not both')
+        obj = kwargs or (args[0] if len(args) == 1 else list(args) or None)
+        response = self._app.response_class(
+            msgpack.packb(obj, default=self.default, use_bin_type=True),
+            mimetype=MSGPACK_MIMETYPE
+        )
+        response.vary.add('Accept')
+        return response
+
+app.json = ApiJSONProvider(app)
+
+# 项目接口 fields 参数允许的字段
+PROJECT_FIELDS = frozenset([
+    'id', 'user_id', 'source', 'name', 'price', 'board_type', 'status', 'remark',
+    'storage_bytes', 'storage_files', 'change_seq', 'bom_total', 'created_at', 'updated_at',
+    'components', 'requirements', 'user_role', 'owner_username', 'is_shared_by_me', 'is_shared_to_me'
+])
+
+def parse_fields_param():
+    """解析 fields 参数，返回字段集合（始终包含 id），未指定时返回 None；包含未知字段时抛出 ValueError"""
+    raw = request.args.get('fields', '').strip()
+    if not raw:
+        return None
+    fields = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = fields - PROJECT_FIELDS
+    if unknown:
+        raise ValueError(f"未知字段: {', '.join(sorted(unknown))}")
+    fields.add('id')
+    return fields
+
+def shape_projects(projects, fields=None, component_refs=False):
+    """按 fields 裁剪项目字段；component_refs 为 True 时把元器件详情提取到目录中
+
+    返回 (项目列表, 元器件目录)，目录为 {元器件ID: {name, model, price}}，未提取时为 None
+    """
+    catalog = {} if component_refs else None
+    shaped = []
+    for project in projects:
+        if component_refs and 'components' in project and (fields is None or 'components' in fields):
+            refs = []
+            for component in project['components']:
+                catalog[component['id']] = {
+                    'name': component['name'],
+                    'model': component['model'],
+                    'price': component['price']
+                }
+                refs.append({'id': component['id'], 'quantity': component['quantity']})
+            project = dict(project, components=refs)
+        if fields is not None:
+            project = {key: value for key, value in project.items() if key in fields}
+        shaped.append(project)
+    return shaped, catalog
+
+# ==================== 条件请求（ETag） ====================
+
+# 同一次部署的所有 worker 使用相同的前缀，代码更新后旧的 ETag 全部失效
+_etag_salt = '|'.join(str(os.path.getmtime(path)) for path in (__file__, db.__file__))
+
+def versioned_etag(*version_names, private=True):
+    """根据共享版本号生成 ETag 的接口装饰器
+
+    在执行处理函数之前，用版本号、当前用户、请求路径和参数计算 ETag；
+    与 If-None-Match 相同时先从数据库重新读取版本号确认（其他 worker 的修改可能还未同步到本进程），
+    仍然一致才返回 304，不执行处理函数也不序列化 JSON。
+    版本号过期（同步线程未运行）时照常执行处理函数，不返回 ETag。
+    """
+    def compute_etag(versions, private):
+        key = '|'.join([
+            _etag_salt,
+            str(session.get('user_id') if private else ''),
+            request.full_path,
+            MSGPACK_MIMETYPE if wants_msgpack() else 'application/json',
+            ','.join(f'{name}:{version}' for name, version in zip(version_names, versions))
+        ])
+        return hashlib.sha1(key.encode()).hexdigest()[:24]
+    
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            versions = [shared_version(name) for name in version_names]
+            cache_control = 'private, no-cache' if private else 'no-cache'
+            if None in versions:
+                response = app.make_response(f(*args, **kwargs))
+                response.headers['Cache-Control'] = cache_control
+                return response
+            
+            etag = compute_etag(versions, private)
+            # 压缩后的响应使用弱 ETag，因此按弱比较匹配
+            matched = request.if_none_match.contains_weak(etag)
+            if matched:
+                refresh_shared_versions()
+                latest = [shared_version(name) for name in version_names]
+                if latest != versions:
+                    matched = False
+                    etag = compute_etag(latest, private)
+            if matched:
+                response = app.response_class(status=304)
+            else:
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            if private:
+                response.vary.add('Cookie')
+            if msgpack is not None:
+                response.vary.add('Accept')
+            return response
+        return decorated_function
+    return decorator
+
+@app.after_request
+def refresh_versions_after_write(response):
+    """写请求完成后立即刷新本进程的版本号，避免客户端随后的条件请求拿到修改前的 304"""
+    if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+        try:
+            refresh_shared_versions()
+        except sqlite3.Error as e:
+            print(f"刷新共享版本号失败: {e}")
+    return response
+
+# ==================== 响应压缩 ====================
+
+# 动态响应在 after_request 中按 Accept-Encoding 压缩；静态文件在启动时预压缩，请求时只选择对应的文件
+COMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+def compress_bytes(data, encoding, static=False):
+    """按指定编码压缩数据；static 为 True 时使用最高压缩级别（仅预压缩时使用）"""
+    if encoding == 'br':
+        quality = 11 if static else app.config['COMPRESS_BROTLI_QUALITY']
+        return brotli.compress(data, quality=quality)
+    level = 9 if static else app.config['COMPRESS_GZIP_LEVEL']
+    # mtime 固定为 0，使相同内容的压缩结果一致
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def choose_encoding(available=('br', 'gzip')):
+    """根据请求的 Accept-Encoding 选择压缩编码，客户端不接受任何可用编码时返回 None"""
+    best, best_quality = None, 0
+    for encoding in available:
+        if encoding == 'br' and brotli is None:
+            continue
+        quality = request.accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+@app.after_request
+def compress_response(response):
+    """压缩允许类型的动态响应（流式响应、文件下载和已压缩的响应除外）"""
+    if (request.method == 'HEAD'
+            or response.direct_passthrough
+            or response.is_streamed
+            or not 200 <= response.status_code < 300
+            or response.status_code in (204, 206)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in app.config['COMPRESS_MIMETYPES']):
+        return response
+    
+    data = response.get_data()
+    if len(data) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if not encoding:
+        return response
+    
+    response.set_data(compress_bytes(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # 压缩后的内容与原始内容字节不同，强 ETag 需要改为弱 ETag
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+# 相对路径 -> 已生成的压缩编码列表
+_static_compressed = {}
+
+def precompress_static_assets():
+    """预压缩静态目录中允许类型的文件，已是最新的压缩文件不会重复生成，返回生成的文件数"""
+    static_root = app.static_folder
+    output_root = app.config['STATIC_COMPRESSED_FOLDER']
+    encodings = ['gzip'] + (['br'] if brotli is not None else [])
+    generated = 0
+    
+    for dirpath, _, filenames in os.walk(static_root):
+        for filename in filenames:
+            source = os.path.join(dirpath, filename)
+            relative = os.path.relpath(source, static_root).replace(os.sep, '/')
+            mimetype = mimetypes.guess_type(filename)[0]
+            if mimetype not in app.config['COMPRESS_MIMETYPES']:
+                continue
+            source_stat = os.stat(source)
+            if source_stat.st_size < app.config['COMPRESS_MIN_SIZE']:
+                continue
+            
+            data = None
+            available = []
+            for encoding in encodings:
+                target = os.path.join(output_root, relative + COMPRESSED_SUFFIXES[encoding])
+                try:
+                    if os.path.getmtime(target) >= source_stat.st_mtime:
+                        available.append(encoding)
+                        continue
+                except OSError:
+                    pass
+                
+                if data is None:
+                    with open(source, 'rb') as f:
+                        data = f.read()
+                compressed = compress_bytes(data, encoding, static=True)
+                if len(compressed) >= len(data):
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                # 先写临时文件再替换，多个 worker 同时启动时不会读到写了一半的文件
+                temp_path = f"{target}.{os.getpid()}.tmp"
+                with open(temp_path, 'wb') as f:
+                    f.write(compressed)
+                os.replace(temp_path, target)
+                available.append(encoding)
+                generated += 1
+            
+            if available:
+                _static_compressed[relative] = available
+    return generated
+
+# ==================== 静态资源指纹 ====================
+
+# 启动时为静态文件计算内容哈希，模板通过 asset_url 引用带哈希的文件名（如 js/dashboard.3f9a1c2b7e4d.js），
+# 内容变化后文件名随之变化，因此带哈希的地址可以长期缓存
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+_asset_manifest = {}  # 相对路径 -> 带哈希的相对路径
+_asset_sources = {}   # 带哈希的相对路径 -> 相对路径
+
+def build_asset_manifest():
+    """计算静态目录中所有文件的内容哈希，返回文件数"""
+    static_root = app.static_folder
+    manifest = {}
+    for dirpath, _, filenames in os.walk(static_root):
+        for filename in filenames:
+            source = os.path.join(dirpath, filename)
+            relative = os.path.relpath(source, static_root).replace(os.sep, '/')
+            digest = hashlib.sha256()
+            with open(source, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), b''):
+                    digest.update(chunk)
+            root, ext = os.path.splitext(relative)
+            manifest[relative] = f"{root}.{digest.hexdigest()[:12]}{ext}"
+    
+    _asset_manifest.clear()
+    _asset_manifest.update(manifest)
+    _asset_sources.clear()
+    _asset_sources.update({hashed: relative for relative, hashed in manifest.items()})
+    return len(manifest)
+
+@app.template_global()
+def asset_url(filename):
+    """返回静态文件带内容哈希的地址，不在清单中的文件返回普通地址"""
+    return url_for('static', filename=_asset_manifest.get(filename, filename))
+
+def serve_static(filename):
+    """静态文件按 Accept-Encoding 返回预压缩版本，没有对应版本时返回原文件
+
+    通过带哈希的文件名请求时返回对应的原文件，并允许浏览器缓存一年
+    """
+    source = _asset_sources.get(filename)
+    if source is not None:
+        response = send_static_asset(source)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+    return send_static_asset(filename)
+
+def send_static_asset(filename):
+    available = _static_compressed.get(filename)
+    if available:
+        encoding = choose_encoding(available)
+        if encoding:
+            response = send_from_directory(
+                os.path.abspath(app.config['STATIC_COMPRESSED_FOLDER']),
+                filename + COMPRESSED_SUFFIXES[encoding],
+                mimetype=mimetypes.guess_type(filename)[0],
+                max_age=app.get_send_file_max_age(filename)
+            )
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            return response
+    
+    response = app.send_static_file(filename)
+    if available:
+        response.vary.add('Accept-Encoding')
+    return response
+
+app.view_functions['static'] = serve_static
+
+# 以 python main.py 运行时，密码校验子进程会重新导入本模块，只需要函数定义
+if not db.in_pool_worker():
+    build_asset_manifest()
+    
+    try:
+        generated = precompress_static_assets()
+        if generated:
+            print(f"预压缩静态文件 {generated} 个")
+    except OSError as e:
+        # 目录不可写时静态文件仍以原始内容返回
+        print(f"预压缩静态文件失败: {e}")
+
 # 模拟项目数据
 projects = [
     {
@@ -161,9 +775,12 @@ def login():
     password = request.form['password']
     
     # 使用数据库认证用户
-    user = db.authenticate_user(username, password)
+    try:
+        user = db.authenticate_user(username, password)
+    except db.PasswordVerifyBusy as e:
+        return redirect(url_for('index', error=str(e)))
     if user:
-        session.permanent = True  # 设置session为permanent
+        session.regenerate()  # 登录后更换会话ID
         session['user_id'] = user['id']
         session['username'] = user['username']
         session['is_admin'] = user['is_admin']
@@ -175,13 +792,13 @@ def login():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    # 从数据库获取用户项目
-    user_projects = db.get_user_projects(session['user_id'])
-    # 获取用户统计信息
-    stats = db.get_user_stats(session['user_id'])
-    # 获取用户设置
-    user_settings = db.get_user_settings(session['user_id'])
-    return render_template('dashboard.html', jobs=user_projects, stats=stats, user_settings=user_settings)
+    user_id = session['user_id']
+    # 项目行和统计卡片使用页面片段缓存，只有发生变化的部分才查询数据库并重新渲染
+    sync_token, project_rows = render_project_rows(user_id)
+    user_settings = get_dashboard_settings(user_id)
+    stats_html = render_stats_block(user_id, user_settings)
+    return render_template('dashboard.html', project_rows=project_rows, sync_token=sync_token,
+                           stats_html=stats_html, user_settings=user_settings)
 
 @app.route('/admin/login')
 def admin_login():
@@ -194,9 +811,12 @@ def admin_login_process():
     password = request.form['password']
     
     # 使用数据库认证管理员
-    user = db.authenticate_user(username, password)
+    try:
+        user = db.authenticate_user(username, password)
+    except db.PasswordVerifyBusy as e:
+        return redirect(url_for('admin_login', error=str(e)))
     if user and user['is_admin']:
-        session.permanent = True  # 设置session为permanent
+        session.regenerate()  # 登录后更换会话ID
         session['admin_logged_in'] = True
         session['admin_user_id'] = user['id']
         session['admin_username'] = user['username']
@@ -231,7 +851,8 @@ def session_status():
         login_time = beijing_time_from_iso(session['login_time'])
         current_time = get_beijing_time()
         elapsed_time = current_time - login_time
-        remaining_time = app.config['PERMANENT_SESSION_LIFETIME'] - elapsed_time
+        # 会话有操作时会自动续期，剩余时间以服务端会话的过期时间戳为准
+        remaining_seconds = max(int(session.expires_at - time.time()), 0)
         
         return jsonify({
             'user_id': session['user_id'],
@@ -239,8 +860,8 @@ def session_status():
             'login_time': session['login_time'],
             'current_time': current_time.isoformat(),
             'elapsed_time_seconds': int(elapsed_time.total_seconds()),
-            'remaining_time_seconds': int(remaining_time.total_seconds()) if remaining_time.total_seconds() > 0 else 0,
-            'is_expired': remaining_time.total_seconds() <= 0,
+            'remaining_time_seconds': remaining_seconds,
+            'is_expired': remaining_seconds <= 0,
             'timezone': 'Asia/Shanghai (UTC+8)'
         })
     else:
@@ -248,27 +869,89 @@ def session_status():
 
 # API 路由
 @app.route('/api/sources')
+@versioned_etag('config', private=False)
 def get_sources():
     """获取所有来源选项"""
-    sources = db.get_source_config()
+    sources = get_config_options('source')
     return jsonify([{"id": s["id"], "name": s["name"]} for s in sources])
 
 @app.route('/api/board-types')
+@versioned_etag('config', private=False)
 def get_board_types():
     """获取所有电路板类型"""
-    board_types = db.get_board_type_config()
+    board_types = get_config_options('board_type')
     return jsonify([{"id": t["id"], "name": t["name"]} for t in board_types])
 
+def encode_component_cursor(key):
+    """把元器件搜索的下一页键编码为不透明的游标字符串"""
+    if key is None:
+        return None
+    raw = json.dumps(list(key), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_component_cursor(cursor):
+    """解析 encode_component_cursor 生成的游标，格式不正确时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        tier, name, component_id = json.loads(raw.decode('utf-8'))
+    except Exception:
+        raise ValueError(cursor)
+    if tier not in (0, 1) or not isinstance(name, str) or type(component_id) is not int:
+        raise ValueError(cursor)
+    return tier, name, component_id
+
+def component_search_page():
+    """按请求参数 q、cursor、limit 查询一页元器件，返回 (元器件列表, 下一页游标)，参数无效时抛出 ValueError（消息为错误提示）"""
+    query = request.args.get('q', '').strip()
+    try:
+        limit = min(max(int(request.args.get('limit', app.config['COMPONENT_SEARCH_PAGE_SIZE'])), 1), 200)
+    except ValueError:
+        raise ValueError('分页参数无效')
+    cursor = request.args.get('cursor')
+    try:
+        after = decode_component_cursor(cursor) if cursor else None
+    except ValueError:
+        raise ValueError('无效的分页游标')
+    
+    items, next_key = db.search_components(query, after, limit)
+    return items, encode_component_cursor(next_key)
+
+@app.route('/api/components/search')
+@versioned_etag('components', private=False)
+def search_components():
+    """分页搜索元器件目录（名称和型号的前缀及子串匹配）
+
+    q 为空时按名称浏览全部元器件；cursor 为上一页返回的 next_cursor，
+    返回 {"items": [...], "next_cursor": 游标或 null}
+    """
+    try:
+        items, next_cursor = component_search_page()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
 @app.route('/api/components')
+@versioned_etag('components', private=False)
 def get_all_components():
-    """获取所有元器件"""
-    components = db.get_all_components()
-    return jsonify(components)
+    """旧接口（已弃用）：返回 /api/components/search 第一页的元器件数组，格式与旧版相同；
+    还有更多元器件时通过 Link 头给出下一页的搜索地址"""
+    try:
+        items, next_cursor = component_search_page()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = jsonify(items)
+    response.headers['Deprecation'] = 'true'
+    if next_cursor:
+        next_url = url_for('search_components', q=request.args.get('q', '').strip() or None,
+                           limit=request.args.get('limit'), cursor=next_cursor)
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response
 
 @app.route('/api/status')
+@versioned_etag('config', private=False)
 def get_status_options():
     """获取所有状态选项"""
-    status_options = db.get_status_config()
+    status_options = get_config_options('status')
     return jsonify([{
         "value": s["value"],
         "label": s["label"],
@@ -276,10 +959,11 @@ def get_status_options():
     } for s in status_options])
 
 @app.route('/api/dropdown-options')
+@versioned_etag('config', private=False)
 def get_dropdown_options():
-    sources = db.get_source_config()
-    board_types = db.get_board_type_config()
-    status_options = db.get_status_config()
+    sources = get_config_options('source')
+    board_types = get_config_options('board_type')
+    status_options = get_config_options('status')
     
     return jsonify({
         "sources": [{"value": s["name"], "label": s["name"]} for s in sources],
@@ -291,29 +975,129 @@ def get_dropdown_options():
         } for s in status_options]
     })
 
+# 用户主页初始化数据的各个部分，格式与对应的单独接口相同（components 为元器件搜索接口的第一页）
+BOOTSTRAP_SECTIONS = ('sources', 'board_types', 'statuses', 'components', 'stats', 'settings', 'jobs')
+
+@app.route('/api/bootstrap')
+@api_login_required
+@versioned_etag('config', 'components', 'project_changes', 'users', 'user_settings')
+def get_bootstrap():
+    """一次返回用户主页初始化需要的数据，代替分别请求来源、类型、状态、元器件、统计、设置和项目列表
+
+    include=a,b 只返回指定部分（默认全部）；jobs 为 {"token", "projects", "deleted", "full"}，
+    数据库部分在同一个连接中读取
+    """
+    raw = request.args.get('include', '').strip()
+    include = {name.strip() for name in raw.split(',') if name.strip()} if raw else set(BOOTSTRAP_SECTIONS)
+    unknown = include - set(BOOTSTRAP_SECTIONS)
+    if unknown:
+        return jsonify({'error': f"未知的数据项: {', '.join(sorted(unknown))}"}), 400
+    
+    data = {}
+    if 'sources' in include:
+        data['sources'] = [{"id": s["id"], "name": s["name"]} for s in get_config_options('source')]
+    if 'board_types' in include:
+        data['board_types'] = [{"id": t["id"], "name": t["name"]} for t in get_config_options('board_type')]
+    if 'statuses' in include:
+        data['statuses'] = [{
+            "value": s["value"],
+            "label": s["label"],
+            "color": s["color"]
+        } for s in get_config_options('status')]
+    
+    db_sections = include & {'components', 'stats', 'settings', 'jobs'}
+    if db_sections:
+        data.update(db.get_dashboard_data(session['user_id'], db_sections, app.config['COMPONENT_SEARCH_PAGE_SIZE']))
+        if 'components' in data:
+            items, next_key = data['components']
+            data['components'] = {'items': items, 'next_cursor': encode_component_cursor(next_key)}
+    return jsonify(data)
+
 @app.route('/api/jobs')
 @api_login_required
+@versioned_etag('project_changes')
 def get_jobs():
-    """获取当前用户的项目列表"""
-    user_projects = db.get_user_projects(session['user_id'])
-    return jsonify(user_projects)
+    """获取当前用户的项目列表
+
+    带 since 参数时只返回该同步令牌之后新增、修改和不再可见的项目：
+    {"token": 新令牌, "projects": [...], "deleted": [项目ID...], "full": 是否为全量列表}
+    fields=a,b 只返回指定字段；components=ref 时元器件只包含 id 和数量，
+    名称、型号、价格放在 component_catalog 中（此时不带 since 的响应也为 {"projects": [...], ...}）
+    """
+    try:
+        fields = parse_fields_param()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    component_refs = request.args.get('components') == 'ref'
+    
+    since = request.args.get('since')
+    if since is None:
+        user_projects, catalog = shape_projects(db.get_user_projects(session['user_id']), fields, component_refs)
+        if component_refs:
+            return jsonify({'projects': user_projects, 'component_catalog': catalog})
+        return jsonify(user_projects)
+    
+    try:
+        since = int(since)
+    except ValueError:
+        return jsonify({'error': '同步令牌无效'}), 400
+    if since < 0:
+        return jsonify({'error': '同步令牌无效'}), 400
+    
+    changes = db.get_user_project_changes(session['user_id'], since)
+    changes['projects'], catalog = shape_projects(changes['projects'], fields, component_refs)
+    if component_refs:
+        changes['component_catalog'] = catalog
+    return jsonify(changes)
+
+@app.route('/api/jobs/search')
+@api_login_required
+def search_jobs():
+    """全文搜索当前用户可访问的项目（名称、备注、需求、元器件）"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': '缺少搜索关键词'}), 400
+
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': '分页参数无效'}), 400
+
+    try:
+        results, total = db.search_projects(session['user_id'], query, page, per_page)
+        return jsonify({
+            'query': query,
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'results': results
+        })
+    except Exception as e:
+        return jsonify({'error': f'搜索项目失败: {str(e)}'}), 500
 
 @app.route('/api/jobs/<int:job_id>')
 @api_login_required
+@versioned_etag('project_changes', 'project_access')
 def get_job(job_id):
     """获取项目详情"""
     user_id = session['user_id']
     
     # 检查用户是否有访问权限
-    access = db.check_project_access(job_id, user_id)
+    access = get_project_access(job_id, user_id)
     if not access['access']:
         return jsonify({"error": "项目不存在或无访问权限"}), 404
     
+    try:
+        fields = parse_fields_param()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     # 如果是项目所有者，直接获取项目
     if access['permission'] == 'owner':
         job = db.get_project_by_id(job_id, user_id)
-    if job:
-        return jsonify(job)
+        if job:
+            return jsonify(shape_projects([job], fields)[0][0])
         return jsonify({"error": "项目不存在"}), 404
     
     # 如果是协作者，获取项目但不验证所有者
@@ -324,7 +1108,7 @@ def get_job(job_id):
         # 如果是协作项目，获取项目所有者信息
         owner_info = db.get_user_by_id(job['user_id'])
         job['owner_username'] = owner_info['username'] if owner_info else '未知用户'
-        return jsonify(job)
+        return jsonify(shape_projects([job], fields)[0][0])
     
     return jsonify({"error": "项目不存在"}), 404
 
@@ -340,7 +1124,7 @@ def create_job():
                 return jsonify({"error": f"缺少必需字段: {field}"}), 400
 
         # 验证状态值是否有效
-        status_options = db.get_status_config()
+        status_options = get_config_options('status')
         valid_statuses = [s['value'] for s in status_options]
         if data['status'] not in valid_statuses:
             return jsonify({"error": "无效的状态值"}), 400
@@ -350,6 +1134,7 @@ def create_job():
         
         # 获取创建的项目详情
         new_project = db.get_project_by_id(project_id, session['user_id'])
+        publish_project_event(project_id, 'project', {'action': 'created'})
         
         return jsonify({"message": "项目创建成功", "project": new_project}), 201
         
@@ -365,7 +1150,7 @@ def update_job(job_id):
         
         # 验证状态值是否有效
         if 'status' in data:
-            status_options = db.get_status_config()
+            status_options = get_config_options('status')
             valid_statuses = [s['value'] for s in status_options]
             if data['status'] not in valid_statuses:
                 return jsonify({"error": "无效的状态值"}), 400
@@ -378,6 +1163,7 @@ def update_job(job_id):
 
         # 获取更新后的项目详情
         updated_project = db.get_project_by_id(job_id, session['user_id'])
+        publish_project_event(job_id, 'project', {'action': 'updated'})
         
         return jsonify({"message": "项目更新成功", "project": updated_project})
         
@@ -388,9 +1174,13 @@ def update_job(job_id):
 @api_login_required
 def delete_job(job_id):
     
+    # 删除后无法再查到协作者，先记录需要通知的用户
+    member_ids = db.get_project_member_ids(job_id)
     success = db.delete_project(job_id, session['user_id'])
     
     if success:
+        invalidate_access_cache()
+        publish_event('project', {'project_id': job_id, 'action': 'deleted'}, member_ids)
         return jsonify({"message": "项目删除成功"}), 200
     return jsonify({"error": "项目不存在或无访问权限"}), 404
 
@@ -401,17 +1191,16 @@ def get_job_components(job_id):
     user_id = session['user_id']
     
     # 检查用户是否有访问权限（所有者或协作者都可以查看元件）
-    access = db.check_project_access(job_id, user_id)
+    access = get_project_access(job_id, user_id)
     if not access['access']:
         return jsonify({"error": "项目不存在或无访问权限"}), 404
     
-    # 获取项目详情（不验证所有者）
-    job = db.get_project_by_id(job_id)
-    if job:
-        total_price = sum(c.get('price', 0) * c.get('quantity', 0) for c in job['components'])
+    # 元器件总价由触发器维护在 projects.bom_total 中，这里只读取清单和该字段
+    bom = db.get_project_bom(job_id)
+    if bom:
         return jsonify({
-            "price": total_price,
-            "components": job['components']
+            "price": bom['bom_total'],
+            "components": bom['components']
         })
     return jsonify({"error": "项目不存在"}), 404
 
@@ -422,7 +1211,7 @@ def get_job_requirements(job_id):
     user_id = session['user_id']
     
     # 检查用户是否有访问权限（所有者或协作者都可以查看要求）
-    access = db.check_project_access(job_id, user_id)
+    access = get_project_access(job_id, user_id)
     if not access['access']:
         return jsonify({"error": "项目不存在或无访问权限"}), 404
     
@@ -434,13 +1223,25 @@ def get_job_requirements(job_id):
 
 @app.route('/api/user/stats')
 @api_login_required
+@versioned_etag('project_changes', 'users')
 def get_user_stats():
     """获取用户统计信息"""
     stats = db.get_user_stats(session['user_id'])
-    # 更新用户统计数据加载时间
-    session['last_stats_time'] = get_beijing_time()
     return jsonify(stats)
 
+def check_storage_quota(project_id, incoming_bytes):
+    """检查上传后项目所有者是否会超出存储配额，超出时返回错误信息"""
+    state = db.get_upload_quota_state(project_id)
+    if not state or state['storage_quota_bytes'] is None:
+        return None
+    
+    # 完成上传时会整体替换项目文件夹，因此需要先扣除项目当前占用的空间
+    projected_bytes = state['user_bytes'] - state['project_bytes'] + incoming_bytes
+    if projected_bytes > state['storage_quota_bytes']:
+        quota_mb = state['storage_quota_bytes'] / 1024 / 1024
+        return f'超出存储配额限制（{quota_mb:.1f}MB），请清理文件或联系管理员'
+    return None
+
 @app.route('/api/upload/start', methods=['POST'])
 @api_login_required
 def start_upload():
@@ -449,9 +1250,18 @@ def start_upload():
     data = request.get_json()
     project_id = data.get('project_id')
     total_files = data.get('total_files')
+    total_size = data.get('total_size', 0)  # 本次上传文件总字节数（用于配额检查）
     
     if not project_id or not total_files:
         return jsonify({'error': '缺少必要参数'}), 400
+    
+    try:
+        total_files = int(total_files)
+        total_size = int(total_size or 0)
+    except (TypeError, ValueError):
+        return jsonify({'error': '文件数量或大小参数无效'}), 400
+    if total_files < 1 or total_size < 0:
+        return jsonify({'error': '文件数量或大小参数无效'}), 400
 
     # 验证文件数量限制
     if total_files > app.config['MAX_FILES_PER_UPLOAD']:
@@ -461,7 +1271,7 @@ def start_upload():
 
     # 查找项目信息 - 检查用户是否有访问权限
     user_id = session['user_id']
-    access = db.check_project_access(project_id, user_id)
+    access = get_project_access(project_id, user_id)
     
     if not access['access']:
         return jsonify({'error': '项目不存在或无访问权限'}), 404
@@ -480,6 +1290,11 @@ def start_upload():
     if not owner_info:
         return jsonify({'error': '项目所有者不存在'}), 404
 
+    # 使用数据库中记录的存储用量检查配额，无需扫描磁盘
+    quota_error = check_storage_quota(project_id, total_size or 0)
+    if quota_error:
+        return jsonify({'error': quota_error}), 400
+
     # 创建新的上传会话
     session_id = str(uuid.uuid4())
     username = session['username']
@@ -530,6 +1345,7 @@ def upload_files():
         os.makedirs(temp_dir)
 
     uploaded_files = []
+    uploaded_bytes = upload_info['uploaded_bytes']
     try:
         for file in files:
             if file.filename:
@@ -546,12 +1362,19 @@ def upload_files():
                         'error': f'文件 {file.filename} 超出大小限制 {app.config["MAX_FILE_SIZE_MB"]}MB'
                     }), 400
                 
+                # 按已上传的累计大小检查存储配额
+                uploaded_bytes += file_size
+                quota_error = check_storage_quota(upload_info['project_id'], uploaded_bytes)
+                if quota_error:
+                    os.remove(target_path)
+                    return jsonify({'error': quota_error}), 400
+                
                 uploaded_files.append(relative_path)
                 upload_info['file_list'].append(relative_path)
 
         # 更新已上传文件计数
         new_uploaded_count = upload_info['uploaded_files'] + len(uploaded_files)
-        db.update_upload_session(session_id, new_uploaded_count, upload_info['file_list'])
+        db.update_upload_session(session_id, new_uploaded_count, upload_info['file_list'], uploaded_bytes)
 
         # 检查是否所有文件都已上传
         is_complete = new_uploaded_count >= upload_info['total_files']
@@ -593,7 +1416,7 @@ def complete_upload():
     try:
         # 检查用户对项目的访问权限
         user_id = session['user_id']
-        access = db.check_project_access(upload_info['project_id'], user_id)
+        access = get_project_access(upload_info['project_id'], user_id)
         
         if not access['access']:
             return jsonify({'error': '项目不存在或无访问权限'}), 404
@@ -624,8 +1447,19 @@ def complete_upload():
         # 将临时目录重命名为最终目录
         os.rename(upload_info['temp_dir'], final_dir)
 
+        # 更新项目和所有者的存储用量以及文件索引（只扫描本次提交的目录）
+        committed_files = db.list_directory_files(final_dir)
+        db.set_project_storage(upload_info['project_id'],
+                               sum(size for _, size, _ in committed_files), len(committed_files))
+        db.replace_project_files(upload_info['project_id'], committed_files)
+
+        # 在后台为新上传的图片和PDF生成预览
+        _preview_executor.submit(enqueue_directory_previews, final_dir)
+
         # 清理会话信息
         db.delete_upload_session(session_id)
+        publish_project_event(upload_info['project_id'], 'upload',
+                              {'total_files': upload_info['uploaded_files']})
 
         return jsonify({
             'message': '文件上传完成',
@@ -636,16 +1470,431 @@ def complete_upload():
     except Exception as e:
         return jsonify({'error': f'完成上传失败: {str(e)}'}), 500
 
-def cleanup_expired_sessions():
-    """清理过期的上传会话"""
+# ==================== 定时清理任务 ====================
+
+_janitor_lock_handle = None
+
+def start_background_task(name, interval, func):
+    """启动后台守护线程，按固定间隔循环执行任务；密码校验子进程重新导入本模块时不启动"""
+    if db.in_pool_worker():
+        return None
+    def loop():
+        while True:
+            try:
+                func()
+            except Exception as e:
+                print(f"后台任务 {name} 执行失败: {e}")
+            time.sleep(interval)
+    
+    thread = threading.Thread(target=loop, name=name, daemon=True)
+    thread.start()
+    return thread
+
+def acquire_janitor_leadership():
+    """通过文件锁在多个 worker 进程中选出唯一的清理任务执行者"""
+    global _janitor_lock_handle
+    if _janitor_lock_handle is not None:
+        return True
+    if fcntl is None:
+        # 不支持 fcntl 的平台（如 Windows 开发环境）通常只有单进程，直接执行
+        return True
+    
+    handle = open(app.config['JANITOR_LOCK_FILE'], 'a+')
     try:
-        # 使用数据库清理过期会话
-        db.cleanup_expired_upload_sessions(hours=24)
-    except Exception as e:
-        print(f"清理过期会话失败: {e}")
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    
+    # 锁在进程存活期间一直持有，进程退出后由操作系统释放，其他 worker 下一轮接管
+    _janitor_lock_handle = handle
+    return True
+
+def cleanup_stale_zip_files(max_age_seconds):
+    """清理打包下载遗留的临时zip文件"""
+    result = {'files': 0, 'bytes': 0}
+    temp_dir = tempfile.gettempdir()
+    now = time.time()
+    for item in os.listdir(temp_dir):
+        if not item.startswith(ZIP_TEMP_PREFIX) or not item.endswith('.zip'):
+            continue
+        item_path = os.path.join(temp_dir, item)
+        try:
+            if now - os.path.getmtime(item_path) < max_age_seconds:
+                continue
+            size = os.path.getsize(item_path)
+            os.unlink(item_path)
+            result['files'] += 1
+            result['bytes'] += size
+        except OSError:
+            pass
+    return result
+
+def run_janitor():
+    """执行一轮清理：过期上传会话及临时文件夹、过期分享、孤立记录和文件夹、失效的预览（并重试失败的预览）、临时zip文件"""
+    start = time.time()
+    upload_sessions = db.cleanup_expired_upload_sessions(hours=app.config['UPLOAD_SESSION_EXPIRE_HOURS'])
+    stale_temp_dirs = db.cleanup_stale_temp_folders(app.config['UPLOAD_SESSION_EXPIRE_HOURS'] * 3600)
+    expired_shares = db.cleanup_expired_shares()
+    login_sessions = db.cleanup_expired_login_sessions()
+    orphaned_records = db.cleanup_orphaned_records()
+    orphaned_folders = db.cleanup_orphaned_project_folders(app.config['ORPHAN_FOLDER_MIN_AGE_SECONDS'])
+    previews = cleanup_stale_previews(app.config['ORPHAN_FOLDER_MIN_AGE_SECONDS'])
+    preview_retries = retry_failed_previews()
+    zip_files = cleanup_stale_zip_files(app.config['ZIP_TEMP_MAX_AGE_SECONDS'])
+    now = int(time.time())
+    share_log_rows = db.prune_share_access_log(
+        now - app.config['SHARE_LOG_RETENTION_DAYS'] * 86400,
+        now - app.config['SHARE_HOURLY_RETENTION_DAYS'] * 86400,
+        now - app.config['SHARE_DAILY_RETENTION_DAYS'] * 86400
+    )
+    events = db.prune_events(now - app.config['EVENT_RETENTION_SECONDS'])
+    project_tombstones = db.prune_project_tombstones(now - app.config['PROJECT_TOMBSTONE_RETENTION_DAYS'] * 86400)
+    
+    return {
+        'upload_sessions': upload_sessions['sessions'],
+        'temp_dirs': upload_sessions['temp_dirs'] + stale_temp_dirs['temp_dirs'],
+        'expired_shares': expired_shares,
+        'login_sessions': login_sessions,
+        'orphaned_records': sum(orphaned_records.values()),
+        'orphaned_folders': orphaned_folders['folders'],
+        'preview_rows': previews['rows'],
+        'preview_files': previews['files'],
+        'preview_retries': preview_retries,
+        'zip_files': zip_files['files'],
+        'share_log_rows': share_log_rows,
+        'events': events,
+        'project_tombstones': project_tombstones,
+        'bytes_reclaimed': (upload_sessions['bytes'] + stale_temp_dirs['bytes'] +
+                            orphaned_folders['bytes'] + previews['bytes'] + zip_files['bytes']),
+        'duration_ms': int((time.time() - start) * 1000)
+    }
 
-# 每次启动时清理一次过期会话
-cleanup_expired_sessions()
+def load_janitor_metrics():
+    """读取清理任务统计信息（由执行清理的 worker 写入文件，所有 worker 均可读取）"""
+    try:
+        with open(app.config['JANITOR_METRICS_FILE'], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'runs': 0, 'last_run': None, 'last_result': None, 'totals': {}}
+
+def janitor_tick():
+    """定时清理任务入口：只有获得锁的 worker 才会执行清理"""
+    if not acquire_janitor_leadership():
+        return
+    
+    result = run_janitor()
+    metrics = load_janitor_metrics()
+    totals = metrics.get('totals', {})
+    for key, value in result.items():
+        if key != 'duration_ms':
+            totals[key] = totals.get(key, 0) + value
+    metrics.update({
+        'runs': metrics.get('runs', 0) + 1,
+        'last_run': get_beijing_time().isoformat(),
+        'last_result': result,
+        'totals': totals,
+        'leader_pid': os.getpid()
+    })
+    
+    # 先写临时文件再替换，避免读取到写了一半的文件
+    metrics_file = app.config['JANITOR_METRICS_FILE']
+    with open(metrics_file + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, ensure_ascii=False)
+    os.replace(metrics_file + '.tmp', metrics_file)
+
+# ==================== 签名下载链接 ====================
+
+# 签名链接格式：/files/<scope>/<所有者>/<所有者-项目名>/<相对路径>?ts=<签发时间>&e=<有效秒数>&st=<签名>
+# scope 为 p<项目ID> 或 s<分享ID>，签名为 HMAC-SHA256("<uri>|<ts>|<e>") 的 base64url 编码（无填充），
+# 与 nginx secure_link_hmac 模块的格式一致，nginx 可以直接校验并从 uploads 目录发送文件
+SIGNED_FILE_URL_PREFIX = '/files'
+
+def sign_file_uri(uri, issued_at, lifetime):
+    """计算下载链接的签名"""
+    message = f"{uri}|{issued_at}|{lifetime}".encode()
+    digest = hmac.new(app.config['SIGNED_URL_SECRET'].encode(), message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+def build_signed_file_url(scope, owner_username, project_folder_name, relative_path, lifetime=None):
+    """生成项目文件的签名下载地址"""
+    lifetime = int(lifetime or app.config['SIGNED_URL_EXPIRE_SECONDS'])
+    issued_at = int(time.time())
+    uri = f"{SIGNED_FILE_URL_PREFIX}/{scope}/{owner_username}/{project_folder_name}/{relative_path}"
+    return f"{quote(uri)}?ts={issued_at}&e={lifetime}&st={sign_file_uri(uri, issued_at, lifetime)}"
+
+@app.route(f'{SIGNED_FILE_URL_PREFIX}/<scope>/<path:file_path>')
+def download_signed_file(scope, file_path):
+    """校验签名后直接下载文件（不读取数据库和会话）"""
+    try:
+        issued_at = int(request.args.get('ts', ''))
+        lifetime = int(request.args.get('e', ''))
+    except ValueError:
+        return jsonify({"error": "下载链接无效"}), 403
+    
+    if time.time() > issued_at + lifetime:
+        return jsonify({"error": "下载链接已过期"}), 403
+    
+    if not hmac.compare_digest(request.args.get('st', ''), sign_file_uri(request.path, issued_at, lifetime)):
+        return jsonify({"error": "下载链接无效"}), 403
+    
+    upload_root = os.path.abspath(app.config['UPLOAD_FOLDER'])
+    full_file_path = os.path.abspath(os.path.join(upload_root, file_path))
+    
+    # 安全检查：确保文件路径在上传目录内
+    if not full_file_path.startswith(upload_root + os.sep):
+        return jsonify({"error": "非法的文件路径"}), 400
+    
+    if not os.path.isfile(full_file_path):
+        return jsonify({"error": "文件不存在"}), 404
+    
+    # 分享签发的链接同样受分享下载限流约束
+    if scope.startswith('s'):
+        holder = acquire_download_slot(scope[1:])
+        if not holder:
+            return too_many_downloads_response()
+        try:
+            return send_share_file_limited(scope[1:], holder, full_file_path, os.path.basename(full_file_path))
+        except Exception:
+            release_download_slot(holder)
+            raise
+    
+    return send_file(
+        full_file_path,
+        as_attachment=True,
+        download_name=os.path.basename(full_file_path)
+    )
+
+# ==================== 文件预览 ====================
+
+PREVIEW_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
+PREVIEW_PDF_EXTENSIONS = {'.pdf'}
+
+# 本地PDF渲染器（poppler-utils 提供的 pdftoppm），不存在时不生成PDF预览
+PDF_RENDERER = shutil.which('pdftoppm')
+
+_preview_executor = ThreadPoolExecutor(max_workers=app.config['PREVIEW_WORKERS'], thread_name_prefix='preview')
+_preview_pending = set()
+_preview_lock = threading.Lock()
+
+def is_previewable(extension):
+    """判断该扩展名的文件在当前环境下能否生成预览"""
+    if extension in PREVIEW_IMAGE_EXTENSIONS:
+        return Image is not None
+    if extension in PREVIEW_PDF_EXTENSIONS:
+        return PDF_RENDERER is not None
+    return False
+
+def get_preview_file_key(file_path):
+    """根据文件路径、大小和修改时间计算预览索引键，文件被替换后自动失效"""
+    stat = os.stat(file_path)
+    key_source = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(key_source.encode('utf-8')).hexdigest()
+
+def get_preview_version(file_path):
+    """预览地址中的版本参数：与索引键使用相同的修改时间（纳秒）和大小，同一秒内替换文件也会得到新地址"""
+    stat = os.stat(file_path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+def hash_file_content(file_path):
+    """分块计算文件内容的SHA-256哈希"""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def render_preview(file_path, extension, output_path):
+    """生成缩略图：图片使用 Pillow，PDF 使用 pdftoppm 渲染第一页"""
+    max_size = app.config['PREVIEW_MAX_SIZE']
+    if extension in PREVIEW_IMAGE_EXTENSIONS:
+        with Image.open(file_path) as img:
+            img.draft('RGB', (max_size, max_size))  # JPEG 可直接按缩小尺寸解码
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_size, max_size))
+            if img.mode in ('RGBA', 'LA', 'P'):
+                img = img.convert('RGBA')
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.split()[-1])
+                img = background
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+            img.save(output_path, 'JPEG', quality=80, optimize=True)
+    else:
+        output_prefix = output_path[:-len('.png')]
+        subprocess.run(
+            [PDF_RENDERER, '-png', '-f', '1', '-l', '1', '-singlefile',
+             '-scale-to', str(max_size), file_path, output_prefix],
+            check=True, timeout=60, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+def generate_preview(file_path, file_key):
+    """后台生成单个文件的预览并记录到数据库"""
+    try:
+        extension = os.path.splitext(file_path)[1].lower()
+        if os.path.getsize(file_path) > app.config['PREVIEW_MAX_SOURCE_MB'] * 1024 * 1024:
+            db.save_file_preview(file_key, None, None, 'unsupported', os.path.abspath(file_path))
+            return
+        
+        content_hash = hash_file_content(file_path)
+        preview_file = content_hash + ('.jpg' if extension in PREVIEW_IMAGE_EXTENSIONS else '.png')
+        preview_path = os.path.join(app.config['PREVIEW_CACHE_FOLDER'], preview_file)
+        
+        # 相同内容的文件共享同一个缓存预览
+        if not os.path.exists(preview_path):
+            temp_path = os.path.join(app.config['PREVIEW_CACHE_FOLDER'],
+                                     f"tmp_{uuid.uuid4().hex}{os.path.splitext(preview_file)[1]}")
+            try:
+                render_preview(file_path, extension, temp_path)
+                os.replace(temp_path, preview_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+        
+        db.save_file_preview(file_key, content_hash, preview_file, 'ready', os.path.abspath(file_path))
+    except Exception as e:
+        print(f"生成文件预览失败 {file_path}: {e}")
+        db.save_file_preview(file_key, None, None, 'failed', os.path.abspath(file_path))
+    finally:
+        with _preview_lock:
+            _preview_pending.discard(file_key)
+
+def enqueue_preview(file_path, file_key=None):
+    """将文件加入预览生成队列（同一文件不会重复排队）"""
+    file_key = file_key or get_preview_file_key(file_path)
+    with _preview_lock:
+        if file_key in _preview_pending:
+            return
+        _preview_pending.add(file_key)
+    _preview_executor.submit(generate_preview, file_path, file_key)
+
+def preview_retry_due(preview):
+    """失败的预览是否已过退避时间且未达到重试上限（可能只是暂时性错误，如内存不足或文件仍在写入）"""
+    if preview['status'] != 'failed' or preview['attempts'] >= app.config['PREVIEW_MAX_ATTEMPTS']:
+        return False
+    if preview['failed_at'] is None:
+        return True
+    backoff = app.config['PREVIEW_RETRY_SECONDS'] * 2 ** max(preview['attempts'] - 1, 0)
+    return time.time() >= preview['failed_at'] + backoff
+
+def retry_failed_previews():
+    """重新排队已过退避时间的失败预览（源文件已删除或被替换的记录由预览清理负责），返回排队数量"""
+    queued = 0
+    for preview in db.get_failed_file_previews(app.config['PREVIEW_MAX_ATTEMPTS']):
+        if not preview['source_path'] or not preview_retry_due(preview):
+            continue
+        try:
+            if get_preview_file_key(preview['source_path']) != preview['file_key']:
+                continue
+        except OSError:
+            continue
+        enqueue_preview(preview['source_path'], preview['file_key'])
+        queued += 1
+    return queued
+
+def enqueue_directory_previews(directory_path):
+    """为目录下所有可预览且尚未生成预览的文件排队生成预览"""
+    for root, dirs, files in os.walk(directory_path):
+        for file in files:
+            if not is_previewable(os.path.splitext(file)[1].lower()):
+                continue
+            file_path = os.path.join(root, file)
+            try:
+                file_key = get_preview_file_key(file_path)
+            except OSError:
+                continue
+            preview = db.get_file_preview(file_key)
+            if not preview or preview_retry_due(preview):
+                enqueue_preview(file_path, file_key)
+
+def serve_file_preview(full_file_path):
+    """返回文件预览；预览尚未生成时排队生成并返回202"""
+    extension = os.path.splitext(full_file_path)[1].lower()
+    if not is_previewable(extension):
+        return jsonify({"error": "该文件类型不支持预览"}), 404
+    
+    file_key = get_preview_file_key(full_file_path)
+    preview = db.get_file_preview(file_key)
+    if preview and preview['status'] == 'ready':
+        preview_path = os.path.join(app.config['PREVIEW_CACHE_FOLDER'], preview['preview_file'])
+        if os.path.exists(preview_path):
+            response = send_file(
+                preview_path,
+                mimetype='image/jpeg' if preview_path.endswith('.jpg') else 'image/png',
+                etag=preview['content_hash'],
+                max_age=31536000
+            )
+            # 预览地址带有文件版本参数，内容不变时可长期缓存
+            response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+            return response
+    elif preview and not preview_retry_due(preview):
+        return jsonify({"error": "无法生成该文件的预览"}), 404
+    
+    enqueue_preview(full_file_path, file_key)
+    response = jsonify({"status": "pending", "message": "预览生成中"})
+    response.status_code = 202
+    response.headers['Retry-After'] = '2'
+    return response
+
+def cleanup_stale_previews(min_age_seconds):
+    """删除源文件已被删除或替换的预览记录，以及没有记录引用的缓存预览文件"""
+    result = {'rows': 0, 'files': 0, 'bytes': 0}
+    stale_keys = []
+    referenced = set()
+    for file_key, source_path, preview_file in db.get_file_preview_sources():
+        try:
+            # 没有记录源文件路径的旧记录无法校验，删除后按需重新生成
+            current = source_path is not None and get_preview_file_key(source_path) == file_key
+        except OSError:
+            current = False
+        if current:
+            if preview_file:
+                referenced.add(preview_file)
+        else:
+            stale_keys.append(file_key)
+    result['rows'] = db.delete_file_previews(stale_keys)
+    
+    cache_folder = app.config['PREVIEW_CACHE_FOLDER']
+    now = time.time()
+    for item in os.listdir(cache_folder):
+        if item in referenced:
+            continue
+        item_path = os.path.join(cache_folder, item)
+        try:
+            # 刚生成的预览可能还没写入记录，留出安全时间
+            if not os.path.isfile(item_path) or now - os.path.getmtime(item_path) < min_age_seconds:
+                continue
+            size = os.path.getsize(item_path)
+            os.unlink(item_path)
+            result['files'] += 1
+            result['bytes'] += size
+        except OSError:
+            pass
+    return result
+
+# 启动定时清理任务（启动时立即执行一次，之后按间隔执行；清理预览依赖上面的函数，因此在此处启动）
+start_background_task('janitor', app.config['JANITOR_INTERVAL_SECONDS'], janitor_tick)
+
+@app.route('/api/files/search')
+@api_login_required
+def search_files():
+    """在当前用户可访问的所有项目中按文件名搜索"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': '缺少搜索关键词'}), 400
+    
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+    except ValueError:
+        limit = 50
+    
+    try:
+        results = db.search_project_files(session['user_id'], query, limit)
+        for item in results:
+            item['download_url'] = url_for('download_single_file', project_id=item['project_id'], path=item['path'])
+        return jsonify({'query': query, 'results': results})
+    except Exception as e:
+        return jsonify({'error': f'搜索文件失败: {str(e)}'}), 500
 
 @app.route('/api/files/<username>')
 def list_user_files(username):
@@ -678,7 +1927,7 @@ def get_project_files(project_id):
     user_id = session['user_id']
     
     # 检查用户是否有访问权限
-    access = db.check_project_access(project_id, user_id)
+    access = get_project_access(project_id, user_id)
     if not access['access']:
         return jsonify({'error': '项目不存在或无访问权限'}), 404
 
@@ -732,6 +1981,11 @@ def get_project_files(project_id):
                         'modified': file_modified.strftime('%Y-%m-%d %H:%M:%S'),
                         'extension': os.path.splitext(item)[1].lower()
                     }
+                    file_info['download_url'] = build_signed_file_url(f"p{project_id}", owner_username,
+                                                                      project_folder, file_info['path'])
+                    if is_previewable(file_info['extension']):
+                        file_info['preview_url'] = url_for('get_project_file_preview', project_id=project_id,
+                                                           path=file_info['path'], v=get_preview_version(item_path))
                     tree['files'].append(file_info)
         except Exception as e:
             print(f"Error reading directory {directory_path}: {str(e)}")
@@ -770,7 +2024,7 @@ def download_single_file(project_id):
         user_id = session['user_id']
         
         # 检查用户是否有访问权限
-        access = db.check_project_access(project_id, user_id)
+        access = get_project_access(project_id, user_id)
         if not access['access']:
             return jsonify({"error": "项目不存在或无访问权限"}), 404
             
@@ -816,6 +2070,46 @@ def download_single_file(project_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/project/<int:project_id>/preview')
+@api_login_required
+def get_project_file_preview(project_id):
+    """获取项目文件的缩略图预览"""
+    try:
+        user_id = session['user_id']
+        
+        # 检查用户是否有访问权限
+        access = get_project_access(project_id, user_id)
+        if not access['access']:
+            return jsonify({"error": "项目不存在或无访问权限"}), 404
+        
+        file_path = request.args.get('path')
+        if not file_path:
+            return jsonify({"error": "缺少文件路径参数"}), 400
+        
+        # 获取项目信息和所有者信息来构建文件路径
+        project = db.get_project_by_id(project_id)
+        if not project:
+            return jsonify({"error": "项目不存在"}), 404
+        owner_info = db.get_user_by_id(project['user_id'])
+        if not owner_info:
+            return jsonify({"error": "项目所有者不存在"}), 404
+        
+        owner_username = owner_info['username']
+        project_folder = os.path.join(UPLOAD_FOLDER, owner_username, f"{owner_username}-{project['name']}")
+        full_file_path = os.path.join(project_folder, file_path.lstrip('/'))
+        
+        # 安全检查：确保文件路径在项目文件夹内
+        if not os.path.abspath(full_file_path).startswith(os.path.abspath(project_folder)):
+            return jsonify({"error": "非法的文件路径"}), 400
+        
+        if not os.path.isfile(full_file_path):
+            return jsonify({"error": "文件不存在"}), 404
+        
+        return serve_file_preview(full_file_path)
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/project/<int:project_id>/download/zip', methods=['POST'])
 def download_zip(project_id):
     """下载压缩包"""
@@ -826,7 +2120,7 @@ def download_zip(project_id):
         user_id = session['user_id']
         
         # 检查用户是否有访问权限
-        access = db.check_project_access(project_id, user_id)
+        access = get_project_access(project_id, user_id)
         if not access['access']:
             return jsonify({"error": "项目不存在或无访问权限"}), 404
             
@@ -855,7 +2149,7 @@ def download_zip(project_id):
             return jsonify({"error": "项目文件夹不存在"}), 404
         
         # 创建临时文件用于存储zip
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
+        temp_file = tempfile.NamedTemporaryFile(delete=False, prefix=ZIP_TEMP_PREFIX, suffix='.zip')
         temp_file.close()
         
         try:
@@ -912,6 +2206,560 @@ def download_zip(project_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# ==================== 项目权限缓存 ====================
+
+# (user_id, project_id) -> (缓存到期时间, 权限信息)，按最近使用顺序排列
+_access_cache = OrderedDict()
+_access_cache_lock = threading.Lock()
+_access_cache_state = {'version': None}
+
+def check_access_cache_version():
+    """比较共享的项目权限版本号，版本变化时清空本地缓存，返回当前版本号"""
+    version = shared_version('project_access')
+    with _access_cache_lock:
+        if version is None or version != _access_cache_state['version']:
+            _access_cache.clear()
+            _access_cache_state['version'] = version
+    return version
+
+def invalidate_access_cache():
+    """使本进程的项目权限缓存失效（其他进程通过版本号感知）"""
+    with _access_cache_lock:
+        _access_cache.clear()
+    g.pop('project_access', None)
+
+def get_project_access(project_id, user_id):
+    """获取用户对项目的权限，同一请求内只查一次，跨请求使用短时进程缓存"""
+    key = (user_id, int(project_id))
+    request_memo = g.setdefault('project_access', {})
+    if key in request_memo:
+        return request_memo[key]
+    
+    version = check_access_cache_version()
+    now = time.monotonic()
+    with _access_cache_lock:
+        entry = _access_cache.get(key)
+        if entry and entry[0] > now:
+            _access_cache.move_to_end(key)
+            request_memo[key] = entry[1]
+            return entry[1]
+    
+    access = db.check_project_access(project_id, user_id)
+    with _access_cache_lock:
+        # 查询期间权限已变化时不缓存，避免把旧结果写回
+        if version is not None and version == _access_cache_state['version']:
+            _access_cache[key] = (now + app.config['PROJECT_ACCESS_CACHE_TTL_SECONDS'], access)
+            _access_cache.move_to_end(key)
+            while len(_access_cache) > app.config['PROJECT_ACCESS_CACHE_SIZE']:
+                _access_cache.popitem(last=False)
+    request_memo[key] = access
+    return access
+
+# ==================== 配置缓存 ====================
+
+# 状态、来源、电路板类型配置几乎不变，由数据库触发器递增 config 版本号后在所有进程中失效
+_config_cache = {}
+_config_cache_lock = threading.Lock()
+_config_cache_state = {'version': None}
+CONFIG_LOADERS = {
+    'status': db.get_status_config,
+    'source': db.get_source_config,
+    'board_type': db.get_board_type_config,
+}
+
+def get_config_options(kind):
+    """获取配置选项列表（status / source / board_type），带进程内缓存"""
+    version = shared_version('config')
+    with _config_cache_lock:
+        if version is None or version != _config_cache_state['version']:
+            _config_cache.clear()
+            _config_cache_state['version'] = version
+        if kind in _config_cache:
+            return _config_cache[kind]
+    
+    options = CONFIG_LOADERS[kind]()
+    with _config_cache_lock:
+        if version is not None and version == _config_cache_state['version']:
+            _config_cache[kind] = options
+    return options
+
+# ==================== 页面片段缓存 ====================
+
+# 用户主页的项目行和统计卡片按版本号缓存渲染结果。键中包含决定内容的全部版本号
+# （项目变更序号、统计相关版本号、配置版本号），数据变化后旧键不再被访问，由 LRU 淘汰
+_fragment_cache = OrderedDict()
+_fragment_cache_lock = threading.Lock()
+
+def get_cached_fragment(key):
+    """获取缓存的片段或数据，未命中或 key 为 None 时返回 None"""
+    if key is None:
+        return None
+    with _fragment_cache_lock:
+        value = _fragment_cache.get(key)
+        if value is not None:
+            _fragment_cache.move_to_end(key)
+        return value
+
+def cache_fragment(key, value):
+    if key is None:
+        return value
+    with _fragment_cache_lock:
+        _fragment_cache[key] = value
+        _fragment_cache.move_to_end(key)
+        while len(_fragment_cache) > app.config['FRAGMENT_CACHE_SIZE']:
+            _fragment_cache.popitem(last=False)
+    return value
+
+def render_project_rows(user_id):
+    """渲染用户主页的项目行，返回 (同步令牌, [{'id', 'html'}])
+
+    先读取各项目的变更序号，只有缓存中没有对应版本的项目才读取完整数据并重新渲染
+    """
+    config_version = shared_version('config')
+    
+    def row_key(project_id, change_seq, user_role):
+        if config_version is None:
+            return None
+        return ('project_row', project_id, change_seq, user_role, config_version)
+    
+    stamps = db.get_user_project_stamps(user_id)
+    rows = {}
+    missing = []
+    for stamp in stamps['projects']:
+        html = get_cached_fragment(row_key(stamp['id'], stamp['change_seq'], stamp['user_role']))
+        if html is None:
+            missing.append(stamp['id'])
+        else:
+            rows[stamp['id']] = html
+    
+    if missing:
+        for project in db.get_user_projects_by_ids(user_id, missing):
+            html = Markup(render_template('project_row.html', job=project))
+            rows[project['id']] = cache_fragment(row_key(project['id'], project['change_seq'], project['user_role']), html)
+    
+    # 两次读取之间被删除或取消共享的项目不再显示
+    return stamps['token'], [{'id': stamp['id'], 'html': rows[stamp['id']]}
+                             for stamp in stamps['projects'] if stamp['id'] in rows]
+
+def get_dashboard_settings(user_id):
+    """获取用户设置，按 user_settings 版本号缓存"""
+    version = shared_version('user_settings')
+    key = None if version is None else ('settings', user_id, version)
+    settings = get_cached_fragment(key)
+    if settings is None:
+        settings = cache_fragment(key, db.get_user_settings(user_id))
+    return settings
+
+def render_stats_block(user_id, user_settings):
+    """渲染统计卡片，统计数据相关的版本号（项目变更、存储用量）和价格隐藏设置不变时直接使用缓存"""
+    versions = (shared_version('project_changes'), shared_version('users'))
+    key = None if None in versions else ('stats', user_id, versions, bool(user_settings['hide_prices']))
+    html = get_cached_fragment(key)
+    if html is None:
+        stats = db.get_user_stats(user_id)
+        html = cache_fragment(key, Markup(render_template('dashboard_stats.html', stats=stats,
+                                                          user_settings=user_settings)))
+    return html
+
+# ==================== 分享缓存 ====================
+
+# share_id -> (缓存到期时间, 分享信息或None)，按最近使用顺序排列
+_share_cache = OrderedDict()
+_share_cache_lock = threading.Lock()
+_share_cache_state = {'version': None}
+
+def check_share_cache_version():
+    """比较共享的分享缓存版本号，版本变化时清空本地缓存，返回当前版本号"""
+    version = shared_version('shares')
+    with _share_cache_lock:
+        if version is None or version != _share_cache_state['version']:
+            _share_cache.clear()
+            _share_cache_state['version'] = version
+    return version
+
+def invalidate_share_cache(share_id=None):
+    """使本进程的分享缓存失效（其他进程通过版本号感知）"""
+    with _share_cache_lock:
+        if share_id is None:
+            _share_cache.clear()
+        else:
+            _share_cache.pop(share_id, None)
+
+def get_cached_share(share_id):
+    """获取分享信息（带进程内缓存，"不存在"的结果也会短暂缓存）"""
+    version = check_share_cache_version()
+    now = time.monotonic()
+    with _share_cache_lock:
+        entry = _share_cache.get(share_id)
+        if entry and entry[0] > now:
+            _share_cache.move_to_end(share_id)
+            return entry[1]
+    
+    share_info = db.get_share_by_id(share_id)
+    ttl = app.config['SHARE_CACHE_TTL_SECONDS'] if share_info else app.config['SHARE_CACHE_NEGATIVE_TTL_SECONDS']
+    
+    with _share_cache_lock:
+        if version is not None and version == _share_cache_state['version']:
+            _share_cache[share_id] = (now + ttl, share_info)
+            _share_cache.move_to_end(share_id)
+            while len(_share_cache) > app.config['SHARE_CACHE_SIZE']:
+                _share_cache.popitem(last=False)
+    return share_info
+
+def get_active_share(share_id):
+    """获取未过期的分享信息，返回 (分享信息, 错误信息)"""
+    share_info = get_cached_share(share_id)
+    if not share_info:
+        return None, '分享链接不存在或已失效'
+    
+    # 只比较过期时间戳，过期记录由定时清理任务批量删除，读取路径不写数据库
+    if share_info['expire_at'] is not None and time.time() > share_info['expire_at']:
+        return None, '分享链接已过期'
+    
+    # 供访问日志记录使用
+    g.share_info = share_info
+    return share_info, None
+
+# 无访问次数限制的分享只在内存中累加计数，由后台线程批量写入数据库
+_share_access_buffer = {}
+_share_access_lock = threading.Lock()
+
+def record_share_access(share_info):
+    """记录一次分享访问，有次数限制的分享已达上限时返回 False"""
+    share_id = share_info['id']
+    if share_info.get('max_access_count'):
+        # 有限制的分享用条件更新原子地占用次数，并发访问也不会超过上限
+        if not db.consume_share_access(share_id):
+            share_info['access_count'] = share_info['max_access_count']
+            return False
+    else:
+        with _share_access_lock:
+            _share_access_buffer[share_id] = _share_access_buffer.get(share_id, 0) + 1
+    
+    # 同步更新本进程缓存中的计数
+    share_info['access_count'] = (share_info.get('access_count') or 0) + 1
+    return True
+
+def flush_share_access_counts():
+    """将内存中累积的分享访问计数批量写入数据库"""
+    with _share_access_lock:
+        if not _share_access_buffer:
+            return
+        counts = dict(_share_access_buffer)
+        _share_access_buffer.clear()
+    
+    try:
+        db.add_share_access_counts(counts)
+    except Exception:
+        # 写入失败时放回缓冲区，下次再试
+        with _share_access_lock:
+            for share_id, count in counts.items():
+                _share_access_buffer[share_id] = _share_access_buffer.get(share_id, 0) + count
+        raise
+
+start_background_task('share-access-flush', app.config['SHARE_ACCESS_FLUSH_SECONDS'], flush_share_access_counts)
+atexit.register(flush_share_access_counts)
+
+# ==================== 分享访问日志 ====================
+
+# 需要记录访问日志的分享相关接口及对应的事件类型
+SHARE_LOG_ENDPOINTS = {
+    'share_page': 'view',
+    'get_share_files': 'list',
+    'download_share_file': 'file',
+    'download_share_zip': 'zip',
+    'download_signed_file': 'file',
+}
+
+# 访问事件先放入内存队列，由后台线程批量写入，下载请求不等待数据库提交
+_share_log_queue = queue.Queue(maxsize=app.config['SHARE_LOG_QUEUE_SIZE'])
+
+def hash_client_ip(ip):
+    """对客户端IP做带密钥的哈希，日志中不保存原始IP"""
+    return hmac.new(app.secret_key.encode(), (ip or '').encode(), hashlib.sha256).hexdigest()[:16]
+
+@app.after_request
+def log_share_access(response):
+    """记录分享页面、文件列表和下载请求的访问事件"""
+    event = SHARE_LOG_ENDPOINTS.get(request.endpoint)
+    if not event:
+        return response
+    
+    if request.endpoint == 'download_signed_file':
+        # 只记录分享签发的下载链接；签名无效的请求不记录
+        scope = request.view_args.get('scope', '')
+        if not scope.startswith('s') or response.status_code == 403:
+            return response
+        share_id, project_id = scope[1:], None
+        # 去掉路径中的 <所有者>/<所有者-项目名>/ 前缀
+        file_path = request.view_args['file_path'].split('/', 2)[-1]
+    else:
+        share_info = g.get('share_info')
+        if not share_info:
+            return response
+        share_id, project_id = share_info['id'], share_info['project_id']
+        file_path = request.args.get('path') if event == 'file' else None
+    
+    record = {
+        'share_id': share_id,
+        'project_id': project_id,
+        'ts': int(time.time()),
+        'ip_hash': hash_client_ip(request.remote_addr),
+        'event': event,
+        'file_path': file_path,
+        'bytes_sent': response.content_length or 0,
+        'status': response.status_code
+    }
+    sent = g.get('share_bytes_sent')
+    if sent is not None:
+        # 限速下载在连接关闭后按实际发送的字节数记录，中断的下载不会按完整文件统计
+        response.call_on_close(lambda: enqueue_share_access(dict(record, bytes_sent=sent['bytes'])))
+    else:
+        enqueue_share_access(record)
+    return response
+
+def enqueue_share_access(record):
+    """放入访问日志队列，队列已满时丢弃"""
+    try:
+        _share_log_queue.put_nowait(record)
+    except queue.Full:
+        pass
+
+def flush_share_access_log(batch_size=5000):
+    """将队列中的访问事件分批写入数据库"""
+    while True:
+        events = []
+        while len(events) < batch_size:
+            try:
+                events.append(_share_log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if not events:
+            return
+        db.insert_share_access_events(events)
+
+start_background_task('share-access-log', app.config['SHARE_LOG_FLUSH_SECONDS'], flush_share_access_log)
+atexit.register(flush_share_access_log)
+
+# ==================== 分享下载限流 ====================
+
+# 并发名额和令牌桶保存在单独的 SQLite 文件中，多个 gunicorn worker 共享同一份状态，
+# 不占用业务数据库的写锁。名额满时请求按领取排队号的先后顺序获得名额（公平排队）。
+
+@contextmanager
+def get_limiter_db():
+    """获取限流状态数据库连接（手动控制事务）"""
+    conn = sqlite3.connect(app.config['DOWNLOAD_LIMIT_STATE_FILE'], timeout=10, isolation_level=None)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def init_download_limiter():
+    """创建限流状态表"""
+    with get_limiter_db() as conn:
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS download_slots (
+                holder TEXT PRIMARY KEY,
+                share_id TEXT NOT NULL,
+                lease_until REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS download_tickets (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                share_id TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS token_buckets (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        ''')
+
+if not db.in_pool_worker():
+    init_download_limiter()
+
+def try_acquire_download_slot(conn, share_id, ticket, holder):
+    """在事务中尝试为排队号 ticket 分配下载名额，成功返回 True"""
+    now = time.time()
+    share_limit = app.config['SHARE_MAX_CONCURRENT_DOWNLOADS']
+    global_limit = app.config['GLOBAL_MAX_CONCURRENT_DOWNLOADS']
+    
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # 清理进程异常退出后遗留的名额和排队号
+        conn.execute('DELETE FROM download_slots WHERE lease_until < ?', (now,))
+        conn.execute('DELETE FROM download_tickets WHERE created_at < ?',
+                     (now - app.config['DOWNLOAD_QUEUE_WAIT_SECONDS'] - 30,))
+        
+        global_used = conn.execute('SELECT COUNT(*) FROM download_slots').fetchone()[0]
+        share_used = conn.execute('SELECT COUNT(*) FROM download_slots WHERE share_id = ?', (share_id,)).fetchone()[0]
+        
+        # 排在前面且自身所属分享还有名额的请求优先，名额满的分享不会阻塞其他分享的排队请求
+        if share_limit:
+            earlier = conn.execute('''
+                SELECT COUNT(*) FROM download_tickets t
+                WHERE t.seq < ? AND (SELECT COUNT(*) FROM download_slots s WHERE s.share_id = t.share_id) < ?
+            ''', (ticket, share_limit)).fetchone()[0]
+        else:
+            earlier = conn.execute('SELECT COUNT(*) FROM download_tickets WHERE seq < ?', (ticket,)).fetchone()[0]
+        earlier_same_share = conn.execute(
+            'SELECT COUNT(*) FROM download_tickets WHERE seq < ? AND share_id = ?', (ticket, share_id)
+        ).fetchone()[0]
+        
+        granted = ((not global_limit or global_used + earlier < global_limit) and
+                   (not share_limit or share_used + earlier_same_share < share_limit))
+        if granted:
+            conn.execute('INSERT INTO download_slots (holder, share_id, lease_until) VALUES (?, ?, ?)',
+                         (holder, share_id, now + app.config['DOWNLOAD_SLOT_LEASE_SECONDS']))
+            conn.execute('DELETE FROM download_tickets WHERE seq = ?', (ticket,))
+        conn.execute('COMMIT')
+        return granted
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+def download_slot_looks_free(conn, share_id):
+    """只读检查全局和分享是否还有空闲名额（不加写锁），名额已满时不必开启写事务"""
+    now = time.time()
+    share_limit = app.config['SHARE_MAX_CONCURRENT_DOWNLOADS']
+    global_limit = app.config['GLOBAL_MAX_CONCURRENT_DOWNLOADS']
+    if global_limit:
+        used = conn.execute('SELECT COUNT(*) FROM download_slots WHERE lease_until >= ?', (now,)).fetchone()[0]
+        if used >= global_limit:
+            return False
+    if share_limit:
+        used = conn.execute('SELECT COUNT(*) FROM download_slots WHERE share_id = ? AND lease_until >= ?',
+                            (share_id, now)).fetchone()[0]
+        if used >= share_limit:
+            return False
+    return True
+
+def acquire_download_slot(share_id):
+    """排队获取分享下载名额，返回名额标识；等待超时返回 None
+
+    排队期间只做只读检查，看起来有空闲名额时才开启写事务分配，避免等待中的请求反复占用限流数据库的写锁
+    """
+    if not app.config['SHARE_MAX_CONCURRENT_DOWNLOADS'] and not app.config['GLOBAL_MAX_CONCURRENT_DOWNLOADS']:
+        return str(uuid.uuid4())
+    
+    holder = str(uuid.uuid4())
+    deadline = time.time() + app.config['DOWNLOAD_QUEUE_WAIT_SECONDS']
+    with get_limiter_db() as conn:
+        ticket = conn.execute('INSERT INTO download_tickets (share_id, created_at) VALUES (?, ?)',
+                              (share_id, time.time())).lastrowid
+        try:
+            while True:
+                if (download_slot_looks_free(conn, share_id) and
+                        try_acquire_download_slot(conn, share_id, ticket, holder)):
+                    return holder
+                if time.time() >= deadline:
+                    return None
+                time.sleep(0.2)
+        finally:
+            conn.execute('DELETE FROM download_tickets WHERE seq = ?', (ticket,))
+
+def download_lease_renewer(holder):
+    """返回续期函数：距上次续期超过租约的三分之一时延长下载名额租约，与令牌预留无关，
+    慢速客户端下载或打包大文件期间名额不会被当作过期名额清除"""
+    interval = app.config['DOWNLOAD_SLOT_LEASE_SECONDS'] / 3
+    state = {'renewed_at': time.monotonic()}
+    
+    def renew():
+        if time.monotonic() - state['renewed_at'] < interval:
+            return
+        with get_limiter_db() as conn:
+            conn.execute('UPDATE download_slots SET lease_until = ? WHERE holder = ?',
+                         (time.time() + app.config['DOWNLOAD_SLOT_LEASE_SECONDS'], holder))
+        state['renewed_at'] = time.monotonic()
+    return renew
+
+def release_download_slot(holder):
+    """释放下载名额"""
+    with get_limiter_db() as conn:
+        conn.execute('DELETE FROM download_slots WHERE holder = ?', (holder,))
+
+def consume_download_tokens(conn, share_id, holder, size):
+    """从全局和分享的令牌桶中扣除 size 字节并续期名额，返回需要等待的秒数（size 为负数时退还未用完的令牌）"""
+    now = time.time()
+    wait = 0.0
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for name, rate in (('global', app.config['GLOBAL_MAX_BYTES_PER_SECOND']),
+                           (f'share:{share_id}', app.config['SHARE_MAX_BYTES_PER_SECOND'])):
+            if not rate:
+                continue
+            row = conn.execute('SELECT tokens, updated_at FROM token_buckets WHERE name = ?', (name,)).fetchone()
+            # 桶容量为1秒的流量；令牌可以透支，透支部分通过等待偿还
+            tokens = rate if row is None else min(rate, row[0] + (now - row[1]) * rate)
+            tokens = min(rate, tokens - size)
+            conn.execute('INSERT OR REPLACE INTO token_buckets (name, tokens, updated_at) VALUES (?, ?, ?)',
+                         (name, tokens, now))
+            if tokens < 0:
+                wait = max(wait, -tokens / rate)
+        conn.execute('UPDATE download_slots SET lease_until = ? WHERE holder = ?',
+                     (now + app.config['DOWNLOAD_SLOT_LEASE_SECONDS'], holder))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return wait
+
+def stream_limited_file(file_path, share_id, holder, sent=None):
+    """按令牌桶限速逐块读取文件，sent['bytes'] 累计客户端已取走的字节数
+
+    每次预留 DOWNLOAD_RESERVE_SECONDS 秒的流量（不限速时预留64块），用完后再开启下一个写事务，
+    避免每块都对限流数据库加写锁；传输中断时退还未用完的预留。名额租约按时间单独续期
+    """
+    chunk_size = app.config['DOWNLOAD_CHUNK_SIZE']
+    renew_lease = download_lease_renewer(holder)
+    rates = [rate for rate in (app.config['GLOBAL_MAX_BYTES_PER_SECOND'], app.config['SHARE_MAX_BYTES_PER_SECOND']) if rate]
+    block_size = max(chunk_size, int(min(rates) * app.config['DOWNLOAD_RESERVE_SECONDS']) if rates else chunk_size * 64)
+    with get_limiter_db() as conn, open(file_path, 'rb') as f:
+        remaining = os.fstat(f.fileno()).st_size
+        reserved = 0
+        try:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                if reserved < len(chunk):
+                    block = max(len(chunk) - reserved, min(block_size, remaining - reserved))
+                    wait = consume_download_tokens(conn, share_id, holder, block)
+                    reserved += block
+                    if wait > 0:
+                        time.sleep(wait)
+                reserved -= len(chunk)
+                remaining -= len(chunk)
+                renew_lease()
+                yield chunk
+                if sent is not None:
+                    sent['bytes'] += len(chunk)
+        finally:
+            if reserved > 0:
+                consume_download_tokens(conn, share_id, holder, -reserved)
+
+def too_many_downloads_response():
+    """下载名额已满时的429响应"""
+    response = jsonify({"error": "当前下载人数过多，请稍后再试"})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(app.config['DOWNLOAD_QUEUE_WAIT_SECONDS'])))
+    return response
+
+def send_share_file_limited(share_id, holder, file_path, download_name):
+    """以限速流的方式发送分享文件，传输结束后释放下载名额"""
+    # 实际发送的字节数，访问日志在连接关闭后按它记录
+    g.share_bytes_sent = {'bytes': 0}
+    response = Response(
+        stream_limited_file(file_path, share_id, holder, g.share_bytes_sent),
+        mimetype=mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+    )
+    response.content_length = os.path.getsize(file_path)
+    response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+    response.call_on_close(lambda: release_download_slot(holder))
+    return response
+
 @app.route('/api/project/<int:project_id>/share', methods=['POST'])
 def create_share(project_id):
     """创建项目分享链接"""
@@ -922,7 +2770,7 @@ def create_share(project_id):
         user_id = session['user_id']
         
         # 检查用户是否有访问权限（所有者或协作者都可以分享）
-        access = db.check_project_access(project_id, user_id)
+        access = get_project_access(project_id, user_id)
         if not access['access']:
             return jsonify({'error': '项目不存在或无访问权限'}), 404
         
@@ -968,6 +2816,8 @@ def create_share(project_id):
             expire_time=expire_time.isoformat() if expire_time else None,
             max_access_count=max_access_count
         )
+        # 清除该分享ID可能存在的"不存在"缓存
+        invalidate_share_cache(share_id)
         
         # 构建分享链接
         share_url = f"/share/{share_id}"
@@ -994,7 +2844,7 @@ def cancel_share(project_id):
         user_id = session['user_id']
         
         # 检查用户是否有访问权限（所有者或协作者都可以取消分享）
-        access = db.check_project_access(project_id, user_id)
+        access = get_project_access(project_id, user_id)
         if not access['access']:
             return jsonify({'error': '项目不存在或无访问权限'}), 404
         
@@ -1004,6 +2854,7 @@ def cancel_share(project_id):
             return jsonify({'error': '未找到该项目的分享链接'}), 404
         
         db.delete_share(existing_share['id'])
+        invalidate_share_cache(existing_share['id'])
         
         return jsonify({'message': '分享已取消'})
         
@@ -1020,11 +2871,11 @@ def get_share_info(project_id):
         user_id = session['user_id']
         
         # 检查用户是否有访问权限（所有者或协作者都可以查看分享信息）
-        access = db.check_project_access(project_id, user_id)
+        access = get_project_access(project_id, user_id)
         if not access['access']:
             return jsonify({'error': '项目不存在或无访问权限'}), 404
         
-        # 查找分享信息
+        # 查找分享信息（已过期的分享不会返回）
         share_info = db.get_project_share_by_project_id(project_id)
         if not share_info:
             response = jsonify({'shared': False})
@@ -1033,26 +2884,13 @@ def get_share_info(project_id):
             response.headers['Expires'] = '0'
             return response
         
-        # 检查是否过期
-        if share_info['expire_time']:
-            expire_time = datetime.fromisoformat(share_info['expire_time'])
-            # 使用相同时区感知的datetime进行比较
-            current_time = get_beijing_time()
-            if current_time > expire_time:
-                db.delete_share(share_info['id'])
-                response = jsonify({'shared': False})
-                response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-                response.headers['Pragma'] = 'no-cache'
-                response.headers['Expires'] = '0'
-                return response
-        
         response_data = {
             'shared': True,
             'share_id': share_info['id'],
             'share_url': f"/share/{share_info['id']}",
             'expire_time': share_info['expire_time'],
             'has_password': bool(share_info['password_hash']),
-            'access_count': share_info.get('access_count', 0),
+            'access_count': (share_info.get('access_count') or 0) + _share_access_buffer.get(share_info['id'], 0),
             'max_access_count': share_info.get('max_access_count'),
             'created_at': share_info['created_at']
         }
@@ -1067,22 +2905,62 @@ def get_share_info(project_id):
     except Exception as e:
         return jsonify({'error': f'获取分享信息失败: {str(e)}'}), 500
 
+def build_share_analytics(project_id):
+    """汇总项目分享的访问统计（granularity 为 hour 或 day，days 为统计天数）"""
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ('hour', 'day'):
+        return jsonify({'error': 'granularity 只能为 hour 或 day'}), 400
+    
+    try:
+        days = min(max(int(request.args.get('days', 7)), 1), 365)
+    except ValueError:
+        return jsonify({'error': 'days 参数无效'}), 400
+    
+    since = int(time.time()) - days * 86400
+    since = db.hour_bucket(since) if granularity == 'hour' else db.day_bucket(since)
+    buckets = db.get_share_access_stats(project_id, granularity, since)
+    
+    time_format = '%Y-%m-%d %H:00' if granularity == 'hour' else '%Y-%m-%d'
+    beijing_tz = timezone(timedelta(hours=8))
+    totals = {'requests': 0, 'downloads': 0, 'bytes_sent': 0, 'errors': 0}
+    for item in buckets:
+        item['time'] = datetime.fromtimestamp(item['bucket'], tz=beijing_tz).strftime(time_format)
+        for key in totals:
+            totals[key] += item[key]
+    
+    share_info = db.get_project_share_by_project_id(project_id)
+    return jsonify({
+        'project_id': project_id,
+        'granularity': granularity,
+        'days': days,
+        'access_count': ((share_info.get('access_count') or 0) + _share_access_buffer.get(share_info['id'], 0)
+                         if share_info else None),
+        'totals': totals,
+        'buckets': buckets,
+        'top_files': db.get_share_top_files(project_id, since)
+    })
+
+@app.route('/api/project/<int:project_id>/share/analytics')
+@api_login_required
+def get_share_analytics(project_id):
+    """获取项目分享的访问统计（仅项目所有者）"""
+    access = get_project_access(project_id, session['user_id'])
+    if not access['access']:
+        return jsonify({'error': '项目不存在或无访问权限'}), 404
+    if access['permission'] != 'owner':
+        return jsonify({'error': '只有项目所有者可以查看分享统计'}), 403
+    
+    return build_share_analytics(project_id)
+
 @app.route('/share/<share_id>')
 def share_page(share_id):
     """分享页面"""
-    # 检查分享是否存在
-    share_info = db.get_share_by_id(share_id)
+    # 检查分享是否存在及是否过期
+    share_info, error = get_active_share(share_id)
     if not share_info:
-        return render_template('share_error.html', error='分享链接不存在或已失效')
+        return render_template('share_error.html', error=error)
     
-    # 检查是否过期
-    if share_info['expire_time']:
-        expire_time = beijing_time_from_iso(share_info['expire_time'])
-        if get_beijing_time() > expire_time:
-            db.delete_share(share_id)
-            return render_template('share_error.html', error='分享链接已过期')
-    
-    # 检查访问次数限制
+    # 检查访问次数限制（按缓存的计数快速拒绝，实际占用次数时以数据库的原子更新为准）
     if share_info.get('max_access_count') and share_info.get('access_count', 0) >= share_info['max_access_count']:
         return render_template('share_error.html', error='分享链接访问次数已达上限')
     
@@ -1093,7 +2971,8 @@ def share_page(share_id):
                              project_name=share_info['project_name'])
     
     # 增加访问计数（只在实际访问时计数，不在密码验证页面计数）
-    db.increment_share_access_count(share_id)
+    if not record_share_access(share_info):
+        return render_template('share_error.html', error='分享链接访问次数已达上限')
     
     return render_template('share_download.html', 
                          share_info=share_info)
@@ -1101,9 +2980,9 @@ def share_page(share_id):
 @app.route('/share/<share_id>/verify', methods=['POST'])
 def verify_share_password(share_id):
     """验证分享密码"""
-    share_info = db.get_share_by_id(share_id)
+    share_info, error = get_active_share(share_id)
     if not share_info:
-        return jsonify({'error': '分享链接不存在或已失效'}), 404
+        return jsonify({'error': error}), 404
     
     password = request.form.get('password', '')
     
@@ -1126,16 +3005,9 @@ def get_share_files(share_id):
     """获取分享的文件列表"""
     try:
         # 检查分享是否存在和有效
-        share_info = db.get_share_by_id(share_id)
+        share_info, error = get_active_share(share_id)
         if not share_info:
-            return jsonify({'error': '分享链接不存在或已失效'}), 404
-        
-        # 检查是否过期
-        if share_info['expire_time']:
-            expire_time = beijing_time_from_iso(share_info['expire_time'])
-            if get_beijing_time() > expire_time:
-                db.delete_share(share_id)
-                return jsonify({'error': '分享链接已过期'}), 404
+            return jsonify({'error': error}), 404
         
         # 检查密码验证
         if share_info['password_hash'] and not session.get(f'share_verified_{share_id}'):
@@ -1146,6 +3018,11 @@ def get_share_files(share_id):
         project_name = share_info['project_name']
         project_folder_name = f"{owner_username}-{project_name}"
         project_dir = os.path.join(UPLOAD_FOLDER, owner_username, project_folder_name)
+        
+        # 签名下载链接的有效期不超过分享本身的过期时间
+        url_lifetime = app.config['SIGNED_URL_EXPIRE_SECONDS']
+        if share_info['expire_at'] is not None:
+            url_lifetime = max(1, min(url_lifetime, int(share_info['expire_at'] - time.time())))
 
         def build_file_tree(directory_path, base_path=""):
             """递归构建文件树结构"""
@@ -1183,6 +3060,12 @@ def get_share_files(share_id):
                             'modified': file_modified.strftime('%Y-%m-%d %H:%M:%S'),
                             'extension': os.path.splitext(item)[1].lower()
                         }
+                        file_info['download_url'] = build_signed_file_url(f"s{share_id}", owner_username,
+                                                                          project_folder_name, file_info['path'],
+                                                                          url_lifetime)
+                        if is_previewable(file_info['extension']):
+                            file_info['preview_url'] = url_for('get_share_file_preview', share_id=share_id,
+                                                               path=file_info['path'], v=get_preview_version(item_path))
                         tree['files'].append(file_info)
             except Exception as e:
                 print(f"Error reading directory {directory_path}: {str(e)}")
@@ -1215,16 +3098,9 @@ def download_share_file(share_id):
     """下载分享的单个文件"""
     try:
         # 检查分享是否存在和有效
-        share_info = db.get_share_by_id(share_id)
+        share_info, error = get_active_share(share_id)
         if not share_info:
-            return jsonify({"error": "分享链接不存在或已失效"}), 404
-        
-        # 检查是否过期
-        if share_info['expire_time']:
-            expire_time = beijing_time_from_iso(share_info['expire_time'])
-            if get_beijing_time() > expire_time:
-                db.delete_share(share_id)
-                return jsonify({"error": "分享链接已过期"}), 404
+            return jsonify({"error": error}), 404
         
         # 检查密码验证
         if share_info['password_hash'] and not session.get(f'share_verified_{share_id}'):
@@ -1254,30 +3130,73 @@ def download_share_file(share_id):
         # 获取文件名
         filename = os.path.basename(full_file_path)
         
-        return send_file(
-            full_file_path,
-            as_attachment=True,
-            download_name=filename
-        )
+        # 获取下载名额（并发数和带宽限制）
+        holder = acquire_download_slot(share_id)
+        if not holder:
+            return too_many_downloads_response()
+        
+        try:
+            return send_share_file_limited(share_id, holder, full_file_path, filename)
+        except Exception:
+            release_download_slot(holder)
+            raise
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/share/<share_id>/preview')
+def get_share_file_preview(share_id):
+    """获取分享文件的缩略图预览"""
+    try:
+        # 检查分享是否存在和有效
+        share_info, error = get_active_share(share_id)
+        if not share_info:
+            return jsonify({"error": error}), 404
+        
+        # 检查密码验证
+        if share_info['password_hash'] and not session.get(f'share_verified_{share_id}'):
+            return jsonify({"error": "需要密码验证"}), 401
+        
+        file_path = request.args.get('path')
+        if not file_path:
+            return jsonify({"error": "缺少文件路径参数"}), 400
+        
+        owner_username = share_info['owner_username']
+        project_folder = os.path.join(UPLOAD_FOLDER, owner_username, f"{owner_username}-{share_info['project_name']}")
+        full_file_path = os.path.join(project_folder, file_path.lstrip('/'))
+        
+        # 安全检查：确保文件路径在项目文件夹内
+        if not os.path.abspath(full_file_path).startswith(os.path.abspath(project_folder)):
+            return jsonify({"error": "非法的文件路径"}), 400
+        
+        if not os.path.isfile(full_file_path):
+            return jsonify({"error": "文件不存在"}), 404
+        
+        return serve_file_preview(full_file_path)
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def write_zip_entry(zipf, source_path, arcname, on_progress, chunk_size=1024 * 1024):
+    """分块把文件写入压缩包，每块之后调用 on_progress（用于续期下载名额）"""
+    zinfo = zipfile.ZipInfo.from_file(source_path, arcname)
+    zinfo.compress_type = zipf.compression
+    with open(source_path, 'rb') as src, zipf.open(zinfo, 'w') as dst:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            dst.write(chunk)
+            on_progress()
+
 @app.route('/api/share/<share_id>/download/zip', methods=['POST'])
 def download_share_zip(share_id):
     """下载分享的压缩包"""
     try:
         # 检查分享是否存在和有效
-        share_info = db.get_share_by_id(share_id)
+        share_info, error = get_active_share(share_id)
         if not share_info:
-            return jsonify({"error": "分享链接不存在或已失效"}), 404
-        
-        # 检查是否过期
-        if share_info['expire_time']:
-            expire_time = beijing_time_from_iso(share_info['expire_time'])
-            if get_beijing_time() > expire_time:
-                db.delete_share(share_id)
-                return jsonify({"error": "分享链接已过期"}), 404
+            return jsonify({"error": error}), 404
         
         # 检查密码验证
         if share_info['password_hash'] and not session.get(f'share_verified_{share_id}'):
@@ -1298,12 +3217,18 @@ def download_share_zip(share_id):
         if not os.path.exists(project_folder):
             return jsonify({"error": "项目文件夹不存在"}), 404
         
+        # 获取下载名额（打包同样占用磁盘，因此在打包前申请）
+        holder = acquire_download_slot(share_id)
+        if not holder:
+            return too_many_downloads_response()
+        
         # 创建临时文件用于存储zip
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
+        temp_file = tempfile.NamedTemporaryFile(delete=False, prefix=ZIP_TEMP_PREFIX, suffix='.zip')
         temp_file.close()
         
         try:
-            # 创建zip文件
+            # 创建zip文件（打包期间按时间续期下载名额）
+            renew_lease = download_lease_renewer(holder)
             with zipfile.ZipFile(temp_file.name, 'w', zipfile.ZIP_DEFLATED) as zipf:
                 for file_path in file_paths:
                     full_path = os.path.join(project_folder, file_path.lstrip('/'))
@@ -1315,7 +3240,7 @@ def download_share_zip(share_id):
                     if os.path.exists(full_path):
                         if os.path.isfile(full_path):
                             # 添加文件
-                            zipf.write(full_path, file_path)
+                            write_zip_entry(zipf, full_path, file_path, renew_lease)
                         elif os.path.isdir(full_path):
                             # 添加文件夹及其所有内容
                             for root, dirs, files in os.walk(full_path):
@@ -1323,19 +3248,15 @@ def download_share_zip(share_id):
                                     file_full_path = os.path.join(root, file)
                                     # 计算相对于项目文件夹的路径
                                     rel_path = os.path.relpath(file_full_path, project_folder)
-                                    zipf.write(file_full_path, rel_path)
+                                    write_zip_entry(zipf, file_full_path, rel_path, renew_lease)
             
             # 生成下载文件名
             download_name = f"{project_name}_files_{get_beijing_time().strftime('%Y%m%d_%H%M%S')}.zip"
             
-            return send_file(
-                temp_file.name,
-                as_attachment=True,
-                download_name=download_name,
-                mimetype='application/zip'
-            )
+            return send_share_file_limited(share_id, holder, temp_file.name, download_name)
             
         except Exception as e:
+            release_download_slot(holder)
             # 清理临时文件
             try:
                 os.unlink(temp_file.name)
@@ -1355,6 +3276,20 @@ def admin_get_stats():
     stats = db.get_user_stats_admin()
     return jsonify(stats)
 
+@app.route('/api/admin/projects/<int:project_id>/share/analytics')
+@api_admin_required
+def admin_get_share_analytics(project_id):
+    """获取任意项目分享的访问统计"""
+    return build_share_analytics(project_id)
+
+@app.route('/api/admin/janitor')
+@api_admin_required
+def admin_get_janitor_metrics():
+    """获取定时清理任务的统计信息"""
+    metrics = load_janitor_metrics()
+    metrics['interval_seconds'] = app.config['JANITOR_INTERVAL_SECONDS']
+    return jsonify(metrics)
+
 @app.route('/api/admin/users')
 @api_admin_required
 def admin_get_users():
@@ -1402,6 +3337,18 @@ def admin_update_user(user_id):
         username = data.get('username', '').strip() if data.get('username') else None
         password = data.get('password', '').strip() if data.get('password') else None
         is_admin = data.get('is_admin') if 'is_admin' in data else None
+        # 存储配额（MB），0 或空值表示不限制
+        storage_quota_bytes = None
+        if 'storage_quota_mb' in data:
+            try:
+                storage_quota_mb = float(data.get('storage_quota_mb') or 0)
+            except (TypeError, ValueError):
+                return jsonify({'error': '存储配额必须是数字'}), 400
+            if not math.isfinite(storage_quota_mb):
+                return jsonify({'error': '存储配额必须是数字'}), 400
+            if storage_quota_mb < 0:
+                return jsonify({'error': '存储配额不能为负数'}), 400
+            storage_quota_bytes = int(storage_quota_mb * 1024 * 1024)
         
         # 验证输入
         if username is not None and len(username) < 3:
@@ -1414,7 +3361,10 @@ def admin_update_user(user_id):
         if user_id == session.get('admin_user_id') and is_admin is False:
             return jsonify({'error': '不能移除自己的管理员权限'}), 400
         
-        success, message = db.update_user(user_id, username, password, is_admin)
+        success, message = db.update_user(user_id, username, password, is_admin, storage_quota_bytes)
+        # 修改密码后让该用户已登录的会话全部失效
+        if success and password:
+            revoke_user_sessions(user_id)
         
         if success:
             return jsonify({'message': message}), 200
@@ -1424,6 +3374,19 @@ def admin_update_user(user_id):
     except Exception as e:
         return jsonify({'error': f'更新用户失败: {str(e)}'}), 500
 
+@app.route('/api/admin/users/<int:user_id>/logout', methods=['POST'])
+@api_admin_required
+def admin_force_logout(user_id):
+    """强制用户下线"""
+    if user_id == session.get('admin_user_id'):
+        return jsonify({'error': '不能强制自己下线'}), 400
+    
+    try:
+        count = revoke_user_sessions(user_id)
+        return jsonify({'message': f'已强制下线，共结束 {count} 个会话'}), 200
+    except Exception as e:
+        return jsonify({'error': f'强制下线失败: {str(e)}'}), 500
+
 @app.route('/api/admin/users/<int:user_id>', methods=['DELETE'])
 @api_admin_required
 def admin_delete_user(user_id):
@@ -1435,6 +3398,9 @@ def admin_delete_user(user_id):
     
     try:
         success, message = db.delete_user(user_id)
+        if success:
+            revoke_user_sessions(user_id)
+            invalidate_access_cache()
         
         if success:
             return jsonify({'message': message}), 200
@@ -1670,6 +3636,15 @@ def admin_delete_board_type_config(config_id):
     except Exception as e:
         return jsonify({'error': f'删除电路板类型配置失败: {str(e)}'}), 500
 
+@app.route('/api/admin/config/component')
+@api_admin_required
+@versioned_etag('components')
+def admin_get_component_config():
+    """导出完整的元器件目录（用户页面通过 /api/components/search 分页搜索）"""
+    
+    components = db.get_all_components()
+    return jsonify(components)
+
 @app.route('/api/admin/config/component', methods=['POST'])
 def admin_add_component():
     """添加元器件"""
@@ -1719,6 +3694,8 @@ def admin_update_component(component_id):
         success, message = db.update_component(component_id, name, model, price)
         
         if success:
+            # 元器件价格影响所有使用它的项目成本
+            publish_event('stats')
             return jsonify({'message': message}), 200
         else:
             return jsonify({'error': message}), 400
@@ -1736,6 +3713,7 @@ def admin_delete_component(component_id):
         success, message = db.delete_component(component_id)
         
         if success:
+            publish_event('stats')
             return jsonify({'message': message}), 200
         else:
             return jsonify({'error': message}), 400
@@ -1781,6 +3759,8 @@ def add_project_collaboration_api(project_id):
             return jsonify({'error': '权限类型无效'}), 400
         
         collaboration_id = db.add_project_collaboration(project_id, user_id, collaborator_id, permission)
+        invalidate_access_cache()
+        publish_project_event(project_id, 'collaboration', {'action': 'added', 'user_id': collaborator_id})
         return jsonify({'message': '协作者添加成功', 'collaboration_id': collaboration_id}), 201
         
     except ValueError as e:
@@ -1798,6 +3778,9 @@ def remove_project_collaboration_api(project_id, collaborator_id):
     
     try:
         db.remove_project_collaboration(project_id, user_id, collaborator_id)
+        invalidate_access_cache()
+        publish_project_event(project_id, 'collaboration', {'action': 'removed', 'user_id': collaborator_id},
+                              extra_user_ids=[collaborator_id])
         return jsonify({'message': '协作者移除成功'}), 200
         
     except ValueError as e:
@@ -1815,12 +3798,15 @@ def leave_project_collaboration_api(project_id):
     
     try:
         # 检查用户是否确实是该项目的协作者
-        access_info = db.check_project_access(project_id, user_id)
+        access_info = get_project_access(project_id, user_id)
         if not access_info['access'] or access_info['permission'] == 'owner':
             return jsonify({'error': '您不是此项目的协作者或您是项目所有者'}), 403
         
         # 执行退出操作（协作者自己退出，所以owner_id设为None）
         db.remove_project_collaboration(project_id, None, user_id)
+        invalidate_access_cache()
+        publish_project_event(project_id, 'collaboration', {'action': 'removed', 'user_id': user_id},
+                              extra_user_ids=[user_id])
         return jsonify({'message': '成功退出项目协作'}), 200
         
     except ValueError as e:
@@ -1843,7 +3829,9 @@ def update_collaboration_permission_api(collaboration_id):
         if permission not in ['read', 'write']:
             return jsonify({'error': '权限类型无效'}), 400
         
-        db.update_collaboration_permission(collaboration_id, user_id, permission)
+        project_id = db.update_collaboration_permission(collaboration_id, user_id, permission)
+        invalidate_access_cache()
+        publish_project_event(project_id, 'collaboration', {'action': 'permission', 'permission': permission})
         return jsonify({'message': '权限更新成功'}), 200
         
     except ValueError as e:
@@ -1881,6 +3869,7 @@ def get_collaborated_projects_api():
 
 @app.route('/api/user/settings')
 @api_login_required
+@versioned_etag('user_settings')
 def get_user_settings_api():
     """获取用户设置"""
     try:
@@ -1906,6 +3895,227 @@ def update_user_settings_api():
     except Exception as e:
         return jsonify({"error": f"更新用户设置失败: {str(e)}"}), 500
 
+# ==================== 实时事件推送 ====================
+
+# 事件写入共享事件表，由各 worker 的同步线程按ID顺序读取后推送给本进程的订阅者，
+# 因此无论页面连接在哪个 worker 上都能收到，事件ID在所有 worker 间一致
+
+# user_id -> 订阅队列集合；每个打开的 SSE 连接或长轮询请求对应一个队列
+_event_subscribers = {}
+_event_lock = threading.Lock()
+_recent_events = deque(maxlen=app.config['EVENT_BUFFER_SIZE'])
+# 缓冲区包含 floor 之后的全部事件，更早的事件需要从数据库读取
+_event_buffer_state = {'floor': 0}
+_event_stream_state = {'clients': 0, 'pollers': 0}
+
+def publish_event(event_type, data=None, user_ids=None):
+    """向指定用户（user_ids 为 None 时为所有用户）的已打开页面推送事件，返回事件ID"""
+    event_id = db.append_event(event_type, data or {}, user_ids)
+    _shared_sync_wakeup.set()
+    return event_id
+
+def reset_event_buffer(floor):
+    with _event_lock:
+        _recent_events.clear()
+        _event_buffer_state['floor'] = floor
+
+def dispatch_event(event):
+    """把同步线程读到的事件放入缓冲区并推送给本进程中对应用户的订阅者"""
+    event = dict(event, user_ids=frozenset(event['user_ids']) if event['user_ids'] is not None else None)
+    if event['type'] == 'stats':
+        _shared_state['stats_event_id'] = event['id']
+    with _event_lock:
+        if len(_recent_events) == _recent_events.maxlen:
+            _event_buffer_state['floor'] = _recent_events[0]['id']
+        _recent_events.append(event)
+        if event['user_ids'] is None:
+            targets = [q for queues in _event_subscribers.values() for q in queues]
+        else:
+            targets = [q for user_id in event['user_ids'] for q in _event_subscribers.get(user_id, ())]
+    for q in targets:
+        q.put(event)
+
+def publish_project_event(project_id, event_type, data=None, extra_user_ids=()):
+    """向项目所有者和协作者推送项目相关事件"""
+    try:
+        user_ids = set(db.get_project_member_ids(project_id)) | set(extra_user_ids)
+        publish_event(event_type, dict(data or {}, project_id=project_id), user_ids)
+    except Exception as e:
+        print(f"推送项目事件失败: {e}")
+
+def subscribe_events(user_id):
+    q = queue.Queue()
+    with _event_lock:
+        _event_subscribers.setdefault(user_id, set()).add(q)
+    return q
+
+def unsubscribe_events(user_id, q):
+    with _event_lock:
+        queues = _event_subscribers.get(user_id)
+        if queues:
+            queues.discard(q)
+            if not queues:
+                del _event_subscribers[user_id]
+
+def recent_events_since(user_id, last_id):
+    """返回 last_id 之后已推送、且发给该用户的事件；事件已被清理时返回 None，需要整页同步"""
+    with _event_lock:
+        if last_id >= _event_buffer_state['floor']:
+            return [e for e in _recent_events
+                    if e['id'] > last_id and (e['user_ids'] is None or user_id in e['user_ids'])]
+    
+    # 本进程启动前或缓冲区之外的事件从共享事件表读取
+    latest = latest_event_id()
+    events = [e for e in db.get_events_after(last_id, app.config['EVENT_BUFFER_SIZE']) if e['id'] <= latest]
+    if latest > last_id and (not events or events[0]['id'] != last_id + 1):
+        return None
+    return [e for e in events if e['user_ids'] is None or user_id in e['user_ids']]
+
+def latest_event_id():
+    """本进程已推送的最新事件ID"""
+    return _shared_state['event_id'] or 0
+
+def event_to_json(event):
+    return {'id': event['id'], 'type': event['type'], 'data': event['data']}
+
+def format_sse(event_type, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
+
+def current_session_expires_at(sid):
+    """读取会话的最新过期时间（优先使用进程内会话缓存），会话已失效时返回 None"""
+    entry = load_session_entry(sid)
+    return entry[1] if entry else None
+
+def reserve_event_waiter(kind):
+    """在 SSE 连接（clients）和长轮询（pollers）共享的等待名额中占用一个，名额用完时返回 False；
+    每个等待中的请求都占用一个请求线程，名额上限保证其余线程仍能处理普通请求"""
+    with _event_lock:
+        if _event_stream_state['clients'] + _event_stream_state['pollers'] >= app.config['EVENT_STREAM_MAX_CLIENTS']:
+            return False
+        _event_stream_state[kind] += 1
+        return True
+
+def release_event_waiter(kind):
+    with _event_lock:
+        _event_stream_state[kind] -= 1
+
+@app.route('/api/events')
+@api_login_required
+def event_stream():
+    """SSE 事件流：统计数据失效、项目变更、上传完成、协作变更以及会话即将过期"""
+    if not reserve_event_waiter('clients'):
+        return jsonify({'error': '实时连接数已满，请使用长轮询'}), 503
+    
+    user_id = session['user_id']
+    sid = session.sid
+    expires_at = session.expires_at
+    heartbeat = app.config['EVENT_STREAM_HEARTBEAT_SECONDS']
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    q = subscribe_events(user_id)
+    
+    def generate():
+        nonlocal expires_at
+        try:
+            yield 'retry: 5000\n\n'
+            last_sent = latest_event_id()
+            if last_event_id is not None:
+                # 断线重连（可能连到另一个 worker）：补发错过的事件，事件已被清理时让页面整体同步
+                missed = recent_events_since(user_id, last_event_id)
+                if missed is None:
+                    yield format_sse('resync', {}, last_sent)
+                else:
+                    for event in missed:
+                        yield format_sse(event['type'], event['data'], event['id'])
+                    if missed:
+                        last_sent = max(last_sent, missed[-1]['id'])
+            else:
+                yield format_sse('ready', {}, last_sent)
+            
+            warned = False
+            while True:
+                try:
+                    event = q.get(timeout=heartbeat)
+                    # 订阅后、补发前到达的事件已经补发过
+                    if event['id'] > last_sent:
+                        last_sent = event['id']
+                        yield format_sse(event['type'], event['data'], event['id'])
+                    continue
+                except queue.Empty:
+                    pass
+                
+                # 心跳时检查会话：页面上的其他请求会续期，强制下线后会话记录被删除
+                remaining = expires_at - time.time()
+                if remaining <= heartbeat * 2:
+                    expires_at = current_session_expires_at(sid) or 0
+                    remaining = expires_at - time.time()
+                if remaining <= 0:
+                    yield format_sse('session-expired', {})
+                    return
+                if remaining <= 60 and not warned:
+                    warned = True
+                    yield format_sse('session-expiring', {'remaining_seconds': int(remaining)})
+                elif remaining > 60:
+                    warned = False
+                yield ': ping\n\n'
+        finally:
+            unsubscribe_events(user_id, q)
+            release_event_waiter('clients')
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # 关闭 nginx 缓冲，事件立即送达
+    return response
+
+@app.route('/api/events/poll')
+@api_login_required
+def poll_events():
+    """长轮询（SSE 不可用时的降级方案）：返回 cursor 之后的事件，没有事件时最多等待 EVENT_POLL_TIMEOUT_SECONDS；
+    等待名额已满时不等待，立即返回当前游标和 retry_after（秒），客户端稍后再请求"""
+    user_id = session['user_id']
+    cursor = request.args.get('cursor', type=int)
+    if cursor is None or (cursor > latest_event_id() and cursor > db.get_latest_event_id()):
+        # 首次请求（或事件表被重建后）只返回当前游标
+        return jsonify({'cursor': latest_event_id(), 'events': []})
+    
+    retry_after = None
+    q = subscribe_events(user_id)
+    try:
+        latest = latest_event_id()
+        events = recent_events_since(user_id, cursor)
+        if events == []:
+            if reserve_event_waiter('pollers'):
+                try:
+                    q.get(timeout=app.config['EVENT_POLL_TIMEOUT_SECONDS'])
+                except queue.Empty:
+                    pass
+                finally:
+                    release_event_waiter('pollers')
+                latest = latest_event_id()
+                events = recent_events_since(user_id, cursor)
+            else:
+                retry_after = app.config['EVENT_POLL_RETRY_SECONDS']
+    finally:
+        unsubscribe_events(user_id, q)
+    
+    if events is None:
+        return jsonify({'cursor': latest, 'events': [{'type': 'resync', 'data': {}}]})
+    # 游标前移到已检查过的最新事件，跳过发给其他用户的事件
+    result = {
+        'cursor': max([cursor, latest] + [e['id'] for e in events]),
+        'events': [event_to_json(e) for e in events]
+    }
+    if retry_after is not None:
+        result['retry_after'] = retry_after
+    return jsonify(result)
+
+if not db.in_pool_worker():
+    threading.Thread(target=shared_state_loop, name='shared-state-sync', daemon=True).start()
+
 # ============= 统计数据更新通知相关路由 =============
 
 @app.route('/api/admin/notify-stats-update', methods=['POST'])
@@ -1913,8 +4123,8 @@ def update_user_settings_api():
 def notify_stats_update():
     """管理员修改元器件价格后，通知所有用户刷新统计数据"""
     try:
-        # 更新全局统计数据更新时间戳
-        app.config['STATS_UPDATE_TIME'] = get_beijing_time()
+        # 写入共享事件表，所有 worker 上打开的页面都会收到
+        publish_event('stats')
         return jsonify({"message": "统计数据更新通知已发送"}), 200
     except Exception as e:
         return jsonify({"error": f"发送更新通知失败: {str(e)}"}), 500
@@ -1922,24 +4132,13 @@ def notify_stats_update():
 @app.route('/api/stats-update-check')
 @api_login_required
 def check_stats_update():
-    """检查统计数据是否需要更新"""
+    """检查统计数据是否需要更新：since 为客户端上次拿到的版本号（最近一次 stats 事件ID）"""
     try:
-        # 从session中获取用户上次加载统计数据的时间
-        last_stats_time = session.get('last_stats_time')
-        current_update_time = app.config.get('STATS_UPDATE_TIME')
-        
-        needs_update = False
-        if current_update_time and last_stats_time:
-            # 如果全局更新时间晚于用户的统计数据时间，则需要更新
-            if current_update_time > last_stats_time:
-                needs_update = True
-        elif current_update_time:
-            # 如果用户没有统计数据时间记录，但有全局更新时间，则需要更新
-            needs_update = True
-        
+        since = request.args.get('since', type=int)
+        version = _shared_state['stats_event_id'] or 0
         return jsonify({
-            "needs_update": needs_update,
-            "update_time": current_update_time.isoformat() if current_update_time else None
+            "needs_update": since is not None and version > since,
+            "version": version
         }), 200
     except Exception as e:
         return jsonify({"error": f"检查统计数据更新失败: {str(e)}"}), 500
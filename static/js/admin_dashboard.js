@@ -0,0 +1,627 @@
+let currentEditUserId = null;
+let currentEditConfigId = null;
+let currentConfigType = null;
+
+// 切换内容区域的函数
+function switchSection(sectionId) {
+    // 隐藏所有内容区域
+    document.querySelectorAll('.content-section').forEach(section => {
+        section.classList.remove('active');
+    });
+
+    // 显示选中的内容区域
+    document.getElementById(sectionId).classList.add('active');
+
+    // 更新导航链接状态
+    document.querySelectorAll('.nav-link').forEach(link => {
+        link.classList.remove('active');
+    });
+    event.target.classList.add('active');
+
+    // 根据选择的区域加载相应数据
+    if (sectionId === 'dashboard') {
+        loadStats();
+    } else if (sectionId === 'permission') {
+        loadUsers();
+    } else if (sectionId === 'settings') {
+        loadConfigs();
+    }
+}
+
+// 切换配置选项卡
+function switchConfigTab(configType) {
+    // 隐藏所有配置内容
+    document.querySelectorAll('.config-content').forEach(content => {
+        content.classList.remove('active');
+    });
+
+    // 显示选中的配置内容
+    document.getElementById(configType + '-config').classList.add('active');
+
+    // 更新选项卡状态
+    document.querySelectorAll('.config-tab').forEach(tab => {
+        tab.classList.remove('active');
+    });
+    event.target.classList.add('active');
+
+    // 加载对应的配置数据
+    loadConfigData(configType);
+}
+
+// 加载所有配置数据
+function loadConfigs() {
+    loadConfigData('status');
+    loadConfigData('source');
+    loadConfigData('board-type');
+    loadConfigData('component');
+}
+
+// 加载指定类型的配置数据
+async function loadConfigData(configType) {
+    try {
+        const response = await fetch(`/api/admin/config/${configType}`);
+        const data = await response.json();
+
+        if (response.ok) {
+            displayConfigData(configType, data);
+        } else {
+            console.error(`加载${configType}配置失败:`, data.error);
+        }
+    } catch (error) {
+        console.error(`加载${configType}配置时出错:`, error);
+    }
+}
+
+// 显示配置数据
+function displayConfigData(configType, data) {
+    // 根据配置类型获取正确的tbody ID
+    let tbodyId;
+    if (configType === 'status') {
+        tbodyId = 'statusConfigTableBody';
+    } else if (configType === 'source') {
+        tbodyId = 'sourceConfigTableBody';
+    } else if (configType === 'board-type') {
+        tbodyId = 'boardTypeConfigTableBody';
+    } else if (configType === 'component') {
+        tbodyId = 'componentConfigTableBody';
+    }
+
+    const tbody = document.getElementById(tbodyId);
+
+    if (!tbody) {
+        console.error(`找不到表格元素: ${tbodyId}`);
+        return;
+    }
+
+    if (configType === 'status') {
+        tbody.innerHTML = data.map(item => `
+            <tr>
+                <td>${item.value}</td>
+                <td>${item.label}</td>
+                <td>
+                    <div class="color-preview" style="background: ${item.color}"></div>
+                </td>
+                <td>${item.sort_order}</td>
+                <td class="actions">
+                    <button class="btn btn-warning" onclick="showEditStatusModal(${item.id}, '${item.value}', '${item.label}', '${item.color}', ${item.sort_order})">编辑</button>
+                    <button class="btn btn-danger" onclick="deleteConfig('status', ${item.id})">删除</button>
+                </td>
+            </tr>
+        `).join('');
+    } else if (configType === 'source') {
+        tbody.innerHTML = data.map(item => `
+            <tr>
+                <td>${item.name}</td>
+                <td>${item.sort_order}</td>
+                <td class="actions">
+                    <button class="btn btn-warning" onclick="showEditSourceModal(${item.id}, '${item.name}', ${item.sort_order})">编辑</button>
+                    <button class="btn btn-danger" onclick="deleteConfig('source', ${item.id})">删除</button>
+                </td>
+            </tr>
+        `).join('');
+    } else if (configType === 'board-type') {
+        tbody.innerHTML = data.map(item => `
+            <tr>
+                <td>${item.name}</td>
+                <td>${item.sort_order}</td>
+                <td class="actions">
+                    <button class="btn btn-warning" onclick="showEditBoardTypeModal(${item.id}, '${item.name}', ${item.sort_order})">编辑</button>
+                    <button class="btn btn-danger" onclick="deleteConfig('board-type', ${item.id})">删除</button>
+                </td>
+            </tr>
+        `).join('');
+    } else if (configType === 'component') {
+        tbody.innerHTML = data.map(item => `
+            <tr>
+                <td>${item.name}</td>
+                <td>${item.model}</td>
+                <td class="price-display">¥${item.price.toFixed(2)}</td>
+                <td class="actions">
+                    <button class="btn btn-warning" onclick="showEditComponentModal(${item.id}, '${item.name}', '${item.model}', ${item.price})">编辑</button>
+                    <button class="btn btn-danger" onclick="deleteConfig('component', ${item.id})">删除</button>
+                </td>
+            </tr>
+        `).join('');
+    }
+}
+
+// 状态配置相关函数
+function showAddStatusModal() {
+    currentEditConfigId = null;
+    document.getElementById('statusModalTitle').textContent = '添加状态';
+    document.getElementById('statusSubmitBtn').textContent = '添加';
+    document.getElementById('statusConfigForm').reset();
+    document.getElementById('statusConfigModal').style.display = 'block';
+}
+
+function showEditStatusModal(id, value, label, color, sortOrder) {
+    currentEditConfigId = id;
+    document.getElementById('statusModalTitle').textContent = '编辑状态';
+    document.getElementById('statusSubmitBtn').textContent = '保存';
+    document.getElementById('statusValue').value = value;
+    document.getElementById('statusLabel').value = label;
+    document.getElementById('statusColor').value = color;
+    document.getElementById('statusSortOrder').value = sortOrder;
+    document.getElementById('statusConfigModal').style.display = 'block';
+}
+
+function closeStatusConfigModal() {
+    document.getElementById('statusConfigModal').style.display = 'none';
+    currentEditConfigId = null;
+}
+
+// 来源配置相关函数
+function showAddSourceModal() {
+    currentEditConfigId = null;
+    document.getElementById('sourceModalTitle').textContent = '添加来源';
+    document.getElementById('sourceSubmitBtn').textContent = '添加';
+    document.getElementById('sourceConfigForm').reset();
+    document.getElementById('sourceConfigModal').style.display = 'block';
+}
+
+function showEditSourceModal(id, name, sortOrder) {
+    currentEditConfigId = id;
+    document.getElementById('sourceModalTitle').textContent = '编辑来源';
+    document.getElementById('sourceSubmitBtn').textContent = '保存';
+    document.getElementById('sourceName').value = name;
+    document.getElementById('sourceSortOrder').value = sortOrder;
+    document.getElementById('sourceConfigModal').style.display = 'block';
+}
+
+function closeSourceConfigModal() {
+    document.getElementById('sourceConfigModal').style.display = 'none';
+    currentEditConfigId = null;
+}
+
+// 电路板类型配置相关函数
+function showAddBoardTypeModal() {
+    currentEditConfigId = null;
+    document.getElementById('boardTypeModalTitle').textContent = '添加电路板类型';
+    document.getElementById('boardTypeSubmitBtn').textContent = '添加';
+    document.getElementById('boardTypeConfigForm').reset();
+    document.getElementById('boardTypeConfigModal').style.display = 'block';
+}
+
+function showEditBoardTypeModal(id, name, sortOrder) {
+    currentEditConfigId = id;
+    document.getElementById('boardTypeModalTitle').textContent = '编辑电路板类型';
+    document.getElementById('boardTypeSubmitBtn').textContent = '保存';
+    document.getElementById('boardTypeName').value = name;
+    document.getElementById('boardTypeSortOrder').value = sortOrder;
+    document.getElementById('boardTypeConfigModal').style.display = 'block';
+}
+
+function closeBoardTypeConfigModal() {
+    document.getElementById('boardTypeConfigModal').style.display = 'none';
+    currentEditConfigId = null;
+}
+
+// 元器件配置相关函数
+function showAddComponentModal() {
+    currentEditConfigId = null;
+    document.getElementById('componentModalTitle').textContent = '添加元器件';
+    document.getElementById('componentSubmitBtn').textContent = '添加';
+    document.getElementById('componentConfigForm').reset();
+    document.getElementById('componentConfigModal').style.display = 'block';
+}
+
+function showEditComponentModal(id, name, model, price) {
+    currentEditConfigId = id;
+    document.getElementById('componentModalTitle').textContent = '编辑元器件';
+    document.getElementById('componentSubmitBtn').textContent = '保存';
+    document.getElementById('componentName').value = name;
+    document.getElementById('componentModel').value = model;
+    document.getElementById('componentPrice').value = price;
+    document.getElementById('componentConfigModal').style.display = 'block';
+}
+
+function closeComponentConfigModal() {
+    document.getElementById('componentConfigModal').style.display = 'none';
+    currentEditConfigId = null;
+}
+
+// 通用删除配置函数
+async function deleteConfig(configType, configId) {
+    const confirmMessage = `确定要删除这个${getConfigTypeName(configType)}吗？如果有项目正在使用，将无法删除。`;
+    if (!confirm(confirmMessage)) {
+        return;
+    }
+
+    try {
+        let url = `/api/admin/config/${configType}/${configId}`;
+        if (configType === 'component') {
+            url = `/api/admin/config/component/${configId}`;
+        }
+
+        const response = await fetch(url, {
+            method: 'DELETE'
+        });
+
+        const result = await response.json();
+
+        if (response.ok) {
+            alert(result.message);
+            loadConfigData(configType);
+        } else {
+            alert('错误: ' + result.error);
+        }
+    } catch (error) {
+        alert('删除失败: ' + error.message);
+    }
+}
+
+function getConfigTypeName(configType) {
+    const names = {
+        'status': '状态',
+        'source': '来源',
+        'board-type': '电路板类型',
+        'component': '元器件'
+    };
+    return names[configType] || configType;
+}
+
+// 配置表单提交处理
+async function submitConfigForm(configType, form) {
+    const formData = new FormData(form);
+    const data = Object.fromEntries(formData.entries());
+
+    // 转换数字字段
+    if (data.sort_order !== undefined) {
+        data.sort_order = parseInt(data.sort_order);
+    }
+    if (data.price !== undefined) {
+        data.price = parseFloat(data.price);
+    }
+
+    try {
+        let url = `/api/admin/config/${configType}`;
+        let method = 'POST';
+
+        if (currentEditConfigId) {
+            url += `/${currentEditConfigId}`;
+            method = 'PUT';
+        }
+
+        if (configType === 'component') {
+            url = currentEditConfigId ? 
+                `/api/admin/config/component/${currentEditConfigId}` : 
+                '/api/admin/config/component';
+        }
+
+        const response = await fetch(url, {
+            method: method,
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(data)
+        });
+
+        const result = await response.json();
+
+        if (response.ok) {
+            alert(result.message);
+            // 关闭模态框
+            if (configType === 'status') closeStatusConfigModal();
+            else if (configType === 'source') closeSourceConfigModal();
+            else if (configType === 'board-type') closeBoardTypeConfigModal();
+            else if (configType === 'component') closeComponentConfigModal();
+
+            // 重新加载数据
+            loadConfigData(configType);
+        } else {
+            alert('错误: ' + result.error);
+        }
+    } catch (error) {
+        alert('操作失败: ' + error.message);
+    }
+}
+
+// 加载统计信息
+async function loadStats() {
+    try {
+        const response = await fetch('/api/admin/stats');
+        const stats = await response.json();
+
+        if (response.ok) {
+            displayStats(stats);
+        } else {
+            console.error('加载统计信息失败:', stats.error);
+        }
+    } catch (error) {
+        console.error('加载统计信息时出错:', error);
+    }
+}
+
+// 显示统计信息
+function displayStats(stats) {
+    const statsGrid = document.getElementById('statsGrid');
+    statsGrid.innerHTML = `
+        <div class="stat-card">
+            <div class="stat-number">${stats.total_users}</div>
+            <div class="stat-label">总用户数</div>
+        </div>
+        <div class="stat-card">
+            <div class="stat-number">${stats.admin_count}</div>
+            <div class="stat-label">管理员数量</div>
+        </div>
+        <div class="stat-card">
+            <div class="stat-number">${stats.regular_users}</div>
+            <div class="stat-label">普通用户数量</div>
+        </div>
+        <div class="stat-card">
+            <div class="stat-number">${stats.total_projects}</div>
+            <div class="stat-label">总项目数</div>
+        </div>
+        <div class="stat-card">
+            <div class="stat-number">${stats.active_projects}</div>
+            <div class="stat-label">活跃项目数</div>
+        </div>
+        <div class="stat-card">
+            <div class="stat-number">${stats.total_shares}</div>
+            <div class="stat-label">总分享数</div>
+        </div>
+        <div class="stat-card">
+            <div class="stat-number">${formatBytes(stats.total_storage_bytes)}</div>
+            <div class="stat-label">总存储用量 (${stats.total_storage_files} 个文件)</div>
+        </div>
+    `;
+}
+
+// 格式化字节数
+function formatBytes(bytes) {
+    if (!bytes) return '0 B';
+    const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+    let i = 0;
+    while (bytes >= 1024 && i < units.length - 1) {
+        bytes /= 1024;
+        i++;
+    }
+    return `${bytes.toFixed(1)} ${units[i]}`;
+}
+
+// 加载用户列表
+async function loadUsers() {
+    try {
+        const response = await fetch('/api/admin/users');
+        const users = await response.json();
+
+        if (response.ok) {
+            displayUsers(users);
+        } else {
+            console.error('加载用户列表失败:', users.error);
+        }
+    } catch (error) {
+        console.error('加载用户列表时出错:', error);
+    }
+}
+
+// 显示用户列表
+function displayUsers(users) {
+    const tbody = document.getElementById('usersTableBody');
+    tbody.innerHTML = users.map(user => `
+        <tr>
+            <td>${user.id}</td>
+            <td>${user.username}</td>
+            <td>
+                <span class="user-badge ${user.is_admin ? 'admin' : 'user'}">
+                    ${user.is_admin ? '管理员' : '普通用户'}
+                </span>
+            </td>
+            <td>
+                ${formatBytes(user.storage_bytes)}${user.storage_quota_bytes ? ' / ' + formatBytes(user.storage_quota_bytes) : ''}
+                <div style="font-size: 12px; color: #888;">${user.storage_files} 个文件</div>
+            </td>
+            <td>${new Date(user.created_at).toLocaleString()}</td>
+            <td class="actions">
+                <button class="btn btn-warning" onclick="showEditUserModal(${user.id}, '${user.username}', ${user.is_admin}, ${user.storage_quota_bytes || 0})">编辑</button>
+                <button class="btn btn-secondary" onclick="forceLogoutUser(${user.id}, '${user.username}')">强制下线</button>
+                <button class="btn btn-danger" onclick="deleteUser(${user.id}, '${user.username}')">删除</button>
+            </td>
+        </tr>
+    `).join('');
+}
+
+// 显示添加用户模态框
+function showAddUserModal() {
+    currentEditUserId = null;
+    document.getElementById('modalTitle').textContent = '添加用户';
+    document.getElementById('submitBtn').textContent = '添加';
+    document.getElementById('userForm').reset();
+    document.getElementById('userModal').style.display = 'block';
+}
+
+// 显示编辑用户模态框
+function showEditUserModal(userId, username, isAdmin, storageQuotaBytes) {
+    currentEditUserId = userId;
+    document.getElementById('modalTitle').textContent = '编辑用户';
+    document.getElementById('submitBtn').textContent = '保存';
+    document.getElementById('username').value = username;
+    document.getElementById('password').value = '';
+    document.getElementById('password').placeholder = '留空表示不修改密码';
+    document.getElementById('is_admin').checked = isAdmin;
+    document.getElementById('storage_quota_mb').value = storageQuotaBytes ? Math.round(storageQuotaBytes / 1024 / 1024) : '';
+    document.getElementById('userModal').style.display = 'block';
+}
+
+// 关闭用户模态框
+function closeUserModal() {
+    document.getElementById('userModal').style.display = 'none';
+    document.getElementById('password').placeholder = '';
+    currentEditUserId = null;
+}
+
+// 提交用户表单
+document.getElementById('userForm').addEventListener('submit', async function(e) {
+    e.preventDefault();
+
+    const formData = new FormData(this);
+    const userData = {
+        username: formData.get('username'),
+        password: formData.get('password'),
+        is_admin: formData.has('is_admin')
+    };
+
+    try {
+        let response;
+        if (currentEditUserId) {
+            // 编辑用户
+            if (!userData.password) {
+                delete userData.password; // 不修改密码
+            }
+            userData.storage_quota_mb = Number(formData.get('storage_quota_mb')) || 0;
+            response = await fetch(`/api/admin/users/${currentEditUserId}`, {
+                method: 'PUT',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(userData)
+            });
+        } else {
+            // 添加用户
+            response = await fetch('/api/admin/users', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(userData)
+            });
+        }
+
+        const result = await response.json();
+
+        if (response.ok) {
+            alert(result.message);
+            closeUserModal();
+            loadUsers(); // 重新加载用户列表
+            loadStats(); // 重新加载统计信息
+        } else {
+            alert('错误: ' + result.error);
+        }
+    } catch (error) {
+        alert('操作失败: ' + error.message);
+    }
+});
+
+// 强制用户下线
+async function forceLogoutUser(userId, username) {
+    if (!confirm(`确定要强制用户 "${username}" 下线吗？`)) {
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/admin/users/${userId}/logout`, {
+            method: 'POST'
+        });
+
+        const result = await response.json();
+
+        if (response.ok) {
+            alert(result.message);
+        } else {
+            alert('错误: ' + result.error);
+        }
+    } catch (error) {
+        alert('强制下线失败: ' + error.message);
+    }
+}
+
+// 删除用户
+async function deleteUser(userId, username) {
+    if (!confirm(`确定要删除用户 "${username}" 吗？此操作不可撤销，将删除该用户的所有数据。`)) {
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/admin/users/${userId}`, {
+            method: 'DELETE'
+        });
+
+        const result = await response.json();
+
+        if (response.ok) {
+            alert(result.message);
+            loadUsers(); // 重新加载用户列表
+            loadStats(); // 重新加载统计信息
+        } else {
+            alert('错误: ' + result.error);
+        }
+    } catch (error) {
+        alert('删除失败: ' + error.message);
+    }
+}
+
+// 页面加载完成后初始化
+document.addEventListener('DOMContentLoaded', function() {
+    loadStats();
+    loadUsers();
+
+    // 添加配置表单提交事件
+    document.getElementById('statusConfigForm').addEventListener('submit', async function(e) {
+        e.preventDefault();
+        await submitConfigForm('status', this);
+    });
+
+    document.getElementById('sourceConfigForm').addEventListener('submit', async function(e) {
+        e.preventDefault();
+        await submitConfigForm('source', this);
+    });
+
+    document.getElementById('boardTypeConfigForm').addEventListener('submit', async function(e) {
+        e.preventDefault();
+        await submitConfigForm('board-type', this);
+    });
+
+    document.getElementById('componentConfigForm').addEventListener('submit', async function(e) {
+        e.preventDefault();
+        await submitConfigForm('component', this);
+    });
+});
+
+// 点击模态框外部关闭模态框
+window.addEventListener('click', function(event) {
+    const modal = document.getElementById('userModal');
+    if (event.target === modal) {
+        closeUserModal();
+    }
+
+    // 配置模态框关闭
+    const statusModal = document.getElementById('statusConfigModal');
+    if (event.target === statusModal) {
+        closeStatusConfigModal();
+    }
+
+    const sourceModal = document.getElementById('sourceConfigModal');
+    if (event.target === sourceModal) {
+        closeSourceConfigModal();
+    }
+
+    const boardTypeModal = document.getElementById('boardTypeConfigModal');
+    if (event.target === boardTypeModal) {
+        closeBoardTypeConfigModal();
+    }
+
+    const componentModal = document.getElementById('componentConfigModal');
+    if (event.target === componentModal) {
+        closeComponentConfigModal();
+    }
+});
@@ -0,0 +1,615 @@
+// 获取并更新元器件总价格
+async function updateComponentsPrice(preloadedStats) {
+    try {
+        if (preloadedStats) {
+            updatePriceDisplay('#components-price', preloadedStats.components_total_price);
+            return;
+        }
+        const response = await fetch('/api/user/stats');
+        const stats = await response.json();
+        if (response.ok) {
+            updatePriceDisplay('#components-price', stats.components_total_price);
+        }
+    } catch (error) {
+        console.error('Failed to update components price:', error);
+    }
+}
+
+// ==================== 实时事件 ====================
+// 优先使用 SSE 接收服务端推送，连接被拒绝或浏览器不支持时降级为长轮询
+// currentUserId 由 dashboard.html 内联脚本提供
+
+// ==================== 项目增量同步 ====================
+// 页面保存服务端渲染时的同步令牌，收到项目相关事件后只拉取令牌之后的变化并更新对应的行
+// projectSyncToken 由 dashboard.html 内联脚本提供（服务端渲染时的同步令牌）
+let projectSyncRunning = false;
+let projectSyncQueued = false;
+
+function upsertProjectRow(project, tbody) {
+    const existingRow = tbody.querySelector(`tr[data-project-id="${project.id}"]`);
+    const rowIndex = existingRow
+        ? Array.from(tbody.children).indexOf(existingRow) + 1
+        : tbody.children.length + 1;
+    
+    const temp = document.createElement('tbody');
+    temp.innerHTML = createTableRow(project, rowIndex);
+    const newRow = temp.firstElementChild;
+    if (existingRow) {
+        existingRow.replaceWith(newRow);
+    } else {
+        tbody.appendChild(newRow);
+    }
+    
+    const dropdown = newRow.querySelector('.dropdown');
+    if (dropdown) {
+        initializeDropdownPosition(dropdown);
+    }
+    return !existingRow;
+}
+
+function applyProjectChanges(changes) {
+    const tbody = document.querySelector('.table tbody');
+    if (!tbody) {
+        return;
+    }
+    
+    if (changes.full) {
+        // 令牌过旧，服务端返回了完整列表：移除列表中已不存在的行
+        const ids = new Set(changes.projects.map(project => String(project.id)));
+        tbody.querySelectorAll('tr[data-project-id]').forEach(row => {
+            if (!ids.has(row.dataset.projectId)) {
+                row.remove();
+            }
+        });
+    }
+    changes.deleted.forEach(projectId => {
+        const row = tbody.querySelector(`tr[data-project-id="${projectId}"]`);
+        if (row) {
+            row.remove();
+        }
+    });
+    
+    let newShared = 0;
+    changes.projects.forEach(project => {
+        if (upsertProjectRow(project, tbody) && project.is_shared_to_me) {
+            newShared++;
+        }
+    });
+    if (newShared > 0) {
+        showToast('项目有更新', `有 ${newShared} 个新的共享项目`, 'info');
+    }
+    
+    if (changes.projects.length || changes.deleted.length || changes.full) {
+        if (window.updateProjectSearchRows) {
+            window.updateProjectSearchRows();
+        }
+        updateStatsCards();
+        updateComponentsPrice();
+    }
+}
+
+async function syncProjects() {
+    // 同一时间只进行一次同步，期间到达的事件合并为一次后续同步
+    if (projectSyncRunning) {
+        projectSyncQueued = true;
+        return;
+    }
+    projectSyncRunning = true;
+    try {
+        do {
+            projectSyncQueued = false;
+            const response = await fetch(`/api/jobs?since=${projectSyncToken}`);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            const changes = await response.json();
+            applyProjectChanges(changes);
+            projectSyncToken = changes.token;
+        } while (projectSyncQueued);
+    } catch (error) {
+        console.error('同步项目列表失败:', error);
+    } finally {
+        projectSyncRunning = false;
+    }
+}
+
+function handleServerEvent(type, data) {
+    switch (type) {
+        case 'stats':
+            updateComponentsPrice();
+            updateStatsCards();
+            syncProjects();
+            break;
+        case 'project':
+        case 'upload':
+        case 'collaboration':
+            syncProjects();
+            break;
+        case 'session-expiring':
+            if (confirm('您的登录即将过期，是否要延长会话时间？')) {
+                fetch('/api/session/status').catch(error => console.error('刷新session失败:', error));
+            }
+            break;
+        case 'session-expired':
+            alert('登录已过期，请重新登录');
+            window.location.href = '/';
+            break;
+        case 'resync':
+            updateStatsCards();
+            syncProjects();
+            break;
+    }
+}
+
+async function startEventPolling() {
+    let cursor = null;
+    while (true) {
+        try {
+            const url = cursor === null ? '/api/events/poll' : `/api/events/poll?cursor=${cursor}`;
+            const response = await fetch(url);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            const result = await response.json();
+            cursor = result.cursor;
+            result.events.forEach(event => handleServerEvent(event.type, event.data));
+            if (result.retry_after) {
+                // 服务端等待名额已满，稍后再请求
+                await new Promise(resolve => setTimeout(resolve, result.retry_after * 1000));
+            }
+        } catch (error) {
+            if (error === 'Session expired') {
+                return;
+            }
+            await new Promise(resolve => setTimeout(resolve, 5000));
+        }
+    }
+}
+
+function startEventStream() {
+    if (!window.EventSource) {
+        startEventPolling();
+        return;
+    }
+    
+    const source = new EventSource('/api/events');
+    ['stats', 'project', 'upload', 'collaboration', 'session-expiring', 'session-expired', 'resync'].forEach(type => {
+        source.addEventListener(type, event => {
+            if (type === 'session-expired') {
+                source.close();
+            }
+            handleServerEvent(type, JSON.parse(event.data));
+        });
+    });
+    source.onerror = function() {
+        // 连接被服务端拒绝（如连接数已满、会话过期）时浏览器不会自动重连
+        if (source.readyState === EventSource.CLOSED) {
+            startEventPolling();
+        }
+    };
+}
+
+// 页面加载时初始化
+document.addEventListener('DOMContentLoaded', function() {
+    loadDashboardBootstrap();
+    startEventStream();
+});
+
+// 一次请求获取页面初始化需要的下拉选项、元器件、统计和设置（项目列表已由服务端渲染）
+async function loadDashboardBootstrap() {
+    let data = {};
+    try {
+        const response = await fetch('/api/bootstrap?include=sources,board_types,statuses,components,stats,settings');
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        data = await response.json();
+    } catch (error) {
+        // 初始化接口失败时各部分退回到单独请求
+        console.error('加载初始化数据失败:', error);
+    }
+    
+    loadSourceOptions(data.sources);
+    loadBoardTypes(data.board_types);
+    loadComponents(data.components);
+    loadStatusOptions(data.statuses);
+    updateComponentsPrice(data.stats);
+    initializePriceToggle(data.settings);
+}
+
+// 初始化价格切换功能
+async function initializePriceToggle(preloadedSettings) {
+    try {
+        // 获取用户设置
+        let settings = preloadedSettings;
+        if (!settings) {
+            const response = await fetch('/api/user/settings');
+            settings = response.ok ? await response.json() : null;
+        }
+        
+        if (settings) {
+            const hidePrices = settings.hide_prices;
+            updatePriceVisibility(hidePrices);
+        }
+    } catch (error) {
+        console.error('Failed to load user settings:', error);
+    }
+    
+    // 绑定切换按钮事件
+    const toggleBtn = document.getElementById('togglePriceBtn');
+    if (toggleBtn) {
+        toggleBtn.addEventListener('click', togglePriceVisibility);
+    }
+}
+
+// 切换价格显示/隐藏
+async function togglePriceVisibility() {
+    const priceElements = document.querySelectorAll('.price-value');
+    const isCurrentlyHidden = priceElements[0].querySelector('.price-visible').style.display === 'none';
+    const newHideState = !isCurrentlyHidden;
+    
+    try {
+        // 更新服务器设置
+        const response = await fetch('/api/user/settings', {
+            method: 'PUT',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                hide_prices: newHideState
+            })
+        });
+        
+        if (response.ok) {
+            updatePriceVisibility(newHideState);
+        } else {
+            console.error('Failed to update price visibility setting');
+        }
+    } catch (error) {
+        console.error('Error updating price visibility:', error);
+    }
+}
+
+// 更新价格显示状态
+function updatePriceVisibility(hidePrices) {
+    const priceElements = document.querySelectorAll('.price-value');
+    const toggleBtn = document.getElementById('togglePriceBtn');
+    const toggleIcon = document.getElementById('togglePriceIcon');
+    const toggleText = document.getElementById('togglePriceText');
+    
+    priceElements.forEach(element => {
+        const visibleSpan = element.querySelector('.price-visible');
+        const hiddenSpan = element.querySelector('.price-hidden');
+        
+        if (hidePrices) {
+            visibleSpan.style.display = 'none';
+            hiddenSpan.style.display = 'inline';
+        } else {
+            visibleSpan.style.display = 'inline';
+            hiddenSpan.style.display = 'none';
+        }
+    });
+    
+    // 更新按钮状态
+    if (toggleBtn) {
+        if (hidePrices) {
+            toggleIcon.className = 'fas fa-eye-slash';
+            toggleText.textContent = '显示价格';
+            toggleBtn.classList.remove('btn-outline-light');
+            toggleBtn.classList.add('btn-warning');
+        } else {
+            toggleIcon.className = 'fas fa-eye';
+            toggleText.textContent = '隐藏价格';
+            toggleBtn.classList.remove('btn-warning');
+            toggleBtn.classList.add('btn-outline-light');
+        }
+    }
+}
+
+// 更新价格显示（用于统计卡片更新时）
+function updatePriceDisplay(selector, value) {
+    const element = document.querySelector(selector);
+    if (element) {
+        const visibleSpan = element.querySelector('.price-visible');
+        if (visibleSpan) {
+            visibleSpan.textContent = '¥' + value.toFixed(2);
+        }
+    }
+}
+
+// 更新所有统计卡片
+async function updateStatsCards() {
+    try {
+        const response = await fetch('/api/user/stats');
+        const stats = await response.json();
+        
+        if (response.ok) {
+            // 更新各个统计卡片
+            updatePriceDisplay('#total-price', stats.total_price);
+            updatePriceDisplay('#incomplete-price', stats.incomplete_price);
+            updatePriceDisplay('#components-price', stats.components_total_price);
+            
+            // 更新项目数量
+            const totalProjectsElement = document.querySelector('#total-projects');
+            if (totalProjectsElement) {
+                totalProjectsElement.textContent = stats.total_projects;
+            }
+            
+            const incompleteProjectsElement = document.querySelector('#incomplete-projects');
+            if (incompleteProjectsElement) {
+                incompleteProjectsElement.textContent = stats.incomplete_projects;
+            }
+        }
+    } catch (error) {
+        console.error('更新统计卡片失败:', error);
+    }
+}
+
+// 退出协作函数
+function leaveCollaboration(projectId) {
+    fetch(`/api/project/${projectId}/collaboration/leave`, {
+        method: 'DELETE'
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.error) {
+            throw new Error(data.error);
+        }
+
+        // 从表格中移除该行
+        const tbody = document.querySelector('.table tbody');
+        const row = Array.from(tbody.children).find(row => {
+            const leaveButton = row.querySelector('.dropdown-item.leave-collaboration');
+            return leaveButton && leaveButton.getAttribute('onclick').includes(projectId);
+        });
+
+        if (row) {
+            row.remove();
+            
+            // 更新剩余行的序号
+            const projectRows = Array.from(tbody.children).filter(row => !row.classList.contains('no-results-row'));
+            projectRows.forEach((row, index) => {
+                const indexCell = row.querySelector('.col-index');
+                if (indexCell) {
+                    indexCell.textContent = index + 1;
+                }
+            });
+
+            // 更新搜索功能的行引用
+            if (window.updateProjectSearchRows) {
+                window.updateProjectSearchRows();
+            }
+        }
+
+        // 更新统计卡片
+        updateStatsCards();
+        
+        // 更新元器件总价格
+        if (typeof updateComponentsPrice === 'function') {
+            updateComponentsPrice();
+        }
+        
+        // 显示成功消息
+        showToast('退出成功', '您已成功退出项目协作');
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        showToast('退出失败', error.message || '无法退出项目协作，请重试', 'error');
+    });
+}
+
+// 防重复提交机制
+(function() {
+    let isSubmitting = false;
+    
+    // 重写submitProject按钮的点击处理
+    document.addEventListener('DOMContentLoaded', function() {
+        const submitBtn = document.getElementById('submitProject');
+        if (submitBtn) {
+            // 移除所有现有的事件监听器
+            const newSubmitBtn = submitBtn.cloneNode(true);
+            submitBtn.parentNode.replaceChild(newSubmitBtn, submitBtn);
+            
+            // 添加单一的事件监听器
+            newSubmitBtn.addEventListener('click', function() {
+                // 防止重复提交
+                if (isSubmitting) {
+                    console.log('Preventing duplicate submission');
+                    return;
+                }
+                
+                const form = document.getElementById('addProjectForm');
+                if (!form.checkValidity()) {
+                    form.classList.add('was-validated');
+                    return;
+                }
+                
+                // 设置提交状态
+                isSubmitting = true;
+                newSubmitBtn.disabled = true;
+                const originalText = newSubmitBtn.textContent;
+                newSubmitBtn.textContent = '提交中...';
+                
+                // 执行提交逻辑
+                submitProject(form, newSubmitBtn, originalText);
+            });
+        }
+    });
+    
+    // 提取的提交逻辑
+    function submitProject(form, submitBtn, originalText) {
+        // 收集表单数据
+        const formData = new FormData(form);
+        
+        // 获取来源和类型的名称
+        const sourceSelect = form.querySelector('[name="source"]');
+        const typeSelect = form.querySelector('[name="board_type"]');
+        const sourceName = sourceSelect.options[sourceSelect.selectedIndex].text;
+        const typeName = typeSelect.options[typeSelect.selectedIndex].text;
+        
+        // 获取选中的元器件（包括不在当前搜索结果中的）
+        const selectedComponents = addComponentPicker.getSelected();
+
+        // 处理要求文本
+        const requirementsText = formData.get('requirements');
+        const requirements = [];
+        if (requirementsText) {
+            const requirementMatches = requirementsText.match(/##(.+?)##([^#]+)/g);
+            if (requirementMatches) {
+                requirementMatches.forEach((match, index) => {
+                    const titleMatch = match.match(/##(.+?)##/);
+                    const title = titleMatch ? titleMatch[1].trim() : '';
+                    const content = match.replace(/##.+?##/, '').trim();
+                    if (title && content) {
+                        requirements.push({
+                            title: title,
+                            content: content,
+                            color: getRequirementColor(index)
+                        });
+                    }
+                });
+            }
+        }
+
+        // 构建项目数据
+        const projectData = {
+            source: sourceName,
+            source_id: formData.get('source'),
+            name: formData.get('name'),
+            price: parseFloat(formData.get('price')),
+            board_type: typeName,
+            board_type_id: formData.get('board_type'),
+            status: formData.get('status'),
+            remark: formData.get('remark') || '',
+            components: selectedComponents,
+            requirements: requirements
+        };
+
+        // 发送到服务器
+        fetch('/api/jobs', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(projectData)
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.error) {
+                throw new Error(data.error);
+            }
+            
+            // 添加新行到表格
+            const tbody = document.querySelector('.table tbody');
+            const rowCount = tbody.children.length;
+            const newRow = createTableRow(data.project, rowCount + 1);
+            tbody.insertAdjacentHTML('beforeend', newRow);
+
+            // 为新添加的行初始化下拉菜单定位
+            const lastRow = tbody.lastElementChild;
+            if (typeof initializeDropdownPosition === 'function') {
+                initializeDropdownPosition(lastRow.querySelector('.dropdown'));
+            }
+
+            // 更新搜索功能的行引用
+            if (window.updateProjectSearchRows) {
+                window.updateProjectSearchRows();
+            }
+
+            // 更新统计卡片
+            if (typeof updateStatsCards === 'function') {
+                updateStatsCards();
+            }
+            
+            // 更新元器件总价格
+            if (typeof updateComponentsPrice === 'function') {
+                updateComponentsPrice();
+            }
+            
+            // 关闭模态框并重置表单
+            const modal = bootstrap.Modal.getInstance(document.getElementById('addProjectModal'));
+            modal.hide();
+            form.reset();
+            form.classList.remove('was-validated');
+            
+            // 手动重置元器件选择状态
+            if (typeof resetComponentsSelection === 'function') {
+                resetComponentsSelection();
+            }
+            
+            // 显示成功消息
+            if (typeof showToast === 'function') {
+                showToast('创建成功', '新项目已成功添加到列表中');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            if (typeof showToast === 'function') {
+                showToast('创建失败', error.message || '无法创建新项目，请重试');
+            }
+        })
+        .finally(() => {
+            // 恢复按钮状态
+            isSubmitting = false;
+            submitBtn.disabled = false;
+            submitBtn.textContent = originalText;
+        });
+    }
+})();
+
+        // 刷新单个项目行的显示
+        function refreshProjectRow(projectId) {
+            fetch(`/api/jobs/${projectId}`)
+                .then(response => response.json())
+                .then(data => {
+                    if (data.error) {
+                        console.error('获取项目信息失败:', data.error);
+                        return;
+                    }
+                    
+                    // 查找对应的表格行
+                    const tbody = document.querySelector('.table tbody');
+                    const existingRow = Array.from(tbody.children).find(row => {
+                        const buttons = row.querySelectorAll('.dropdown-item');
+                        return Array.from(buttons).some(button => {
+                            const onclick = button.getAttribute('onclick');
+                            return onclick && onclick.includes(projectId);
+                        });
+                    });
+
+                    if (existingRow) {
+                        const rowIndex = Array.from(tbody.children).indexOf(existingRow) + 1;
+                        const newRowHtml = createTableRow(data.project, rowIndex);
+                        
+                        // 使用临时容器来创建DOM元素
+                        const temp = document.createElement('tbody');
+                        temp.innerHTML = newRowHtml;
+                        const newRow = temp.firstElementChild;
+                        
+                        // 替换旧行
+                        existingRow.replaceWith(newRow);
+                        
+                        // 为新行初始化下拉菜单
+                        const dropdown = newRow.querySelector('.dropdown');
+                        if (dropdown) {
+                            initializeDropdownPosition(dropdown);
+                        }
+
+                        // 更新搜索功能的行引用
+                        if (window.updateProjectSearchRows) {
+                            window.updateProjectSearchRows();
+                        }
+                        
+                        // 更新统计卡片
+                        updateStatsCards();
+                        
+                        // 更新元器件总价格
+                        if (typeof updateComponentsPrice === 'function') {
+                            updateComponentsPrice();
+                        }
+                    }
+                })
+                .catch(error => {
+                    console.error('刷新项目行失败:', error);
+                });
+}
@@ -0,0 +1,2693 @@
+   // Session过期检查
+   function checkSessionExpiry() {
+       fetch('/api/session/status')
+           .then(response => {
+               if (response.status === 401) {
+                   // Session已过期，显示提示并跳转到登录页面
+                   alert('登录已过期，请重新登录');
+                   window.location.href = '/';
+                   return;
+               }
+               return response.json();
+           })
+           .then(data => {
+               if (data && data.remaining_time_seconds <= 60) {
+                   // 剩余时间少于1分钟时提醒用户
+                   const minutes = Math.floor(data.remaining_time_seconds / 60);
+                   const seconds = data.remaining_time_seconds % 60;
+                   console.log(`Session将在${minutes}分${seconds}秒后过期`);
+
+                   if (data.remaining_time_seconds <= 30) {
+                       // 剩余30秒时显示警告
+                       if (confirm('您的登录即将过期，是否要延长会话时间？')) {
+                           // 发送一个请求来刷新session（通过访问任意需要认证的API）
+                           fetch('/api/user/stats')
+                               .then(response => response.json())
+                               .then(() => {
+                                   console.log('Session已刷新');
+                               })
+                               .catch(error => {
+                                   console.error('刷新session失败:', error);
+                               });
+                       }
+                   }
+               }
+           })
+           .catch(error => {
+               console.error('检查session状态失败:', error);
+           });
+   }
+
+   // 页面加载时检查一次session状态，之后的过期提醒由实时事件推送
+   document.addEventListener('DOMContentLoaded', function() {
+       checkSessionExpiry();
+   });
+
+   // 在所有AJAX请求中添加全局错误处理
+   const originalFetch = window.fetch;
+   window.fetch = function(...args) {
+       return originalFetch.apply(this, args)
+           .then(response => {
+               if (response.status === 401) {
+                   // 如果返回401，可能是session过期
+                   alert('登录已过期，请重新登录');
+                   window.location.href = '/';
+                   return Promise.reject('Session expired');
+               }
+               return response;
+           })
+           .catch(error => {
+               throw error;
+           });
+   };
+
+   // 模态框动画增强功能
+   function enhanceModalAnimations() {
+       // 为所有模态框添加动画增强
+       document.querySelectorAll('.modal').forEach(modal => {
+           // 监听模态框显示事件
+           modal.addEventListener('show.bs.modal', function() {
+               // 为模态框内容添加渐进显示效果
+               const header = this.querySelector('.modal-header');
+               const body = this.querySelector('.modal-body');
+               const footer = this.querySelector('.modal-footer');
+
+               // 重置动画状态
+               [header, body, footer].forEach(element => {
+                   if (element) {
+                       element.style.opacity = '0';
+                       element.style.transform = 'translateY(20px)';
+                   }
+               });
+           });
+
+           // 监听模态框显示完成事件
+           modal.addEventListener('shown.bs.modal', function() {
+               // 逐步显示模态框内容
+               const header = this.querySelector('.modal-header');
+               const body = this.querySelector('.modal-body');
+               const footer = this.querySelector('.modal-footer');
+
+               const animateElement = (element, delay = 0) => {
+                   if (element) {
+                       setTimeout(() => {
+                           element.style.transition = 'all 0.4s cubic-bezier(0.34, 1.56, 0.64, 1)';
+                           element.style.opacity = '1';
+                           element.style.transform = 'translateY(0)';
+                       }, delay);
+                   }
+               };
+
+               animateElement(header, 100);
+               animateElement(body, 200);
+               animateElement(footer, 300);
+           });
+
+           // 监听模态框隐藏事件
+           modal.addEventListener('hide.bs.modal', function() {
+               // 添加关闭动画
+               const dialog = this.querySelector('.modal-dialog');
+               if (dialog) {
+                   dialog.style.transition = 'all 0.3s ease-out';
+                   dialog.style.transform = 'scale(0.9)';
+                   dialog.style.opacity = '0.5';
+               }
+           });
+       });
+   }
+
+   // 特殊动画函数
+   function showModalWithSpecialEffect(modalId, effect = '') {
+       const modal = document.getElementById(modalId);
+       if (modal) {
+           // 添加特殊效果类
+           if (effect) {
+               modal.classList.add(effect);
+           }
+
+           // 显示模态框
+           const bsModal = new bootstrap.Modal(modal);
+           bsModal.show();
+
+           // 移除特殊效果类（避免影响下次显示）
+           modal.addEventListener('hidden.bs.modal', function() {
+               if (effect) {
+                   this.classList.remove(effect);
+               }
+           }, { once: true });
+       }
+   }
+
+   // 增强的成功提示动画
+   function showSuccessModal(title, message) {
+       // 创建成功提示模态框
+       const successModal = document.createElement('div');
+       successModal.className = 'modal fade';
+       successModal.innerHTML = `
+           <div class="modal-dialog modal-dialog-centered">
+               <div class="modal-content border-0 shadow-lg" style="background: linear-gradient(135deg, #28a745 0%, #20c997 100%);">
+                   <div class="modal-body text-center p-4">
+                       <div class="mb-3">
+                           <i class="fas fa-check-circle" style="font-size: 4rem; color: white; animation: successPulse 2s infinite;"></i>
+                       </div>
+                       <h4 class="text-white mb-2">${title}</h4>
+                       <p class="text-white mb-0">${message}</p>
+                   </div>
+               </div>
+           </div>
+       `;
+
+       document.body.appendChild(successModal);
+
+       // 添加特殊动画
+       const modal = new bootstrap.Modal(successModal);
+       modal.show();
+
+       // 自动关闭
+       setTimeout(() => {
+           modal.hide();
+           setTimeout(() => {
+               document.body.removeChild(successModal);
+           }, 300);
+       }, 2000);
+   }
+
+   // 为删除确认添加特殊效果
+   function showDeleteConfirmation(projectId) {
+       // 设置要删除的项目ID
+       document.getElementById('deleteProjectId').value = projectId;
+
+       // 添加震动效果
+       showModalWithSpecialEffect('deleteConfirmModal', 'modal-shake-intense');
+   }
+
+   function viewDetails(jobId) {
+       // TODO: 实现查看详情功能
+       alert('查看详情功能开发中...');
+   }
+
+   function deleteProject(jobId) {
+       if (confirm('确定要删除这个项目吗？')) {
+           fetch(`/api/jobs/${jobId}`, {
+               method: 'DELETE'
+           })
+           .then(response => response.json())
+           .then(data => {
+               if (data.error) {
+                   alert('删除失败：' + data.error);
+               } else {
+                   alert('项目删除成功！');
+                   location.reload();
+               }
+           })
+           .catch(error => {
+               console.error('Error:', error);
+               alert('删除失败，请重试');
+           });
+       }
+   }
+
+   // 查看元件详情
+   function viewComponents(jobId) {
+       fetch(`/api/job/components/${jobId}`)
+           .then(response => response.json())
+           .then(data => {
+               const tbody = document.getElementById('componentsTableBody');
+               tbody.innerHTML = '';
+
+               data.components.forEach((component, index) => {
+                   const itemTotal = component.price * component.quantity;
+
+                   const row = `
+                       <tr>
+                           <td>${index + 1}</td>
+                           <td>${component.name}</td>
+                           <td>${component.model}</td>
+                           <td>¥${component.price.toFixed(2)}</td>
+                           <td>${component.quantity}</td>
+                           <td>¥${itemTotal.toFixed(2)}</td>
+                       </tr>
+                   `;
+                   tbody.innerHTML += row;
+               });
+
+               // 更新总价显示（服务端保存的项目元器件总价）
+               document.getElementById('totalComponentsPrice').textContent = '¥' + data.price.toFixed(2);
+
+               new bootstrap.Modal(document.getElementById('componentsModal')).show();
+           })
+           .catch(error => {
+               console.error('Error:', error);
+               alert('获取元件信息失败');
+           });
+   }
+
+   // 查看要求详情
+   function viewRequirements(jobId) {
+       fetch(`/api/job/requirements/${jobId}`)
+           .then(response => response.json())
+           .then(data => {
+               const list = document.getElementById('requirementsList');
+               list.innerHTML = '';
+
+               data.forEach((requirement, index) => {
+                   const item = `
+                       <div class="list-group-item">
+                           <h6 class="mb-1" style="color: ${requirement.color}">${requirement.title}</h6>
+                           <p class="mb-0">${requirement.content}</p>
+                       </div>
+                   `;
+                   list.innerHTML += item;
+               });
+
+               new bootstrap.Modal(document.getElementById('requirementsModal')).show();
+           })
+           .catch(error => {
+               console.error('Error:', error);
+               alert('获取要求信息失败');
+           });
+   }
+
+   // 编辑项目
+   function editProject(jobId) {
+       // 获取项目数据
+       fetch(`/api/jobs/${jobId}`)
+           .then(response => response.json())
+           .then(data => {
+               const form = document.getElementById('editProjectForm');
+
+               // 设置项目ID
+               document.getElementById('editProjectId').value = jobId;
+
+               // 先加载来源和类型选项，然后设置表单数据
+               Promise.all([
+                   loadEditSourceOptions(data.source_id || data.source),
+                   loadEditBoardTypes(data.board_type_id || data.board_type)
+               ]).then(() => {
+                   // 填充表单数据
+                   form.querySelector('[name="name"]').value = data.name;
+                   form.querySelector('[name="price"]').value = data.price;
+                   form.querySelector('[name="status"]').value = data.status;
+
+                   // 处理项目要求
+                   let requirementsText = '';
+                   if (data.requirements && Array.isArray(data.requirements)) {
+                       requirementsText = data.requirements.map(req => 
+                           `##${req.title}## ${req.content}`
+                       ).join('\n\n');
+                   }
+                   form.querySelector('[name="requirements"]').value = requirementsText;
+
+                   form.querySelector('[name="remark"]').value = data.remark || '';
+
+                   // 加载并选中项目的元器件
+                   loadEditComponents(data.components || []);
+
+                   // 显示模态框
+                   new bootstrap.Modal(document.getElementById('editProjectModal')).show();
+               });
+           })
+           .catch(error => {
+               console.error('Error:', error);
+               showToast('错误', '加载项目数据失败');
+           });
+   }
+
+   // 加载编辑模态框的来源选项
+   function loadEditSourceOptions(selectedSource) {
+       return fetch('/api/sources')
+           .then(response => response.json())
+           .then(sources => {
+               const sourceSelect = document.querySelector('#editProjectForm select[name="source"]');
+               if (!sourceSelect) {
+                   throw new Error('Source select element not found');
+               }
+
+               // 保存默认选项
+               const defaultOption = sourceSelect.querySelector('option');
+               sourceSelect.innerHTML = '';
+               sourceSelect.appendChild(defaultOption);
+
+               sources.forEach(source => {
+                   const option = document.createElement('option');
+                   option.value = source.id;
+                   option.textContent = source.name;
+                   // 检查是否匹配ID或名称
+                   if (source.id == selectedSource || source.name == selectedSource) {
+                       option.selected = true;
+                   }
+                   sourceSelect.appendChild(option);
+               });
+           });
+   }
+
+   // 加载编辑模态框的类型选项
+   function loadEditBoardTypes(selectedType) {
+       return fetch('/api/board-types')
+           .then(response => response.json())
+           .then(types => {
+               const typeSelect = document.querySelector('#editProjectForm select[name="board_type"]');
+               if (!typeSelect) {
+                   throw new Error('Board type select element not found');
+               }
+
+               // 保存默认选项
+               const defaultOption = typeSelect.querySelector('option');
+               typeSelect.innerHTML = '';
+               typeSelect.appendChild(defaultOption);
+
+               types.forEach(type => {
+                   const option = document.createElement('option');
+                   option.value = type.id;
+                   option.textContent = type.name;
+                   // 检查是否匹配ID或名称
+                   if (type.id == selectedType || type.name == selectedType) {
+                       option.selected = true;
+                   }
+                   typeSelect.appendChild(option);
+               });
+           });
+   }
+
+   // 加载编辑模态框的元器件，项目已选的元器件显示在列表顶部
+   function loadEditComponents(selectedComponents = []) {
+       return editComponentPicker.load(selectedComponents);
+   }
+
+   let currentProjectId = null; // 添加全局变量
+
+   function uploadFiles(jobId) {
+       // 设置当前项目ID
+       currentProjectId = jobId;
+
+       // 显示上传模态框
+       const modal = new bootstrap.Modal(document.getElementById('uploadModal'));
+       modal.show();
+   }
+
+   function downloadFiles(jobId) {
+       // 打开下载模态框
+       const downloadModal = new bootstrap.Modal(document.getElementById('downloadModal'));
+       downloadModal.show();
+
+       // 加载项目文件
+       loadProjectFiles(jobId);
+   }
+
+
+
+   function collaborateProject(jobId) {
+       // 打开项目协作管理模态框
+       currentProjectId = jobId;
+
+       // 获取项目信息并更新模态框标题
+       const projectRow = document.querySelector(`tr[data-project-id="${jobId}"]`);
+       if (projectRow) {
+           const projectName = projectRow.querySelector('[data-field="name"]').textContent;
+           document.getElementById('collaborateProjectName').textContent = projectName;
+       }
+
+       // 加载可用的协作者
+       loadAvailableCollaborators();
+
+       // 加载现有协作者
+       loadProjectCollaborations(jobId);
+
+       // 显示模态框
+       const modal = new bootstrap.Modal(document.getElementById('collaborateModal'));
+       modal.show();
+   }
+
+   // 处理下拉菜单定位
+   document.addEventListener('DOMContentLoaded', function() {
+       const dropdowns = document.querySelectorAll('.dropdown');
+
+       dropdowns.forEach(dropdown => {
+           const button = dropdown.querySelector('.more-btn');
+           const menu = dropdown.querySelector('.dropdown-menu');
+
+           button.addEventListener('click', function(e) {
+               const rect = button.getBoundingClientRect();
+               const spaceBelow = window.innerHeight - rect.bottom;
+
+               // 计算左侧位置，确保右边缘对齐
+               const menuWidth = 110; // 下拉菜单的最小宽度
+               let leftPosition = rect.right - menuWidth - 15; // 15px 是右侧边距
+
+               // 如果下方空间不足，向上展开
+               if (spaceBelow < 200) {
+                   menu.style.bottom = (window.innerHeight - rect.top) + 'px';
+                   menu.style.top = 'auto';
+               } else {
+                   menu.style.top = (rect.bottom + 5) + 'px';
+                   menu.style.bottom = 'auto';
+               }
+
+               menu.style.left = leftPosition + 'px';
+           });
+       });
+   });
+
+   // 表单验证
+   (function () {
+       'use strict'
+       var forms = document.querySelectorAll('.needs-validation')
+       Array.prototype.slice.call(forms).forEach(function (form) {
+           form.addEventListener('submit', function (event) {
+               if (!form.checkValidity()) {
+                   event.preventDefault()
+                   event.stopPropagation()
+               }
+               form.classList.add('was-validated')
+           }, false)
+       })
+   })()
+
+   // 加载来源选项
+   function loadSourceOptions(preloaded) {
+       // 有初始化接口预先返回的数据时直接使用，否则单独请求
+       (preloaded ? Promise.resolve(preloaded) : fetch('/api/sources').then(response => response.json()))
+           .then(sources => {
+               const sourceSelect = document.querySelector('select[name="source"]');
+               if (!sourceSelect) {
+                   console.error('Source select element not found');
+                   return;
+               }
+
+               // 保存默认选项
+               const defaultOption = sourceSelect.querySelector('option');
+               sourceSelect.innerHTML = '';
+               sourceSelect.appendChild(defaultOption);
+
+               sources.forEach(source => {
+                   const option = document.createElement('option');
+                   option.value = source.id;
+                   option.textContent = source.name;
+                   sourceSelect.appendChild(option);
+               });
+
+               console.log('Sources loaded successfully');
+           })
+           .catch(error => {
+               console.error('Error loading sources:', error);
+               showToast('错误', '加载来源选项失败');
+           });
+   }
+
+   // 加载类型选项
+   function loadBoardTypes(preloaded) {
+       // 有初始化接口预先返回的数据时直接使用，否则单独请求
+       (preloaded ? Promise.resolve(preloaded) : fetch('/api/board-types').then(response => response.json()))
+           .then(types => {
+               const typeSelect = document.querySelector('select[name="board_type"]');
+               if (!typeSelect) {
+                   console.error('Board type select element not found');
+                   return;
+               }
+
+               // 保存默认选项
+               const defaultOption = typeSelect.querySelector('option');
+               typeSelect.innerHTML = '';
+               typeSelect.appendChild(defaultOption);
+
+               types.forEach(type => {
+                   const option = document.createElement('option');
+                   option.value = type.id;
+                   option.textContent = type.name;
+                   typeSelect.appendChild(option);
+               });
+
+               console.log('Board types loaded successfully');
+           })
+           .catch(error => {
+               console.error('Error loading board types:', error);
+               showToast('错误', '加载电路板类型失败');
+           });
+   }
+
+   // 元器件选择器：按关键词分页搜索元器件目录，已选元器件固定显示在列表顶部，切换关键词时保持选中状态和数量
+   function createComponentPicker(modalSelector, searchInputId, countElementId, idPrefix) {
+       const modal = document.querySelector(modalSelector);
+       const listContainer = modal.querySelector('.components-list');
+       const searchInput = document.getElementById(searchInputId);
+       const selected = new Map();
+       // 本次打开模态框期间见过的元器件，勾选时据此记录名称、型号和价格
+       const knownComponents = new Map();
+       let nextCursor = null;
+       let searchTimer = null;
+       let requestSeq = 0;
+
+       function itemHtml(component, quantity) {
+           const isSelected = quantity !== null;
+           return `
+               <div class="col-md-4">
+                   <div class="component-item">
+                       <div class="form-check component-info">
+                           <input class="form-check-input component-checkbox" type="checkbox" 
+                                  value="${component.id}" id="${idPrefix}${component.id}"
+                                  ${isSelected ? 'checked' : ''}>
+                           <label class="form-check-label" for="${idPrefix}${component.id}">
+                               <div class="component-name">${escapeHtml(component.name)}</div>
+                               <div class="component-model">${escapeHtml(component.model)}</div>
+                           </label>
+                       </div>
+                       <div class="d-flex align-items-center">
+                           <div class="component-price me-2">¥${component.price.toFixed(2)}</div>
+                           <div class="quantity-input" style="display: ${isSelected ? 'block' : 'none'};">
+                               <div class="input-group">
+                                   <input type="number" class="form-control" min="1" value="${isSelected ? quantity : 1}">
+                                   <div class="input-group-buttons">
+                                       <button type="button" class="btn-up" onclick="adjustQuantity(this, 1)">
+                                           <i class="fas fa-caret-up"></i>
+                                       </button>
+                                       <button type="button" class="btn-down" onclick="adjustQuantity(this, -1)">
+                                           <i class="fas fa-caret-down"></i>
+                                       </button>
+                                   </div>
+                               </div>
+                           </div>
+                       </div>
+                   </div>
+               </div>
+           `;
+       }
+
+       // 数量按钮只修改输入框的值，读取选中项前先从页面同步数量
+       function syncQuantities() {
+           listContainer.querySelectorAll('.component-checkbox:checked').forEach(checkbox => {
+               const entry = selected.get(parseInt(checkbox.value));
+               const input = checkbox.closest('.component-item').querySelector('.quantity-input input');
+               if (entry && input) {
+                   entry.quantity = Math.max(1, parseInt(input.value) || 1);
+               }
+           });
+       }
+
+       function updateCount() {
+           const countElement = document.getElementById(countElementId);
+           if (countElement) {
+               countElement.textContent = selected.size;
+           }
+       }
+
+       function renderLoadMore(row) {
+           row.querySelector('.components-load-more')?.closest('.col-12').remove();
+           if (nextCursor) {
+               row.insertAdjacentHTML('beforeend', `
+                   <div class="col-12 text-center">
+                       <button type="button" class="btn btn-sm btn-outline-secondary components-load-more">加载更多</button>
+                   </div>
+               `);
+           }
+       }
+
+       function renderPage(page, append) {
+           let row = listContainer.querySelector('.row');
+           if (!row) {
+               listContainer.innerHTML = '<div class="row g-2"></div>';
+               row = listContainer.querySelector('.row');
+           }
+           nextCursor = page.next_cursor;
+           page.items.forEach(component => knownComponents.set(component.id, component));
+           const items = page.items.filter(component => !selected.has(component.id));
+           if (append) {
+               row.querySelector('.components-load-more')?.closest('.col-12').remove();
+               row.insertAdjacentHTML('beforeend', items.map(component => itemHtml(component, null)).join(''));
+           } else {
+               syncQuantities();
+               const pinned = Array.from(selected.values()).map(entry => itemHtml(entry.component, entry.quantity));
+               row.innerHTML = pinned.join('') + items.map(component => itemHtml(component, null)).join('');
+               if (!pinned.length && !items.length) {
+                   row.innerHTML = '<div class="col-12 text-center py-4"><p class="text-muted">未找到匹配的元器件</p></div>';
+               }
+           }
+           renderLoadMore(row);
+           updateCount();
+       }
+
+       function fetchPage(append) {
+           const seq = ++requestSeq;
+           const params = new URLSearchParams({ q: searchInput ? searchInput.value.trim() : '' });
+           if (append && nextCursor) {
+               params.set('cursor', nextCursor);
+           }
+           return fetch(`/api/components/search?${params}`)
+               .then(response => {
+                   if (!response.ok) {
+                       throw new Error(`HTTP ${response.status}`);
+                   }
+                   return response.json();
+               })
+               .then(page => {
+                   // 只渲染最近一次请求的结果，避免较慢的旧请求覆盖新关键词的结果
+                   if (seq === requestSeq) {
+                       renderPage(page, append);
+                   }
+               })
+               .catch(error => {
+                   console.error('Error loading components:', error);
+                   showToast('错误', '加载元器件列表失败');
+               });
+       }
+
+       listContainer.addEventListener('change', function(e) {
+           if (e.target.matches('.component-checkbox')) {
+               const id = parseInt(e.target.value);
+               const quantityDiv = e.target.closest('.component-item').querySelector('.quantity-input');
+               quantityDiv.style.display = e.target.checked ? 'block' : 'none';
+               if (e.target.checked) {
+                   const quantity = parseInt(quantityDiv.querySelector('input').value) || 1;
+                   selected.set(id, { component: knownComponents.get(id), quantity: quantity });
+               } else {
+                   selected.delete(id);
+               }
+               updateCount();
+           } else if (e.target.matches('.quantity-input input')) {
+               syncQuantities();
+           }
+       });
+
+       listContainer.addEventListener('click', function(e) {
+           if (e.target.closest('.components-load-more')) {
+               e.target.closest('.components-load-more').disabled = true;
+               fetchPage(true);
+           }
+       });
+
+       if (searchInput) {
+           searchInput.addEventListener('input', function() {
+               clearTimeout(searchTimer);
+               searchTimer = setTimeout(() => fetchPage(false), 250);
+           });
+           // ESC 清空搜索
+           searchInput.addEventListener('keydown', function(e) {
+               if (e.key === 'Escape' && this.value) {
+                   e.stopPropagation();
+                   this.value = '';
+                   fetchPage(false);
+               }
+           });
+       }
+
+       return {
+           // 载入第一页；selectedComponents 为已选元器件（含数量），preloaded 为初始化接口返回的第一页
+           load(selectedComponents = [], preloaded) {
+               clearTimeout(searchTimer);
+               // 清空上次渲染的列表，避免把旧的数量同步到新的选择中
+               listContainer.innerHTML = '<div class="row g-2"></div>';
+               selected.clear();
+               knownComponents.clear();
+               selectedComponents.forEach(component => {
+                   knownComponents.set(component.id, component);
+                   selected.set(component.id, { component: component, quantity: component.quantity || 1 });
+               });
+               if (searchInput) {
+                   searchInput.value = '';
+               }
+               if (preloaded) {
+                   requestSeq++;
+                   renderPage(preloaded, false);
+                   return Promise.resolve();
+               }
+               return fetchPage(false);
+           },
+           reset() {
+               return this.load();
+           },
+           getSelected() {
+               syncQuantities();
+               return Array.from(selected.values()).map(entry => ({
+                   id: entry.component.id,
+                   name: entry.component.name,
+                   model: entry.component.model,
+                   price: entry.component.price,
+                   quantity: entry.quantity
+               }));
+           }
+       };
+   }
+
+   const addComponentPicker = createComponentPicker('#addProjectModal', 'componentSearch', 'selectedComponentCount', 'component');
+   const editComponentPicker = createComponentPicker('#editProjectModal', 'editComponentSearch', 'editSelectedComponentCount', 'editComponent');
+
+   // 加载元器件列表（新建项目模态框），preloaded 为初始化接口返回的第一页
+   function loadComponents(preloaded) {
+       return addComponentPicker.load([], preloaded);
+   }
+
+   // 重置元器件选择状态
+   function resetComponentsSelection() {
+       addComponentPicker.reset();
+   }
+
+   // 调整数量的函数
+   function adjustQuantity(button, delta) {
+       const input = button.closest('.input-group').querySelector('input');
+       let value = parseInt(input.value) || 1;
+       value = Math.max(1, value + delta); // 确保最小值为1
+       input.value = value;
+
+       // 阻止事件冒泡，防止触发父元素的点击事件
+       event.stopPropagation();
+   }
+
+   // 为所有数量输入框添加输入验证
+   document.addEventListener('DOMContentLoaded', function() {
+       document.addEventListener('input', function(e) {
+           if (e.target.matches('.quantity-input input[type="number"]')) {
+               let value = parseInt(e.target.value) || 1;
+               value = Math.max(1, value); // 确保最小值为1
+               e.target.value = value;
+           }
+       });
+   });
+
+
+   // 修改提交表单的代码
+   document.getElementById('submitProject').addEventListener('click', function() {
+       const form = document.getElementById('addProjectForm');
+       if (!form.checkValidity()) {
+           form.classList.add('was-validated');
+           return;
+       }
+
+       // 收集表单数据
+       const formData = new FormData(form);
+
+       // 获取来源和类型的名称
+       const sourceSelect = form.querySelector('[name="source"]');
+       const typeSelect = form.querySelector('[name="board_type"]');
+       const sourceName = sourceSelect.options[sourceSelect.selectedIndex].text;
+       const typeName = typeSelect.options[typeSelect.selectedIndex].text;
+
+       // 获取选中的元器件（包括不在当前搜索结果中的）
+       const selectedComponents = addComponentPicker.getSelected();
+
+       // 处理要求文本
+       const requirementsText = formData.get('requirements');
+       const requirements = [];
+       if (requirementsText) {
+           const requirementMatches = requirementsText.match(/##(.+?)##([^#]+)/g);
+           if (requirementMatches) {
+               requirementMatches.forEach((match, index) => {
+                   const titleMatch = match.match(/##(.+?)##/);
+                   const title = titleMatch ? titleMatch[1].trim() : '';
+                   const content = match.replace(/##.+?##/, '').trim();
+                   if (title && content) {
+                       requirements.push({
+                           title: title,
+                           content: content,
+                           color: getRequirementColor(index)
+                       });
+                   }
+               });
+           }
+       }
+
+       // 构建项目数据
+       const projectData = {
+           source: sourceName, // 使用名称而不是ID
+           source_id: formData.get('source'), // 保留ID以供后端使用
+           name: formData.get('name'),
+           price: parseFloat(formData.get('price')),
+           board_type: typeName, // 使用名称而不是ID
+           board_type_id: formData.get('board_type'), // 保留ID以供后端使用
+           status: formData.get('status'), // 使用表单中选择的状态
+           remark: formData.get('remark') || '',
+           components: selectedComponents,
+           requirements: requirements
+       };
+
+       // 发送到服务器
+       fetch('/api/jobs', {
+           method: 'POST',
+           headers: {
+               'Content-Type': 'application/json',
+           },
+           body: JSON.stringify(projectData)
+       })
+       .then(response => response.json())
+       .then(data => {
+           if (data.error) {
+               throw new Error(data.error);
+           }
+
+           // 添加新行到表格
+           const tbody = document.querySelector('.table tbody');
+           const rowCount = tbody.children.length;
+           const newRow = createTableRow(data.project, rowCount + 1);
+           tbody.insertAdjacentHTML('beforeend', newRow);
+
+           // 为新添加的行初始化下拉菜单定位
+           const lastRow = tbody.lastElementChild;
+           initializeDropdownPosition(lastRow.querySelector('.dropdown'));
+
+           // 更新搜索功能的行引用
+           if (window.updateProjectSearchRows) {
+               window.updateProjectSearchRows();
+           }
+
+           // 更新统计卡片
+           updateStatsCards();
+
+           // 更新元器件总价格
+           if (typeof updateComponentsPrice === 'function') {
+               updateComponentsPrice();
+           }
+
+           // 关闭模态框并重置表单
+           const modal = bootstrap.Modal.getInstance(document.getElementById('addProjectModal'));
+           modal.hide();
+           form.reset();
+           form.classList.remove('was-validated');
+
+           // 手动重置元器件选择状态
+           resetComponentsSelection();
+
+           // 显示成功消息
+           showToast('创建成功', '新项目已成功添加到列表中');
+       })
+       .catch(error => {
+           console.error('Error:', error);
+           showToast('创建失败', error.message || '无法创建新项目，请重试');
+       });
+   });
+
+   // 创建表格行 HTML
+   function createTableRow(project, index) {
+       // 构建协作标识HTML
+       let collaborationBadge = '';
+       if (project.user_role && project.user_role !== 'owner') {
+           collaborationBadge = `
+               <div class="collaboration-badge">
+                   <i class="fas fa-users"></i>
+                   <span>协作项目 - 所有者: ${project.owner_username || '未知'}</span>
+               </div>
+           `;
+       }
+
+       // 根据用户角色决定显示哪些操作
+       let actionItems = '';
+
+       // 只有项目所有者可以进行的操作
+       if (!project.user_role || project.user_role === 'owner') {
+           actionItems += `
+               <li><a class="dropdown-item edit" href="#" onclick="editProject('${project.id}')">
+                   <i class="fas fa-edit"></i><span>修改</span>
+               </a></li>
+           `;
+       }
+
+       // 项目所有者和写权限协作者可以上传
+       if (!project.user_role || project.user_role === 'owner' || project.user_role === 'write') {
+           actionItems += `
+               <li><a class="dropdown-item upload" href="#" onclick="uploadFiles('${project.id}')">
+                   <i class="fas fa-upload"></i><span>上传</span>
+               </a></li>
+           `;
+       }
+
+       // 所有用户都可以下载
+       actionItems += `
+           <li><a class="dropdown-item download" href="#" onclick="downloadFiles('${project.id}')">
+               <i class="fas fa-download"></i><span>下载</span>
+           </a></li>
+       `;
+
+       // 只有项目所有者可以进行的操作
+       if (!project.user_role || project.user_role === 'owner') {
+           actionItems += `
+               <li><a class="dropdown-item share" href="#" onclick="shareProject('${project.id}')">
+                   <i class="fas fa-share-alt"></i><span>分享</span>
+               </a></li>
+               <li><a class="dropdown-item collaborate" href="#" onclick="collaborateProject('${project.id}')">
+                   <i class="fas fa-users"></i><span>共享</span>
+               </a></li>
+               <li><a class="dropdown-item delete" href="#" onclick="deleteProject('${project.id}')">
+                   <i class="fas fa-trash-alt"></i><span>删除</span>
+               </a></li>
+           `;
+       } else {
+           // 协作者可以退出协作
+           actionItems += `
+               <li><a class="dropdown-item leave-collaboration" href="#" onclick="leaveCollaboration('${project.id}')">
+                   <i class="fas fa-sign-out-alt"></i><span>退出协作</span>
+               </a></li>
+           `;
+       }
+
+       const row = `
+           <tr data-project-id="${project.id}">
+               <td class="col-index">${index}</td>
+               <td class="col-source">${escapeHtml(project.source)}</td>
+               <td class="col-name">
+                   <div class="d-flex align-items-center justify-content-center">
+                       <span>${escapeHtml(project.name)}</span>
+                       ${project.is_shared_by_me ? `<i class="fas fa-share-alt ms-2 share-icon-owner" title="已共享给其他用户"></i>` : ''}
+                       ${project.is_shared_to_me ? `<i class="fas fa-users ms-2 share-icon-collaborator" title="来自 ${project.owner_username} 的共享项目"></i>` : ''}
+                   </div>
+                   ${collaborationBadge}
+               </td>
+               <td class="col-price">¥${project.price.toFixed(2)}</td>
+               <td class="col-type">${escapeHtml(project.board_type)}</td>
+               <td class="col-status">
+                   <span class="status-badge" data-status="${project.status}" style="${project.status_color ? `background: ${project.status_color};` : ''}">
+                       ${project.status}
+                   </span>
+               </td>
+               <td class="col-remark">
+                   <div class="remark-text text-center" title="${escapeHtml(project.remark)}">
+                       ${escapeHtml(project.remark) || '-'}
+                   </div>
+               </td>
+               <td class="col-components">
+                   <button class="view-btn components" onclick="viewComponents('${project.id}')">
+                       查看元件
+                   </button>
+               </td>
+               <td class="col-requirements">
+                   <button class="view-btn requirements" onclick="viewRequirements('${project.id}')">
+                       查看要求
+                   </button>
+               </td>
+               <td class="col-actions">
+                   <div class="dropdown">
+                       <button class="more-btn" type="button" data-bs-toggle="dropdown" aria-expanded="false">
+                           <i class="fas fa-ellipsis-v"></i>
+                       </button>
+                       <ul class="dropdown-menu">
+                           ${actionItems}
+                       </ul>
+                   </div>
+               </td>
+           </tr>
+       `;
+
+       return row;
+   }
+
+   // 初始化下拉菜单定位函数
+   function initializeDropdownPosition(dropdown) {
+       if (!dropdown) return;
+
+       const button = dropdown.querySelector('.more-btn');
+       const menu = dropdown.querySelector('.dropdown-menu');
+
+       button.addEventListener('click', function(e) {
+           const rect = button.getBoundingClientRect();
+           const spaceBelow = window.innerHeight - rect.bottom;
+           const menuWidth = 110; // 下拉菜单的最小宽度
+
+           // 计算左侧位置，确保右边缘对齐
+           let leftPosition = rect.right - menuWidth;
+
+           // 如果下方空间不足，向上展开
+           if (spaceBelow < 200) {
+               menu.style.bottom = (window.innerHeight - rect.top) + 'px';
+               menu.style.top = 'auto';
+           } else {
+               menu.style.top = rect.bottom + 'px';
+               menu.style.bottom = 'auto';
+           }
+
+           menu.style.left = leftPosition + 'px';
+           menu.style.position = 'fixed';
+       });
+   }
+
+   // 页面加载时初始化所有下拉菜单
+   document.addEventListener('DOMContentLoaded', function() {
+       document.querySelectorAll('.dropdown').forEach(dropdown => {
+           initializeDropdownPosition(dropdown);
+       });
+   });
+
+   // 更新统计卡片
+   function updateStatsCards() {
+       const tbody = document.querySelector('.table tbody');
+       const rows = tbody.getElementsByTagName('tr');
+
+       // 过滤掉no-results-row等非项目行
+       const projectRows = Array.from(rows).filter(row => !row.classList.contains('no-results-row'));
+
+       let totalProjects = projectRows.length;
+       let incompleteProjects = 0;
+       let totalPrice = 0;
+       let incompletePrice = 0;
+
+       projectRows.forEach(row => {
+           const statusBadge = row.querySelector('.status-badge');
+           const priceCell = row.querySelector('.col-price');
+
+           if (statusBadge && priceCell) {
+               const status = statusBadge.dataset.status || statusBadge.textContent.trim();
+               const priceText = priceCell.textContent;
+               const price = parseFloat(priceText.replace('¥', '')) || 0;
+
+               totalPrice += price;
+
+               if (status !== '已完成') {
+                   incompleteProjects++;
+                   incompletePrice += price;
+               }
+           }
+       });
+
+       // 更新项目数量统计（直接更新文本内容）
+       const totalProjectsElement = document.querySelector('#total-projects');
+       if (totalProjectsElement) {
+           totalProjectsElement.textContent = totalProjects;
+       }
+
+       const incompleteProjectsElement = document.querySelector('#incomplete-projects');
+       if (incompleteProjectsElement) {
+           incompleteProjectsElement.textContent = incompleteProjects;
+       }
+
+       // 更新价格统计（更新price-visible span中的内容）
+       const totalPriceElement = document.querySelector('#total-price .price-visible');
+       if (totalPriceElement) {
+           totalPriceElement.textContent = '¥' + totalPrice.toFixed(2);
+       }
+
+       const incompletePriceElement = document.querySelector('#incomplete-price .price-visible');
+       if (incompletePriceElement) {
+           incompletePriceElement.textContent = '¥' + incompletePrice.toFixed(2);
+       }
+
+       // 同时更新元器件总价格
+       if (typeof updateComponentsPrice === 'function') {
+           updateComponentsPrice();
+       }
+   }
+
+   // 获取要求颜色
+   function getRequirementColor(index) {
+       const colors = ['#2196F3', '#4CAF50', '#FF9800', '#E91E63', '#9C27B0'];
+       return colors[index % colors.length];
+   }
+
+   // HTML 转义函数
+   function escapeHtml(unsafe) {
+       if (!unsafe) return '';
+       return unsafe
+           .replace(/&/g, "&amp;")
+           .replace(/</g, "&lt;")
+           .replace(/>/g, "&gt;")
+           .replace(/"/g, "&quot;")
+           .replace(/'/g, "&#039;");
+   }
+
+   // 添加提示消息组件
+   function showToast(title, message, type = 'success') {
+       // 移除现有的 toast-container（如果存在）
+       const existingContainer = document.querySelector('.toast-container');
+       if (existingContainer) {
+           existingContainer.remove();
+       }
+
+       // 根据类型设置颜色
+       let bgColor = '#28a745'; // 成功绿色
+       let textColor = '#fff';
+       let icon = 'fas fa-check-circle';
+
+       switch(type) {
+           case 'success':
+               bgColor = '#28a745';
+               icon = 'fas fa-check-circle';
+               break;
+           case 'error':
+           case 'danger':
+               bgColor = '#dc3545';
+               icon = 'fas fa-exclamation-circle';
+               break;
+           case 'warning':
+               bgColor = '#ffc107';
+               textColor = '#000';
+               icon = 'fas fa-exclamation-triangle';
+               break;
+           case 'info':
+               bgColor = '#17a2b8';
+               icon = 'fas fa-info-circle';
+               break;
+       }
+
+       const toastHTML = `
+           <div class="toast-container position-fixed top-0 end-0 p-3" style="z-index: 9999;">
+               <div class="toast show" role="alert" aria-live="assertive" aria-atomic="true" 
+                    style="background-color: ${bgColor}; color: ${textColor}; border: none;">
+                   <div class="toast-header" style="background-color: ${bgColor}; color: ${textColor}; border: none;">
+                       <i class="${icon} me-2"></i>
+                       <strong class="me-auto">${title}</strong>
+                       <button type="button" class="btn-close" data-bs-dismiss="toast" aria-label="Close" 
+                               style="filter: ${textColor === '#fff' ? 'invert(1)' : 'none'};"></button>
+                   </div>
+                   <div class="toast-body">
+                       ${message}
+                   </div>
+               </div>
+           </div>
+       `;
+
+       document.body.insertAdjacentHTML('beforeend', toastHTML);
+
+       // 自动隐藏
+       const delay = type === 'error' || type === 'danger' ? 5000 : 3000;
+       setTimeout(() => {
+           const container = document.querySelector('.toast-container');
+           if (container) {
+               container.remove();
+           }
+       }, delay);
+   }
+
+   // 当模态框显示时加载所有选项
+   document.getElementById('addProjectModal').addEventListener('show.bs.modal', function () {
+       console.log('Modal is opening, loading data...');
+       loadSourceOptions();
+       loadBoardTypes();
+       // 重新载入元器件第一页，同时清空上次的选择
+       loadComponents();
+       loadStatusOptions();
+   });
+
+   // 当模态框隐藏时重置表单（元器件选择在下次打开时重置）
+   document.getElementById('addProjectModal').addEventListener('hidden.bs.modal', function () {
+       const form = document.getElementById('addProjectForm');
+       if (form) {
+           form.reset();
+           form.classList.remove('was-validated');
+       }
+   });
+
+   // 项目搜索功能
+   function initProjectSearch() {
+       const searchInput = document.getElementById('projectSearchInput');
+       const tableBody = document.querySelector('.table tbody');
+       let originalRows = Array.from(tableBody.querySelectorAll('tr'));
+       let noResultsRow = null;
+       // 服务端全文搜索命中的项目ID（覆盖需求和元器件等表格中不显示的内容）
+       let serverMatchIds = new Set();
+       let serverSearchTimer = null;
+       let serverSearchSeq = 0;
+
+       function showNoResults() {
+           if (!noResultsRow) {
+               noResultsRow = document.createElement('tr');
+               noResultsRow.className = 'no-results-row';
+               noResultsRow.innerHTML = `
+                   <td colspan="10" class="no-results">
+                       <i class="fas fa-search mb-2"></i><br>
+                       没有找到匹配的项目
+                   </td>
+               `;
+           }
+           tableBody.appendChild(noResultsRow);
+       }
+
+       function hideNoResults() {
+           if (noResultsRow && noResultsRow.parentNode) {
+               noResultsRow.parentNode.removeChild(noResultsRow);
+           }
+       }
+
+       function performSearch(searchText) {
+           const lowerSearchText = searchText.toLowerCase().trim();
+           let visibleCount = 0;
+
+           // 隐藏无结果提示
+           hideNoResults();
+
+           // 如果搜索为空，显示所有项目
+           if (!lowerSearchText) {
+               originalRows.forEach((row, index) => {
+                   row.classList.remove('hidden');
+                   // 更新序号
+                   const indexCell = row.querySelector('.col-index');
+                   if (indexCell) {
+                       indexCell.textContent = index + 1;
+                   }
+               });
+               return;
+           }
+
+           // 执行搜索
+           originalRows.forEach(row => {
+               const nameCell = row.querySelector('.col-name span');
+               const remarkCell = row.querySelector('.col-remark .remark-text');
+               const sourceCell = row.querySelector('.col-source');
+               const typeCell = row.querySelector('.col-type');
+
+               if (!nameCell) return;
+
+               const projectName = nameCell.textContent.toLowerCase();
+               const projectRemark = remarkCell ? remarkCell.textContent.toLowerCase() : '';
+               const projectSource = sourceCell ? sourceCell.textContent.toLowerCase() : '';
+               const projectType = typeCell ? typeCell.textContent.toLowerCase() : '';
+
+               // 检查是否匹配项目名称、备注、来源、类型，或命中服务端全文搜索
+               const isMatch = projectName.includes(lowerSearchText) || 
+                              projectRemark.includes(lowerSearchText) ||
+                              projectSource.includes(lowerSearchText) ||
+                              projectType.includes(lowerSearchText) ||
+                              serverMatchIds.has(row.dataset.projectId);
+
+               if (isMatch) {
+                   row.classList.remove('hidden');
+                   visibleCount++;
+                   // 更新序号
+                   const indexCell = row.querySelector('.col-index');
+                   if (indexCell) {
+                       indexCell.textContent = visibleCount;
+                   }
+               } else {
+                   row.classList.add('hidden');
+               }
+           });
+
+           // 如果没有匹配的结果，显示无结果提示
+           if (visibleCount === 0) {
+               showNoResults();
+           }
+       }
+
+       // 查询服务端全文索引，结果返回后合并到当前筛选
+       function searchOnServer(searchText) {
+           const query = searchText.trim();
+           const seq = ++serverSearchSeq;
+           serverMatchIds = new Set();
+           clearTimeout(serverSearchTimer);
+           if (!query) return;
+
+           serverSearchTimer = setTimeout(async () => {
+               try {
+                   const response = await fetch(`/api/jobs/search?q=${encodeURIComponent(query)}&per_page=100`);
+                   if (!response.ok) return;
+                   const data = await response.json();
+                   if (seq !== serverSearchSeq) return;
+                   serverMatchIds = new Set(data.results.map(item => String(item.id)));
+                   performSearch(searchInput.value);
+               } catch (error) {
+                   console.error('项目搜索失败:', error);
+               }
+           }, 250);
+       }
+
+       // 监听搜索输入
+       searchInput.addEventListener('input', function(e) {
+           searchOnServer(e.target.value);
+           performSearch(e.target.value);
+       });
+
+       // 监听搜索框清空事件
+       searchInput.addEventListener('search', function() {
+           if (this.value === '') {
+               searchOnServer('');
+               performSearch('');
+           }
+       });
+
+       // 保存原始行引用（当有新项目添加时更新）
+       window.updateProjectSearchRows = function() {
+           originalRows = Array.from(tableBody.querySelectorAll('tr:not(.no-results-row)'));
+       };
+   }
+
+   // 初始化加载
+   document.addEventListener('DOMContentLoaded', function() {
+       console.log('Document loaded, initializing...');
+       // 下拉选项、元器件、统计和设置由 loadDashboardBootstrap 一次请求获取
+       initProjectSearch(); // 初始化项目搜索功能
+   });
+
+   // 保存修改
+   document.getElementById('updateProject').addEventListener('click', function() {
+       const form = document.getElementById('editProjectForm');
+       if (!form.checkValidity()) {
+           form.classList.add('was-validated');
+           return;
+       }
+
+       const projectId = document.getElementById('editProjectId').value;
+       const formData = new FormData(form);
+
+       // 获取来源和类型的名称
+       const sourceSelect = form.querySelector('[name="source"]');
+       const typeSelect = form.querySelector('[name="board_type"]');
+       const sourceName = sourceSelect.options[sourceSelect.selectedIndex].text;
+       const typeName = typeSelect.options[typeSelect.selectedIndex].text;
+
+       // 获取选中的元器件
+       const selectedComponents = editComponentPicker.getSelected();
+
+       // 处理要求文本
+       const requirementsText = formData.get('requirements');
+       const requirements = [];
+       if (requirementsText) {
+           const requirementMatches = requirementsText.match(/##(.+?)##([^#]+)/g);
+           if (requirementMatches) {
+               requirementMatches.forEach((match, index) => {
+                   const titleMatch = match.match(/##(.+?)##/);
+                   const title = titleMatch ? titleMatch[1].trim() : '';
+                   const content = match.replace(/##.+?##/, '').trim();
+                   if (title && content) {
+                       requirements.push({
+                           title: title,
+                           content: content,
+                           color: getRequirementColor(index)
+                       });
+                   }
+               });
+           }
+       }
+
+       // 构建项目数据
+       const projectData = {
+           source: sourceName,
+           source_id: formData.get('source'),
+           name: formData.get('name'),
+           price: parseFloat(formData.get('price')),
+           board_type: typeName,
+           board_type_id: formData.get('board_type'),
+           status: formData.get('status'),
+           remark: formData.get('remark') || '',
+           components: selectedComponents,
+           requirements: requirements
+       };
+
+       // 发送到服务器
+       fetch(`/api/jobs/${projectId}`, {
+           method: 'PUT',
+           headers: {
+               'Content-Type': 'application/json',
+           },
+           body: JSON.stringify(projectData)
+       })
+       .then(response => response.json())
+       .then(data => {
+           if (data.error) {
+               throw new Error(data.error);
+           }
+
+           // 更新表格中的行
+           updateTableRow(data.project);
+
+           // 更新统计卡片
+           updateStatsCards();
+
+           // 更新元器件总价格
+           if (typeof updateComponentsPrice === 'function') {
+               updateComponentsPrice();
+           }
+
+           // 关闭模态框
+           const modal = bootstrap.Modal.getInstance(document.getElementById('editProjectModal'));
+           modal.hide();
+
+           // 显示成功消息
+           showToast('修改成功', '项目信息已成功更新');
+       })
+       .catch(error => {
+           console.error('Error:', error);
+           showToast('修改失败', error.message || '无法更新项目信息，请重试');
+       });
+   });
+
+   // 更新表格行
+   function updateTableRow(project) {
+       const tbody = document.querySelector('.table tbody');
+       const existingRow = Array.from(tbody.children).find(row => {
+           const editButton = row.querySelector('.dropdown-item.edit');
+           return editButton && editButton.getAttribute('onclick').includes(project.id);
+       });
+
+       if (existingRow) {
+           const rowIndex = Array.from(tbody.children).indexOf(existingRow) + 1;
+           const newRowHtml = createTableRow(project, rowIndex);
+
+           // 使用临时容器来创建DOM元素
+           const temp = document.createElement('tbody');
+           temp.innerHTML = newRowHtml;
+           const newRow = temp.firstElementChild;
+
+           // 替换旧行
+           existingRow.replaceWith(newRow);
+
+           // 为新行初始化下拉菜单
+           const dropdown = newRow.querySelector('.dropdown');
+           if (dropdown) {
+               initializeDropdownPosition(dropdown);
+           }
+
+           // 更新搜索功能的行引用
+           if (window.updateProjectSearchRows) {
+               window.updateProjectSearchRows();
+           }
+       }
+   }
+
+   // 删除项目函数
+   function deleteProject(jobId) {
+       // 设置要删除的项目ID
+       document.getElementById('deleteProjectId').value = jobId;
+
+       // 显示确认对话框
+       new bootstrap.Modal(document.getElementById('deleteConfirmModal')).show();
+   }
+
+   // 确认删除按钮点击事件
+   document.getElementById('confirmDelete').addEventListener('click', function() {
+       const jobId = document.getElementById('deleteProjectId').value;
+
+       fetch(`/api/jobs/${jobId}`, {
+           method: 'DELETE'
+       })
+       .then(response => response.json())
+       .then(data => {
+           if (data.error) {
+               throw new Error(data.error);
+           }
+
+           // 从表格中移除该行
+           const tbody = document.querySelector('.table tbody');
+           const row = Array.from(tbody.children).find(row => {
+               const deleteButton = row.querySelector('.dropdown-item.delete');
+               return deleteButton && deleteButton.getAttribute('onclick').includes(jobId);
+           });
+
+           if (row) {
+               row.remove();
+
+               // 更新剩余行的序号
+               const projectRows = Array.from(tbody.children).filter(row => !row.classList.contains('no-results-row'));
+               projectRows.forEach((row, index) => {
+                   const indexCell = row.querySelector('.col-index');
+                   if (indexCell) {
+                       indexCell.textContent = index + 1;
+                   }
+               });
+
+               // 更新搜索功能的行引用
+               if (window.updateProjectSearchRows) {
+                   window.updateProjectSearchRows();
+               }
+           }
+
+           // 关闭确认对话框
+           const modal = bootstrap.Modal.getInstance(document.getElementById('deleteConfirmModal'));
+           modal.hide();
+
+           // 更新统计卡片
+           updateStatsCards();
+
+           // 更新元器件总价格
+           if (typeof updateComponentsPrice === 'function') {
+               updateComponentsPrice();
+           }
+
+           // 显示成功消息
+           showToast('删除成功', '项目已从列表中移除');
+       })
+       .catch(error => {
+           console.error('Error:', error);
+           showToast('删除失败', error.message || '无法删除项目，请重试');
+       });
+   });
+
+   // 加载状态选项
+   function loadStatusOptions(preloaded) {
+       // 有初始化接口预先返回的数据时直接使用，否则单独请求
+       (preloaded ? Promise.resolve(preloaded) : fetch('/api/status').then(response => response.json()))
+           .then(statuses => {
+               // 更新状态选择框
+               const statusSelects = document.querySelectorAll('select[name="status"]');
+               statusSelects.forEach(select => {
+                   // 保存默认选项
+                   const defaultOption = select.querySelector('option[value=""]');
+                   select.innerHTML = '';
+                   if (defaultOption) {
+                       select.appendChild(defaultOption);
+                   }
+
+                   // 添加状态选项
+                   statuses.forEach(status => {
+                       const option = document.createElement('option');
+                       option.value = status.value;
+                       option.textContent = status.label;
+                       select.appendChild(option);
+                   });
+               });
+
+               // 动态添加状态样式
+               let styleSheet = document.getElementById('status-styles');
+               if (!styleSheet) {
+                   styleSheet = document.createElement('style');
+                   styleSheet.id = 'status-styles';
+                   document.head.appendChild(styleSheet);
+               }
+
+               // 生成状态样式
+               const statusStyles = statuses.map(status => `
+                   .status-badge[data-status="${status.value}"] {
+                       background: ${status.color || 'var(--gradient-1)'};
+                   }
+               `).join('\n');
+
+               styleSheet.textContent = statusStyles;
+
+               console.log('Status options loaded successfully');
+           })
+           .catch(error => {
+               console.error('Error loading status options:', error);
+               showToast('错误', '加载状态选项失败');
+           });
+   }
+
+   // 文件上传相关代码
+   document.addEventListener('DOMContentLoaded', function() {
+       const fileInput = document.getElementById('fileInput');
+       const fileTree = document.getElementById('fileTree');
+       const startUploadBtn = document.getElementById('startUpload');
+       const uploadProgress = document.querySelector('.upload-progress');
+       const progressBar = document.querySelector('.progress-bar');
+       const progressText = document.querySelector('.progress-text');
+       const currentFileDiv = document.querySelector('.current-file');
+       const currentFileName = document.querySelector('.current-file-name');
+
+       // 文件大小格式化
+       function formatFileSize(bytes) {
+           if (bytes === 0) return '0 B';
+           const k = 1024;
+           const sizes = ['B', 'KB', 'MB', 'GB'];
+           const i = Math.floor(Math.log(bytes) / Math.log(k));
+           return parseFloat((bytes / Math.pow(k, i)).toFixed(2)) + ' ' + sizes[i];
+       }
+
+       // 创建文件树结构
+       function createFileTree(files) {
+           fileTree.innerHTML = '';
+           const root = { children: new Map() };
+
+           // 按路径排序文件
+           const sortedFiles = Array.from(files).sort((a, b) => {
+               const pathA = a.webkitRelativePath || a.name;
+               const pathB = b.webkitRelativePath || b.name;
+               return pathA.localeCompare(pathB);
+           });
+
+           // 构建树形结构
+           sortedFiles.forEach(file => {
+               const path = file.webkitRelativePath || file.name;
+               const parts = path.split('/');
+               let current = root;
+
+               parts.forEach((part, index) => {
+                   if (!current.children.has(part)) {
+                       current.children.set(part, {
+                           name: part,
+                           isFile: index === parts.length - 1,
+                           file: index === parts.length - 1 ? file : null,
+                           children: new Map()
+                       });
+                   }
+                   current = current.children.get(part);
+               });
+           });
+
+           // 递归渲染树
+           function renderTree(node, parentElement) {
+               const sortedChildren = Array.from(node.children.values())
+                   .sort((a, b) => {
+                       // 文件夹优先
+                       if (!a.isFile && b.isFile) return -1;
+                       if (a.isFile && !b.isFile) return 1;
+                       return a.name.localeCompare(b.name);
+                   });
+
+               sortedChildren.forEach(child => {
+                   const itemDiv = document.createElement('div');
+                   itemDiv.className = 'file-item' + (child.isFile ? '' : ' folder');
+
+                   // 创建内容容器
+                   const contentDiv = document.createElement('div');
+                   contentDiv.className = 'file-item-content';
+
+                   // 添加折叠按钮（仅文件夹）
+                   const toggleDiv = document.createElement('div');
+                   toggleDiv.className = 'folder-toggle';
+                   toggleDiv.innerHTML = '<i class="bi bi-chevron-right"></i>';
+                   toggleDiv.style.display = child.isFile ? 'none' : 'flex';
+                   contentDiv.appendChild(toggleDiv);
+
+                   // 添加图标
+                   const icon = document.createElement('i');
+                   icon.className = 'bi ' + (child.isFile ? 'bi-file-earmark' : 'bi-folder');
+                   contentDiv.appendChild(icon);
+
+                   // 添加名称
+                   const nameSpan = document.createElement('span');
+                   nameSpan.className = 'file-name';
+                   nameSpan.textContent = child.name;
+                   contentDiv.appendChild(nameSpan);
+
+                   // 如果是文件，添加大小和状态
+                   if (child.isFile) {
+                       const sizeSpan = document.createElement('small');
+                       sizeSpan.className = 'text-muted file-size';
+                       sizeSpan.textContent = formatFileSize(child.file.size);
+                       contentDiv.appendChild(sizeSpan);
+
+                       const statusSpan = document.createElement('span');
+                       statusSpan.className = 'upload-status pending';
+                       statusSpan.textContent = '待上传';
+                       contentDiv.appendChild(statusSpan);
+
+                       // 添加重试按钮
+                       const retryBtn = document.createElement('button');
+                       retryBtn.type = 'button';
+                       retryBtn.className = 'btn btn-sm btn-link retry-btn';
+                       retryBtn.innerHTML = '<i class="bi bi-arrow-clockwise"></i> 重试';
+                       retryBtn.style.display = 'none';
+                       retryBtn.onclick = (e) => {
+                           e.stopPropagation();
+                           uploadFile(child.file);
+                       };
+                       contentDiv.appendChild(retryBtn);
+
+                       // 保存文件路径用于状态更新
+                       itemDiv.dataset.path = child.file.webkitRelativePath || child.file.name;
+                   } else {
+                       // 文件夹点击事件
+                       contentDiv.onclick = (e) => {
+                           e.stopPropagation();
+                           const childrenDiv = itemDiv.querySelector('.file-children');
+                           const toggle = itemDiv.querySelector('.folder-toggle');
+                           const isOpen = toggle.classList.contains('open');
+
+                           // 切换折叠状态
+                           toggle.classList.toggle('open');
+                           childrenDiv.style.display = isOpen ? 'none' : 'block';
+                       };
+                   }
+
+                   itemDiv.appendChild(contentDiv);
+
+                   // 创建子项容器
+                   const childrenDiv = document.createElement('div');
+                   childrenDiv.className = 'file-children';
+                   childrenDiv.style.display = 'none'; // 默认折叠
+                   itemDiv.appendChild(childrenDiv);
+
+                   parentElement.appendChild(itemDiv);
+
+                   // 递归处理子项
+                   if (!child.isFile) {
+                       renderTree(child, childrenDiv);
+                   }
+               });
+           }
+
+           renderTree(root, fileTree);
+
+           // 启用上传按钮
+           startUploadBtn.disabled = false;
+       }
+
+       // 更新文件状态
+       function updateFileStatus(filePath, status, message = '') {
+           const fileItem = fileTree.querySelector(`.file-item[data-path="${filePath}"]`);
+           if (fileItem) {
+               const statusSpan = fileItem.querySelector('.upload-status');
+               const retryBtn = fileItem.querySelector('.retry-btn');
+
+               statusSpan.className = 'upload-status ' + status;
+               statusSpan.textContent = message;
+
+               // 显示/隐藏重试按钮
+               if (status === 'error') {
+                   retryBtn.style.display = 'inline-block';
+               } else {
+                   retryBtn.style.display = 'none';
+               }
+           }
+       }
+
+       // 检查所有文件是否上传完成
+       function checkAllFilesUploaded() {
+           const allFiles = fileTree.querySelectorAll('.file-item:not(.folder)');
+           const successFiles = fileTree.querySelectorAll('.upload-status.success');
+           return allFiles.length === successFiles.length;
+       }
+
+       // 上传单个文件
+       async function uploadFile(file, sessionId) {
+           // 优先使用自定义的完整路径，然后是webkitRelativePath，最后是文件名
+           const filePath = file._fullPath || file.webkitRelativePath || file.name;
+           const formData = new FormData();
+           formData.append('files[]', file, filePath);
+           formData.append('session_id', sessionId);
+
+           // 更新当前文件名显示
+           currentFileDiv.classList.remove('d-none');
+           currentFileName.textContent = filePath;
+           updateFileStatus(filePath, 'uploading', '上传中');
+
+           try {
+               const response = await fetch('/api/upload', {
+                   method: 'POST',
+                   body: formData
+               });
+
+               if (response.ok) {
+                   const result = await response.json();
+                   updateFileStatus(filePath, 'success', '已完成');
+                   return result;
+               } else {
+                   throw new Error('上传失败');
+               }
+           } catch (error) {
+               updateFileStatus(filePath, 'error', '失败');
+               showToast('错误', `文件 ${filePath} 上传失败`, 'danger');
+               return false;
+           }
+       }
+
+       // 开始上传会话
+       async function startUploadSession(projectId, totalFiles, totalSize) {
+           try {
+               const response = await fetch('/api/upload/start', {
+                   method: 'POST',
+                   headers: {
+                       'Content-Type': 'application/json',
+                   },
+                   body: JSON.stringify({
+                       project_id: projectId,
+                       total_files: totalFiles,
+                       total_size: totalSize
+                   })
+               });
+
+               if (response.ok) {
+                   const result = await response.json();
+                   return result.session_id;
+               } else {
+                   const result = await response.json().catch(() => ({}));
+                   throw new Error(result.error || '创建上传会话失败');
+               }
+           } catch (error) {
+               showToast('错误', error.message, 'danger');
+       return null;
+           }
+       }
+
+       // 完成上传会话
+       async function completeUploadSession(sessionId) {
+           try {
+               const response = await fetch('/api/upload/complete', {
+                   method: 'POST',
+                   headers: {
+                       'Content-Type': 'application/json',
+                   },
+                   body: JSON.stringify({
+                       session_id: sessionId
+                   })
+               });
+
+               if (response.ok) {
+                   const result = await response.json();
+                   showToast('成功', result.message, 'success');
+                   return true;
+               } else {
+                   throw new Error('完成上传失败');
+               }
+           } catch (error) {
+               showToast('错误', error.message, 'danger');
+               return false;
+           }
+       }
+
+       // 监听文件选择
+       fileInput.addEventListener('change', function(e) {
+           const files = Array.from(e.target.files);
+           if (files.length > 0) {
+               createFileTree(files);
+               uploadProgress.classList.remove('d-none');
+               progressBar.style.width = '0%';
+               progressText.textContent = '0%';
+
+               // 重置当前文件显示
+               currentFileDiv.classList.add('d-none');
+               currentFileName.textContent = '';
+
+               // 启用上传按钮
+               startUploadBtn.disabled = false;
+           }
+       });
+
+       // 开始上传
+       startUploadBtn.addEventListener('click', async function() {
+           // 优先使用全局selectedFiles，如果为空则使用fileInput.files
+           const files = (typeof selectedFiles !== 'undefined' && selectedFiles.length > 0) ? selectedFiles : Array.from(fileInput.files);
+           if (files.length === 0) {
+               showToast('提示', '请先选择要上传的文件！', 'warning');
+               return;
+           }
+
+           const projectId = currentProjectId;
+           if (!projectId) {
+               showToast('错误', '无法确定项目ID', 'danger');
+               return;
+           }
+
+           startUploadBtn.disabled = true;
+           uploadProgress.classList.remove('d-none');
+           let uploadedCount = 0;
+           const totalFiles = files.length;
+
+           // 创建上传会话
+           const totalSize = files.reduce((sum, file) => sum + (file.size || 0), 0);
+           const sessionId = await startUploadSession(projectId, totalFiles, totalSize);
+           if (!sessionId) {
+               startUploadBtn.disabled = false;
+               return;
+           }
+
+           try {
+           for (let file of files) {
+                   const result = await uploadFile(file, sessionId);
+                   if (result && !result.error) {
+                   uploadedCount++;
+               // 更新总进度
+               const progress = Math.round((uploadedCount / totalFiles) * 100);
+               progressBar.style.width = progress + '%';
+               progressText.textContent = progress + '%';
+           }
+               }
+
+               // 所有文件上传完成，完成会话
+               if (uploadedCount === totalFiles) {
+                   await completeUploadSession(sessionId);
+                   showToast('成功', '所有文件上传完成', 'success');
+           } else {
+                   showToast('警告', '部分文件上传失败，请重试', 'warning');
+                   // 部分失败时重新启用按钮，允许用户重试
+                   startUploadBtn.disabled = false;
+               }
+           } catch (error) {
+               showToast('错误', '上传过程中发生错误', 'danger');
+               // 发生错误时重新启用按钮，允许用户重试
+               startUploadBtn.disabled = false;
+           } finally {
+               // 上传完成后的处理
+               currentFileDiv.classList.add('d-none');
+               // 只有在完全成功时才保持按钮禁用状态
+           }
+       });
+
+       // 清空按钮事件处理程序
+       fileInput.addEventListener('click', function() {
+           // 清空文件输入框时重置所有状态
+           if (this.value) {
+               this.value = '';
+               fileTree.innerHTML = '';
+               uploadProgress.classList.add('d-none');
+               progressBar.style.width = '0%';
+               progressText.textContent = '0%';
+               currentFileDiv.classList.add('d-none');
+               startUploadBtn.disabled = true;
+           }
+       });
+
+       // 模态框关闭时重置状态
+       document.getElementById('uploadModal').addEventListener('hidden.bs.modal', function () {
+           fileInput.value = '';
+           fileTree.innerHTML = '';
+           uploadProgress.classList.add('d-none');
+           progressBar.style.width = '0%';
+           progressText.textContent = '0%';
+           currentFileDiv.classList.add('d-none');
+           startUploadBtn.disabled = true;
+           currentProjectId = null; // 重置项目ID
+       });
+   });
+
+   // 加载项目文件列表
+   async function loadProjectFiles(projectId) {
+       // 设置当前项目ID，供下载功能使用
+       window.currentDownloadProjectId = projectId;
+
+       const fileTreeContainer = document.getElementById('downloadFileTree');
+       const projectNameElement = document.getElementById('downloadProjectName');
+       const downloadStatsElement = document.getElementById('downloadStats');
+       const downloadBtn = document.getElementById('downloadBtn');
+
+       // 显示加载状态
+       fileTreeContainer.innerHTML = `
+           <div class="file-tree-loading">
+               <div class="d-flex justify-content-center align-items-center">
+                   <div class="spinner-border text-primary me-2" role="status">
+                       <span class="visually-hidden">加载中...</span>
+                   </div>
+                   <span>正在加载文件列表...</span>
+               </div>
+           </div>
+       `;
+
+       try {
+           const response = await fetch(`/api/project/${projectId}/files`);
+           const data = await response.json();
+
+           if (!response.ok) {
+               throw new Error(data.error || '获取文件列表失败');
+           }
+
+           // 更新项目名称
+           projectNameElement.textContent = data.project_name;
+
+           // 构建文件树
+           const fileTree = buildFileTreeHTML(data.tree);
+           fileTreeContainer.innerHTML = fileTree;
+
+           // 统计文件和文件夹数量
+           const stats = countFilesAndFolders(data.tree);
+           document.getElementById('totalFolders').textContent = stats.folders;
+           document.getElementById('totalFiles').textContent = stats.files;
+           document.getElementById('totalSize').textContent = formatFileSize(stats.totalSize);
+           downloadStatsElement.style.display = 'block';
+
+           // 添加事件监听器
+           addFileTreeEventListeners();
+
+       } catch (error) {
+           console.error('Error loading project files:', error);
+           fileTreeContainer.innerHTML = `
+               <div class="file-tree-empty">
+                   <i class="fas fa-exclamation-triangle text-warning mb-2" style="font-size: 2rem;"></i>
+                   <div>加载失败: ${error.message}</div>
+                   <button class="btn btn-sm btn-outline-primary mt-2" onclick="loadProjectFiles(${projectId})">
+                       <i class="fas fa-redo"></i> 重新加载
+                   </button>
+               </div>
+           `;
+           downloadStatsElement.style.display = 'none';
+           downloadBtn.disabled = true;
+       }
+   }
+
+   // 构建文件树HTML
+   function buildFileTreeHTML(tree) {
+       if (!tree || (tree.folders.length === 0 && tree.files.length === 0)) {
+           return `
+               <div class="file-tree-empty">
+                   <i class="fas fa-folder-open text-muted mb-2" style="font-size: 2rem;"></i>
+                   <div>该项目暂无上传文件</div>
+               </div>
+           `;
+       }
+
+       let html = '';
+
+       // 渲染文件夹
+       tree.folders.forEach(folder => {
+           const fileCount = countFilesAndFolders(folder.children);
+           html += `
+               <div class="file-tree-item folder" data-path="${folder.path}">
+                   <div class="file-tree-item-content">
+                       <div class="file-tree-toggle">
+                           <i class="fas fa-chevron-right"></i>
+                       </div>
+                       <div class="file-tree-icon folder">
+                           <i class="fas fa-folder"></i>
+                       </div>
+                       <div class="file-tree-name">${folder.name}</div>
+                       <div class="file-count-badge">${fileCount.files} 文件</div>
+                       <div class="file-tree-checkbox">
+                           <input type="checkbox" class="form-check-input" data-type="folder">
+                       </div>
+                   </div>
+                   <div class="file-tree-children">
+                       ${buildFileTreeHTML(folder.children)}
+                   </div>
+               </div>
+           `;
+       });
+
+       // 渲染文件
+       tree.files.forEach(file => {
+           const iconClass = getFileIcon(file.extension);
+           html += `
+               <div class="file-tree-item file" data-path="${file.path}" data-download-url="${file.download_url || ''}">
+                   <div class="file-tree-item-content">
+                       <div class="file-tree-toggle"></div>
+                       ${file.preview_url ? `<img class="file-tree-thumb" src="${file.preview_url}" alt="" loading="lazy" onerror="this.nextElementSibling.style.display = ''; this.remove();">` : ''}
+                       <div class="file-tree-icon file ${file.extension.slice(1)}"${file.preview_url ? ' style="display: none;"' : ''}>
+                           <i class="fas ${iconClass}"></i>
+                       </div>
+                       <div class="file-tree-name">${file.name}</div>
+                       <div class="file-tree-size">${file.size_formatted}</div>
+                       <div class="file-tree-checkbox">
+                           <input type="checkbox" class="form-check-input" data-type="file" data-size="${file.size}">
+                       </div>
+                   </div>
+               </div>
+           `;
+       });
+
+       return html;
+   }
+
+   // 获取文件图标
+   function getFileIcon(extension) {
+       const iconMap = {
+           '.pdf': 'fa-file-pdf',
+           '.doc': 'fa-file-word',
+           '.docx': 'fa-file-word',
+           '.xls': 'fa-file-excel',
+           '.xlsx': 'fa-file-excel',
+           '.ppt': 'fa-file-powerpoint',
+           '.pptx': 'fa-file-powerpoint',
+           '.jpg': 'fa-file-image',
+           '.jpeg': 'fa-file-image',
+           '.png': 'fa-file-image',
+           '.gif': 'fa-file-image',
+           '.svg': 'fa-file-image',
+           '.mp4': 'fa-file-video',
+           '.avi': 'fa-file-video',
+           '.mov': 'fa-file-video',
+           '.mp3': 'fa-file-audio',
+           '.wav': 'fa-file-audio',
+           '.txt': 'fa-file-alt',
+           '.zip': 'fa-file-archive',
+           '.rar': 'fa-file-archive',
+           '.7z': 'fa-file-archive',
+           '.html': 'fa-file-code',
+           '.css': 'fa-file-code',
+           '.js': 'fa-file-code',
+           '.py': 'fa-file-code',
+           '.java': 'fa-file-code',
+           '.cpp': 'fa-file-code',
+           '.c': 'fa-file-code'
+       };
+       return iconMap[extension] || 'fa-file';
+   }
+
+   // 统计文件和文件夹数量
+   function countFilesAndFolders(tree) {
+       let folders = 0;
+       let files = 0;
+       let totalSize = 0;
+
+       if (tree.folders) {
+           folders += tree.folders.length;
+           tree.folders.forEach(folder => {
+               const childStats = countFilesAndFolders(folder.children);
+               folders += childStats.folders;
+               files += childStats.files;
+               totalSize += childStats.totalSize;
+           });
+       }
+
+       if (tree.files) {
+           files += tree.files.length;
+           tree.files.forEach(file => {
+               totalSize += file.size;
+           });
+       }
+
+       return { folders, files, totalSize };
+   }
+
+   // 添加文件树事件监听器
+   function addFileTreeEventListeners() {
+       // 文件夹展开/收起
+       document.querySelectorAll('.file-tree-toggle').forEach(toggle => {
+           toggle.addEventListener('click', function(e) {
+               e.stopPropagation();
+               const item = this.closest('.file-tree-item');
+               const children = item.querySelector('.file-tree-children');
+               const icon = this.querySelector('i');
+
+               if (children) {
+                   const isExpanded = children.classList.contains('expanded');
+                   if (isExpanded) {
+                       children.classList.remove('expanded');
+                       this.classList.remove('expanded');
+                   } else {
+                       children.classList.add('expanded');
+                       this.classList.add('expanded');
+                   }
+               }
+           });
+       });
+
+       // 复选框事件
+       document.querySelectorAll('.file-tree-checkbox input').forEach(checkbox => {
+           checkbox.addEventListener('change', function() {
+               updateDownloadButtons();
+               updateParentCheckboxes(this);
+               updateChildCheckboxes(this);
+           });
+       });
+   }
+
+   // 更新下载按钮状态
+   function updateDownloadButtons() {
+       const selectedCheckboxes = document.querySelectorAll('.file-tree-checkbox input:checked');
+       const downloadBtn = document.getElementById('downloadBtn');
+       const downloadBtnText = document.getElementById('downloadBtnText');
+
+       if (selectedCheckboxes.length === 0) {
+           downloadBtn.disabled = true;
+           downloadBtnText.textContent = '选择要下载的文件';
+       } else if (selectedCheckboxes.length === 1) {
+           // 检查是否为单个文件
+           const selectedItem = selectedCheckboxes[0].closest('.file-tree-item');
+           if (selectedItem.classList.contains('file')) {
+               downloadBtn.disabled = false;
+               downloadBtnText.textContent = '下载文件';
+           } else {
+               downloadBtn.disabled = false;
+               downloadBtnText.textContent = '下载压缩包';
+           }
+       } else {
+           downloadBtn.disabled = false;
+           downloadBtnText.textContent = `下载压缩包 (${selectedCheckboxes.length}项)`;
+       }
+   }
+
+   // 更新父级复选框状态
+   function updateParentCheckboxes(checkbox) {
+       const item = checkbox.closest('.file-tree-item');
+       const parentItem = item.parentElement.closest('.file-tree-item');
+
+       if (parentItem && parentItem.classList.contains('folder')) {
+           const parentCheckbox = parentItem.querySelector('.file-tree-checkbox input');
+           const childrenContainer = parentItem.querySelector('.file-tree-children');
+           const childCheckboxes = childrenContainer.querySelectorAll('.file-tree-checkbox input');
+           const checkedChildren = childrenContainer.querySelectorAll('.file-tree-checkbox input:checked');
+
+           if (checkedChildren.length === 0) {
+               parentCheckbox.checked = false;
+               parentCheckbox.indeterminate = false;
+           } else if (checkedChildren.length === childCheckboxes.length) {
+               parentCheckbox.checked = true;
+               parentCheckbox.indeterminate = false;
+           } else {
+               parentCheckbox.checked = false;
+               parentCheckbox.indeterminate = true;
+           }
+
+           updateParentCheckboxes(parentCheckbox);
+       }
+   }
+
+   // 更新子级复选框状态
+   function updateChildCheckboxes(checkbox) {
+       const item = checkbox.closest('.file-tree-item');
+       if (item.classList.contains('folder')) {
+           const childrenContainer = item.querySelector('.file-tree-children');
+           const childCheckboxes = childrenContainer.querySelectorAll('.file-tree-checkbox input');
+
+           childCheckboxes.forEach(childCheckbox => {
+               childCheckbox.checked = checkbox.checked;
+               updateChildCheckboxes(childCheckbox);
+           });
+       }
+   }
+
+   // 展开所有文件夹
+   function expandAllFolders() {
+       document.querySelectorAll('.file-tree-children').forEach(children => {
+           children.classList.add('expanded');
+       });
+       document.querySelectorAll('.file-tree-toggle').forEach(toggle => {
+           toggle.classList.add('expanded');
+       });
+   }
+
+   // 收起所有文件夹
+   function collapseAllFolders() {
+       document.querySelectorAll('.file-tree-children').forEach(children => {
+           children.classList.remove('expanded');
+       });
+       document.querySelectorAll('.file-tree-toggle').forEach(toggle => {
+           toggle.classList.remove('expanded');
+       });
+   }
+
+   // 处理下载逻辑
+   function handleDownload() {
+       const selectedCheckboxes = document.querySelectorAll('.file-tree-checkbox input:checked');
+
+       if (selectedCheckboxes.length === 0) {
+           alert('请选择要下载的文件或文件夹');
+           return;
+       }
+
+       // 收集选中的文件/文件夹路径
+       const selectedPaths = Array.from(selectedCheckboxes).map(checkbox => {
+           const item = checkbox.closest('.file-tree-item');
+           return item.dataset.path;
+       });
+
+       // 获取当前项目ID
+       const projectId = getCurrentProjectId();
+
+       if (selectedCheckboxes.length === 1) {
+           const selectedItem = selectedCheckboxes[0].closest('.file-tree-item');
+           if (selectedItem.classList.contains('file')) {
+               // 单个文件直接下载
+               downloadSingleFile(projectId, selectedPaths[0], selectedItem.dataset.downloadUrl);
+           } else {
+               // 单个文件夹压缩下载
+               downloadAsZip(projectId, selectedPaths);
+           }
+       } else {
+           // 多个文件/文件夹压缩下载
+           downloadAsZip(projectId, selectedPaths);
+       }
+   }
+
+   // 判断签名下载地址是否仍在有效期内（预留30秒余量）
+   function isSignedUrlValid(signedUrl) {
+       if (!signedUrl) return false;
+       const params = new URL(signedUrl, window.location.origin).searchParams;
+       const expiresAt = Number(params.get('ts')) + Number(params.get('e'));
+       return Date.now() / 1000 < expiresAt - 30;
+   }
+
+   // 下载单个文件
+   function downloadSingleFile(projectId, filePath, signedUrl) {
+       // 优先使用文件树返回的签名下载地址，过期后退回普通下载接口
+       const downloadUrl = isSignedUrlValid(signedUrl)
+           ? signedUrl
+           : `/api/project/${projectId}/download/file?path=${encodeURIComponent(filePath)}`;
+       window.open(downloadUrl, '_blank');
+   }
+
+   // 下载压缩包
+   function downloadAsZip(projectId, filePaths) {
+       const downloadUrl = `/api/project/${projectId}/download/zip`;
+       const form = document.createElement('form');
+       form.method = 'POST';
+       form.action = downloadUrl;
+       form.target = '_blank';
+
+       filePaths.forEach(path => {
+           const input = document.createElement('input');
+           input.type = 'hidden';
+           input.name = 'paths[]';
+           input.value = path;
+           form.appendChild(input);
+       });
+
+       document.body.appendChild(form);
+       form.submit();
+       document.body.removeChild(form);
+   }
+
+   // 获取当前项目ID
+   function getCurrentProjectId() {
+       // 这个函数需要在loadProjectFiles中设置项目ID
+       return window.currentDownloadProjectId;
+   }
+
+   // 页面加载完成后绑定下载按钮事件
+   document.addEventListener('DOMContentLoaded', function() {
+       document.getElementById('downloadBtn').addEventListener('click', handleDownload);
+   });
+
+   // 分享项目相关功能
+   let currentShareProjectId = null;
+
+   function shareProject(jobId) {
+       console.log('=== 开始分享项目 ===');
+       console.log('项目ID:', jobId);
+       currentShareProjectId = jobId;
+
+       // 获取项目信息
+       const project = getProjectById(jobId);
+       if (!project) {
+           showToast('错误', '无法找到项目信息');
+           return;
+       }
+
+       console.log('项目信息:', project);
+
+       // 设置项目名称
+       document.getElementById('shareProjectName').textContent = project.name;
+
+       // 检查是否已经有分享
+       console.log('开始检查现有分享状态...');
+       checkExistingShare(jobId);
+
+       // 显示分享模态框
+       const shareModal = new bootstrap.Modal(document.getElementById('shareModal'));
+       shareModal.show();
+   }
+
+   // 获取项目信息
+   function getProjectById(jobId) {
+       const tbody = document.querySelector('.table tbody');
+       const rows = tbody.getElementsByTagName('tr');
+
+       for (let row of rows) {
+           // 尝试查找任何包含jobId的按钮，而不只是编辑按钮
+           const buttons = row.querySelectorAll('.dropdown-item');
+           for (let button of buttons) {
+               const onclick = button.getAttribute('onclick');
+               if (onclick && onclick.includes(jobId)) {
+                   return {
+                       id: jobId,
+                       name: row.querySelector('.col-name span').textContent.trim()
+                   };
+               }
+           }
+       }
+       return null;
+   }
+
+   // 检查现有分享
+   function checkExistingShare(projectId) {
+       // 添加时间戳和缓存控制，防止浏览器缓存旧数据
+       const timestamp = new Date().getTime();
+       fetch(`/api/project/${projectId}/share?_t=${timestamp}`, {
+           method: 'GET',
+           headers: {
+               'Cache-Control': 'no-cache, no-store, must-revalidate',
+               'Pragma': 'no-cache',
+               'Expires': '0'
+           }
+       })
+           .then(response => response.json())
+           .then(data => {
+               console.log('分享状态检查结果:', data);
+               if (data.shared) {
+                   // 已经存在分享，显示分享信息
+                   showExistingShare(data);
+               } else {
+                   // 没有分享，显示创建界面
+                   showCreateShare();
+               }
+           })
+           .catch(error => {
+               console.error('Error checking share:', error);
+               showCreateShare();
+           });
+   }
+
+   // 显示现有分享信息
+   function showExistingShare(shareData) {
+       document.getElementById('shareSettings').style.display = 'none';
+       document.getElementById('shareResult').style.display = 'block';
+       document.getElementById('createShareBtn').style.display = 'none';
+       document.getElementById('cancelShareBtn').style.display = 'block';
+
+       // 设置分享链接
+       const fullUrl = window.location.origin + shareData.share_url;
+       document.getElementById('shareUrl').value = fullUrl;
+
+       // 设置过期信息
+       const expireInfo = document.getElementById('shareExpireInfo');
+       if (shareData.expire_time) {
+           const expireDate = new Date(shareData.expire_time);
+           expireInfo.textContent = `过期时间：${expireDate.toLocaleString()}`;
+       } else {
+           expireInfo.textContent = '过期时间：永不过期';
+       }
+
+       // 设置密码信息
+       const passwordInfo = document.getElementById('sharePasswordInfo');
+       passwordInfo.textContent = shareData.has_password ? '访问需要密码' : '无需密码访问';
+
+       // 设置访问信息
+       const accessInfo = document.getElementById('shareAccessInfo');
+       const createdDate = new Date(shareData.created_at);
+       const accessCount = shareData.access_count || 0;  // 确保访问次数不为undefined
+       let accessText = `创建时间：${createdDate.toLocaleString()}，访问次数：${accessCount}`;
+
+       // 添加访问次数限制信息
+       if (shareData.max_access_count && shareData.max_access_count > 0) {
+           accessText += ` / ${shareData.max_access_count}`;
+       } else {
+           accessText += ' (无限制)';
+       }
+
+       accessInfo.textContent = accessText;
+   }
+
+   // 显示创建分享界面
+   function showCreateShare() {
+       document.getElementById('shareSettings').style.display = 'block';
+       document.getElementById('shareResult').style.display = 'none';
+       document.getElementById('createShareBtn').style.display = 'block';
+       document.getElementById('cancelShareBtn').style.display = 'none';
+
+       // 重置表单
+       document.getElementById('shareForm').reset();
+       document.querySelector('[name="expire_hours"]').value = '24';
+   }
+
+   // 创建分享 - 确保DOM加载完成后绑定事件
+   document.addEventListener('DOMContentLoaded', function() {
+       console.log('DOM加载完成，开始绑定分享事件');
+
+       console.log('准备绑定创建分享按钮事件');
+       const createShareBtn = document.getElementById('createShareBtn');
+       console.log('createShareBtn元素:', createShareBtn);
+
+       if (!createShareBtn) {
+           console.error('找不到createShareBtn按钮元素！');
+           return;
+       }
+
+       createShareBtn.addEventListener('click', function() {
+           console.log('创建分享按钮被点击');
+           console.log('currentShareProjectId:', currentShareProjectId);
+
+           const form = document.getElementById('shareForm');
+           console.log('表单元素:', form);
+           console.log('表单有效性:', form ? form.checkValidity() : 'form not found');
+
+           if (!form.checkValidity()) {
+               console.log('表单验证失败');
+               form.classList.add('was-validated');
+               return;
+           }
+
+           const formData = new FormData(form);
+           const shareData = {
+               expire_hours: parseInt(formData.get('expire_hours')),
+               password: formData.get('password'),
+               max_access_count: parseInt(formData.get('max_access_count'))
+           };
+
+           console.log('分享数据:', shareData);
+
+           // 显示加载状态
+           this.disabled = true;
+           this.innerHTML = '<i class="fas fa-spinner fa-spin"></i> 创建中...';
+
+           console.log('发送API请求...');
+           fetch(`/api/project/${currentShareProjectId}/share`, {
+               method: 'POST',
+               headers: {
+                   'Content-Type': 'application/json',
+               },
+               body: JSON.stringify(shareData)
+           })
+           .then(response => response.json())
+           .then(data => {
+               console.log('分享创建API响应:', data);
+               if (data.error) {
+                   throw new Error(data.error);
+               }
+
+               // 构造要传递给showExistingShare的数据
+               const shareDisplayData = {
+                   share_url: data.share_url,
+                   expire_time: data.expire_time,
+                   max_access_count: data.max_access_count,
+                   has_password: data.has_password,
+                   access_count: 0,
+                   created_at: new Date().toISOString()
+               };
+
+               console.log('准备显示分享结果，数据:', shareDisplayData);
+
+               // 显示成功结果
+               showExistingShare(shareDisplayData);
+
+               showToast('分享创建成功', '项目分享链接已生成！', 'success');
+
+               // 刷新项目行的显示，更新分享状态图标
+               refreshProjectRow(currentShareProjectId);
+
+               console.log('分享创建流程完成');
+           })
+           .catch(error => {
+               console.error('Error creating share:', error);
+               showToast('分享创建失败', '❌ ' + (error.message || '无法创建分享链接，请检查网络连接后重试'), 'error');
+           })
+           .finally(() => {
+               // 恢复按钮状态
+               this.disabled = false;
+               this.innerHTML = '<i class="fas fa-share-alt"></i> 创建分享';
+           });
+       });
+
+       // 取消分享
+       const cancelShareBtn = document.getElementById('cancelShareBtn');
+       if (cancelShareBtn) {
+           cancelShareBtn.addEventListener('click', function() {
+               // 显示加载状态
+               this.disabled = true;
+               this.innerHTML = '<i class="fas fa-spinner fa-spin"></i> 取消中...';
+
+               fetch(`/api/project/${currentShareProjectId}/share`, {
+                   method: 'DELETE'
+               })
+               .then(response => response.json())
+               .then(data => {
+                   if (data.error) {
+                       throw new Error(data.error);
+                   }
+
+                   // 显示创建界面
+                   showCreateShare();
+                   showToast('分享已取消', '分享链接已成功取消，所有外部访问已停止。', 'success');
+
+                   // 刷新项目行的显示，更新分享状态图标
+                   refreshProjectRow(currentShareProjectId);
+               })
+               .catch(error => {
+                   console.error('Error canceling share:', error);
+                   showToast('取消失败', (error.message || '无法取消分享，请检查网络连接后重试'), 'error');
+               })
+               .finally(() => {
+                   // 恢复按钮状态
+                   this.disabled = false;
+                   this.innerHTML = '<i class="fas fa-times"></i> 取消分享';
+               });
+           });
+       }
+
+       // 重置分享模态框
+       const shareModal = document.getElementById('shareModal');
+       if (shareModal) {
+           shareModal.addEventListener('hidden.bs.modal', function () {
+               console.log('=== 分享模态框即将关闭 ===');
+               console.log('当前项目ID:', currentShareProjectId);
+
+               // 如果有当前项目ID，刷新项目行显示
+               if (currentShareProjectId) {
+                   refreshProjectRow(currentShareProjectId);
+               }
+
+               // 清除状态，确保下次打开时重新检查
+               const oldProjectId = currentShareProjectId;
+               currentShareProjectId = null;
+               showCreateShare();
+               const shareForm = document.getElementById('shareForm');
+               if (shareForm) {
+                   shareForm.classList.remove('was-validated');
+               }
+
+               console.log('分享模态框已关闭，状态已重置，项目ID从', oldProjectId, '重置为', currentShareProjectId);
+           });
+       }
+
+       console.log('分享事件绑定完成');
+   });
+
+   // 复制分享链接
+   function copyShareUrl() {
+       const shareUrlInput = document.getElementById('shareUrl');
+       shareUrlInput.select();
+       shareUrlInput.setSelectionRange(0, 99999); // 移动设备兼容性
+
+       try {
+           document.execCommand('copy');
+           showToast('链接已复制', '分享链接已复制到剪贴板。', 'success');
+       } catch (err) {
+           console.error('Failed to copy: ', err);
+           showToast('复制失败', '请手动选择并复制链接', 'warning');
+       }
+   }
+
+   function downloadProject(jobId) {
+       loadProjectFiles(jobId);
+   }
+
+   function collaborateProject(jobId) {
+       // 打开项目协作管理模态框
+       currentProjectId = jobId;
+
+       // 获取项目信息并更新模态框标题
+       const projectRow = document.querySelector(`tr[data-project-id="${jobId}"]`);
+       if (projectRow) {
+           const projectName = projectRow.querySelector('[data-field="name"]').textContent;
+           document.getElementById('collaborateProjectName').textContent = projectName;
+       }
+
+       // 加载可用的协作者
+       loadAvailableCollaborators();
+
+       // 加载现有协作者
+       loadProjectCollaborations(jobId);
+
+       // 显示模态框
+       const modal = new bootstrap.Modal(document.getElementById('collaborateModal'));
+       modal.show();
+   }
+
+   // 自定义确认对话框
+   function showConfirm(options) {
+       return new Promise((resolve) => {
+           const {
+               title = '确认操作',
+               message = '您确定要执行此操作吗？',
+               note = '此操作无法撤销，请谨慎操作。',
+               confirmText = '确认',
+               cancelText = '取消',
+               confirmClass = 'btn-danger',
+               icon = 'fas fa-exclamation-triangle text-warning'
+           } = options;
+
+           // 设置对话框内容
+           document.getElementById('confirmTitle').textContent = title;
+           document.getElementById('confirmMessage').textContent = message;
+           document.getElementById('confirmNote').textContent = note;
+
+           const confirmBtn = document.getElementById('confirmOkBtn');
+           confirmBtn.innerHTML = `<i class="fas fa-check me-1"></i>${confirmText}`;
+           confirmBtn.className = `btn ${confirmClass}`;
+
+           // 设置图标
+           const titleIcon = document.querySelector('#confirmModalLabel i');
+           titleIcon.className = icon;
+
+           // 显示对话框
+           const confirmModal = new bootstrap.Modal(document.getElementById('confirmModal'));
+           confirmModal.show();
+
+           // 处理确认按钮点击
+           const handleConfirm = () => {
+               confirmModal.hide();
+               confirmBtn.removeEventListener('click', handleConfirm);
+               resolve(true);
+           };
+
+           // 处理取消或关闭
+           const handleCancel = () => {
+               confirmModal.hide();
+               document.getElementById('confirmModal').removeEventListener('hidden.bs.modal', handleCancel);
+               confirmBtn.removeEventListener('click', handleConfirm);
+               resolve(false);
+           };
+
+           // 绑定事件
+           confirmBtn.addEventListener('click', handleConfirm);
+           document.getElementById('confirmModal').addEventListener('hidden.bs.modal', handleCancel, { once: true });
+       });
+   }